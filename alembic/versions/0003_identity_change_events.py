@@ -0,0 +1,42 @@
+"""Add transactional outbox for identity change events."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import func
+
+from alembic import op
+
+revision = '0004_identity_change_events'
+down_revision = '0003_create_app_role'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'change_events',
+        sa.Column('id', sa.BigInteger(), sa.Identity(always=False), primary_key=True),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('action', sa.String(length=32), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        sa.Column('published_at', sa.TIMESTAMP(timezone=False), nullable=True),
+        schema='identity',
+    )
+    # Keeps the relay's "oldest unpublished first" scan proportional to the backlog, not the table.
+    op.create_index(
+        'ix_identity_change_events_unpublished',
+        'change_events',
+        ['id'],
+        schema='identity',
+        postgresql_where=sa.text('published_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_identity_change_events_unpublished', table_name='change_events', schema='identity')
+    op.drop_table('change_events', schema='identity')
@@ -0,0 +1,63 @@
+"""Add month-partitioned audit trail for logins and identity mutations."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = '0005_identity_audit_events'
+down_revision = '0004_identity_change_events'
+branch_labels = None
+depends_on = None
+
+
+def _month_bounds(year: int, month: int) -> tuple[str, datetime, datetime]:
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return f'audit_events_{start:%Y_%m}', start, end
+
+
+def upgrade() -> None:
+    op.create_table(
+        'audit_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('occurred_at', sa.TIMESTAMP(timezone=False), nullable=False),
+        sa.Column('action', sa.String(length=64), nullable=False),
+        sa.Column('actor_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('subject_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('ip_address', sa.String(length=64), nullable=True),
+        sa.Column('user_agent', sa.String(length=512), nullable=True),
+        sa.Column(
+            'details', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'{}'::jsonb")
+        ),
+        # Partitioned tables require the partition key to be part of the primary key.
+        sa.PrimaryKeyConstraint('id', 'occurred_at', name='pk_audit_events'),
+        schema='identity',
+        postgresql_partition_by='RANGE (occurred_at)',
+    )
+    op.create_index(
+        'ix_identity_audit_events_subject', 'audit_events', ['subject_id', 'occurred_at'], schema='identity'
+    )
+    op.create_index('ix_identity_audit_events_tenant', 'audit_events', ['tenant_id', 'occurred_at'], schema='identity')
+
+    # Pre-create the current and next month; later months are added on demand by the audit writer.
+    today = datetime.utcnow()
+    next_year, next_month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+    for year, month in ((today.year, today.month), (next_year, next_month)):
+        name, start, end = _month_bounds(year, month)
+        op.execute(
+            f'CREATE TABLE IF NOT EXISTS identity.{name} PARTITION OF identity.audit_events '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade() -> None:
+    # Dropping the partitioned parent drops every partition with it.
+    op.drop_index('ix_identity_audit_events_tenant', table_name='audit_events', schema='identity')
+    op.drop_index('ix_identity_audit_events_subject', table_name='audit_events', schema='identity')
+    op.drop_table('audit_events', schema='identity')
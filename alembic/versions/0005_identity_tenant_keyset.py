@@ -0,0 +1,23 @@
+"""Extend the membership tenant index with membership_id for keyset-ordered tenant scans."""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = '0006_identity_tenant_keyset'
+down_revision = '0005_identity_audit_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (tenant_id, membership_id) still serves plain tenant_id lookups, and lets exports resume without a sort.
+    op.drop_index('ix_identity_user_tenants_tenant', table_name='user_tenants', schema='identity')
+    op.create_index(
+        'ix_identity_user_tenants_tenant', 'user_tenants', ['tenant_id', 'membership_id'], schema='identity'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_identity_user_tenants_tenant', table_name='user_tenants', schema='identity')
+    op.create_index('ix_identity_user_tenants_tenant', 'user_tenants', ['tenant_id'], schema='identity')
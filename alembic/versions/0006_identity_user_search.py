@@ -0,0 +1,48 @@
+"""Index lower-cased email and full name for user search: trigram GIN when pg_trgm is available, else prefix B-trees."""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+
+from alembic import op
+
+revision = '0007_identity_user_search'
+down_revision = '0006_identity_tenant_keyset'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = ('email', 'full_name')
+
+
+def _enable_trigram() -> bool:
+    bind = op.get_bind()
+    if not bind.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar():
+        return False
+    # Managed databases may ship the extension but refuse CREATE EXTENSION to the migration role.
+    try:
+        with bind.begin_nested():
+            bind.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    except Exception:
+        return False
+    return True
+
+
+def upgrade() -> None:
+    if _enable_trigram():
+        # Serves both `lower(col) LIKE 'abc%'` and `LIKE '%abc%'`.
+        for column in SEARCH_COLUMNS:
+            op.execute(
+                f'CREATE INDEX ix_identity_users_{column}_search ON identity.users '
+                f'USING gin (lower({column}) gin_trgm_ops)'
+            )
+    else:
+        # text_pattern_ops lets LIKE 'abc%' use the B-tree regardless of the database collation.
+        for column in SEARCH_COLUMNS:
+            op.execute(
+                f'CREATE INDEX ix_identity_users_{column}_search ON identity.users (lower({column}) text_pattern_ops)'
+            )
+
+
+def downgrade() -> None:
+    for column in SEARCH_COLUMNS:
+        op.execute(f'DROP INDEX IF EXISTS identity.ix_identity_users_{column}_search')
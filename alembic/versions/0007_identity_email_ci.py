@@ -0,0 +1,88 @@
+"""Make email identity case-insensitive: merge users whose emails differ only by case, then index lower(email) uniquely."""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = '0008_identity_email_ci'
+down_revision = '0007_identity_user_search'
+branch_labels = None
+depends_on = None
+
+# For every lower(email) with several accounts, keep one survivor: active before inactive, then the oldest.
+_DUPLICATES = """
+CREATE TEMPORARY TABLE email_duplicates ON COMMIT DROP AS
+SELECT id AS duplicate_id, survivor_id
+FROM (
+    SELECT
+        id,
+        first_value(id) OVER (
+            PARTITION BY lower(email) ORDER BY is_active DESC, created_at, id
+        ) AS survivor_id
+    FROM identity.users
+) ranked
+WHERE id <> survivor_id
+"""
+
+# Memberships move to the survivor unless it already belongs to that tenant; those left over are dropped.
+_MERGE_MEMBERSHIPS = """
+UPDATE identity.user_tenants AS m
+SET user_id = d.survivor_id
+FROM email_duplicates AS d
+WHERE m.user_id = d.duplicate_id
+  AND NOT EXISTS (
+      SELECT 1 FROM identity.user_tenants AS s WHERE s.user_id = d.survivor_id AND s.tenant_id = m.tenant_id
+  )
+"""
+
+
+def upgrade() -> None:
+    op.execute(_DUPLICATES)
+    # Two duplicates of one survivor in the same tenant: the first moves, the second then conflicts with it.
+    op.execute(
+        """
+        DELETE FROM identity.user_tenants AS m
+        USING email_duplicates AS d
+        WHERE m.user_id = d.duplicate_id
+          AND m.membership_id <> (
+              SELECT min(x.membership_id::text)::uuid
+              FROM identity.user_tenants AS x
+              JOIN email_duplicates AS y ON y.duplicate_id = x.user_id
+              WHERE y.survivor_id = d.survivor_id AND x.tenant_id = m.tenant_id
+          )
+        """
+    )
+    op.execute(_MERGE_MEMBERSHIPS)
+    op.execute('DELETE FROM identity.user_tenants USING email_duplicates WHERE user_id = duplicate_id')
+    op.execute('DELETE FROM identity.users USING email_duplicates WHERE id = duplicate_id')
+
+    # text_pattern_ops keeps equality lookups and also serves `lower(email) LIKE 'abc%'` searches, which makes the
+    # B-tree search index of migration 0007 redundant (a trigram GIN index there is kept for substring search).
+    op.execute('CREATE UNIQUE INDEX ix_identity_users_email_lower ON identity.users (lower(email) text_pattern_ops)')
+    # Both case-sensitive uniques from 0001 (the column constraint and its duplicate index) are implied by it now.
+    op.execute('ALTER TABLE identity.users DROP CONSTRAINT IF EXISTS users_email_key')
+    op.execute('DROP INDEX identity.ix_identity_users_email')
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_indexes
+                WHERE schemaname = 'identity' AND indexname = 'ix_identity_users_email_search'
+                  AND indexdef NOT LIKE '%USING gin%'
+            ) THEN
+                DROP INDEX identity.ix_identity_users_email_search;
+            END IF;
+        END$$;
+        """
+    )
+
+
+def downgrade() -> None:
+    # Merged accounts are not restored.
+    op.execute('ALTER TABLE identity.users ADD CONSTRAINT users_email_key UNIQUE (email)')
+    op.execute('CREATE UNIQUE INDEX ix_identity_users_email ON identity.users (email)')
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_identity_users_email_search ON identity.users (lower(email) text_pattern_ops)'
+    )
+    op.execute('DROP INDEX identity.ix_identity_users_email_lower')
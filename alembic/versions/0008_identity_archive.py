@@ -0,0 +1,66 @@
+"""Add soft deletion for users and cold archive tables for long-inactive users and their memberships."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = '0009_identity_archive'
+down_revision = '0008_identity_email_ci'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('deleted_at', sa.TIMESTAMP(timezone=False), nullable=True), schema='identity')
+    # The archiver's candidate scan. Inactive users are a small share of the table, so the partial index stays small.
+    op.create_index(
+        'ix_identity_users_inactive',
+        'users',
+        ['updated_at'],
+        schema='identity',
+        postgresql_where=sa.text('NOT is_active'),
+    )
+
+    # Archive tables have no foreign keys and no unique indexes beyond the primary key: rows are written and read in
+    # bulk by the archiver and restores, and must not constrain what happens in the hot tables.
+    op.create_table(
+        'users_archive',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('full_name', sa.String(length=255), nullable=True),
+        sa.Column('hashed_password', sa.String(length=512), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=False), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=False), nullable=False),
+        sa.Column('deleted_at', sa.TIMESTAMP(timezone=False), nullable=True),
+        sa.Column('archived_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        schema='identity',
+    )
+
+    role_enum = postgresql.ENUM(name='identity_role', create_type=False)
+    op.create_table(
+        'user_tenants_archive',
+        sa.Column('membership_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('role', role_enum, nullable=False),
+        sa.Column('scopes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('plan', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=False), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=False), nullable=False),
+        sa.Column('archived_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        schema='identity',
+    )
+    op.create_index('ix_identity_user_tenants_archive_user', 'user_tenants_archive', ['user_id'], schema='identity')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_identity_user_tenants_archive_user', table_name='user_tenants_archive', schema='identity')
+    op.drop_table('user_tenants_archive', schema='identity')
+    op.drop_table('users_archive', schema='identity')
+    op.drop_index('ix_identity_users_inactive', table_name='users', schema='identity')
+    op.drop_column('users', 'deleted_at', schema='identity')
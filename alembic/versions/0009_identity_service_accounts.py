@@ -0,0 +1,44 @@
+"""Add tenant service accounts for the client-credentials grant."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = '0010_identity_service_accounts'
+down_revision = '0009_identity_archive'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'service_accounts',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('secret_hash', sa.String(length=128), nullable=False),
+        sa.Column('role', postgresql.ENUM(name='identity_role', create_type=False), nullable=False),
+        sa.Column(
+            'scopes', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default=sa.text("'[]'::jsonb")
+        ),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.text('TRUE')),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        sa.ForeignKeyConstraint(
+            ('tenant_id',),
+            ['identity.tenants.id'],
+            name='fk_service_accounts_tenant_id_tenants',
+            ondelete='CASCADE',
+        ),
+        schema='identity',
+    )
+    op.create_index('ix_identity_service_accounts_tenant', 'service_accounts', ['tenant_id'], schema='identity')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_identity_service_accounts_tenant', table_name='service_accounts', schema='identity')
+    op.drop_table('service_accounts', schema='identity')
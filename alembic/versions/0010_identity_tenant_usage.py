@@ -0,0 +1,40 @@
+"""Add per-tenant usage buckets and the applied-batch log used to make metering flushes idempotent."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = '0011_identity_tenant_usage'
+down_revision = '0010_identity_service_accounts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tenant_usage',
+        sa.Column('tenant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('metric', sa.String(length=32), nullable=False),
+        sa.Column('bucket_start', sa.TIMESTAMP(timezone=False), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default=sa.text('0')),
+        sa.Column('sketch', sa.LargeBinary(), nullable=True),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        # The primary key doubles as the upsert target and serves per-tenant range queries.
+        sa.PrimaryKeyConstraint('tenant_id', 'metric', 'bucket_start', name='pk_tenant_usage'),
+        schema='identity',
+    )
+    op.create_table(
+        'usage_flushes',
+        sa.Column('batch_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('applied_at', sa.TIMESTAMP(timezone=False), nullable=False, server_default=func.now()),
+        schema='identity',
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('usage_flushes', schema='identity')
+    op.drop_table('tenant_usage', schema='identity')
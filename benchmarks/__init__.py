@@ -0,0 +1,4 @@
+"""Micro-benchmarks and load harness for the identity hot paths.
+
+Run from the repository root, e.g. `uv run python -m benchmarks.micro` or `uv run python -m benchmarks.load`.
+"""
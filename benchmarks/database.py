@@ -0,0 +1,159 @@
+"""Benchmark database setup: a throwaway SQLite stand-in or a migrated Postgres, seeded in bulk."""
+
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+
+SQLITE_URL = 'sqlite://'  # a throwaway file database; in-memory SQLite cannot serve concurrent sessions
+BENCHMARK_PASSWORD = 'BenchPassw0rd!'
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@dataclass(frozen=True)
+class SeededUser:
+    id: UUID
+    email: str
+    tenant_id: UUID
+
+
+@dataclass(frozen=True)
+class SeedData:
+    tenants: list[UUID]
+    members: list[SeededUser]
+    loners: list[UUID]  # users without memberships, used to benchmark membership creation
+
+
+def configure_environment(database_url: str) -> None:
+    """Point the application at `database_url`; must run before the app reads its settings."""
+    os.environ['POSTGRES_URL'] = database_url
+    # Audit entries would only pile up in the in-process buffer without a broker.
+    os.environ.setdefault('AUDIT_ENABLED', 'false')
+    # A few clients replaying logins and registrations would otherwise measure the rate limiter's 429s.
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # Membership grants go through the internal token, which is disabled while it is left at its default.
+    os.environ.setdefault('INTERNAL_AUTH_TOKEN', 'benchmark-internal-token')
+
+    from core.config import get_settings
+
+    get_settings.cache_clear()
+
+
+def _sqlite_file_url(database_url: str) -> str:
+    if database_url not in ('sqlite://', 'sqlite:///:memory:'):
+        return database_url
+    return f'sqlite:///{Path(tempfile.mkdtemp(prefix="accentra-bench-")) / "main.db"}'
+
+
+def prepare_database(database_url: str) -> Engine:
+    """Create the schema: `create_all` on SQLite (tables only), Alembic migrations on Postgres."""
+    database_url = _sqlite_file_url(database_url)
+    configure_environment(database_url)
+
+    from sqlmodel import SQLModel
+
+    from core.db import get_engine
+    from users.models import (
+        IDENTITY_SCHEMA,  # also registers the tables on SQLModel.metadata
+    )
+
+    engine = get_engine()
+    if engine.dialect.name == 'sqlite':
+        # SQLite has no schemas; a sibling database file attached under the schema name stands in for it.
+        identity_path = f'{engine.url.database}.{IDENTITY_SCHEMA}'
+
+        @event.listens_for(engine, 'connect')
+        def attach_identity_schema(dbapi_connection, _record) -> None:
+            dbapi_connection.execute(f"ATTACH DATABASE '{identity_path}' AS {IDENTITY_SCHEMA}")
+
+        SQLModel.metadata.create_all(engine)
+        return engine
+
+    from alembic import command
+    from alembic.config import Config
+
+    os.environ.setdefault('ALEMBIC_DATABASE_URL', database_url)
+    config = Config(str(REPO_ROOT / 'alembic.ini'))
+    config.set_main_option('script_location', str(REPO_ROOT / 'alembic'))
+    command.upgrade(config, 'head')
+    return engine
+
+
+def seed(
+    engine: Engine,
+    *,
+    tenants: int,
+    users_per_tenant: int,
+    loners: int = 0,
+    rng: random.Random | None = None,
+) -> SeedData:
+    """Bulk insert tenants, members and membership-less users sharing one precomputed password hash."""
+    from users.models import Membership, Role, Tenant, User
+    from users.security import hash_password
+
+    rng = rng or random.Random(0)
+    hashed = hash_password(BENCHMARK_PASSWORD)
+    now = datetime.utcnow()
+    run = uuid4().hex[:8]
+
+    tenant_rows = [
+        {'id': uuid4(), 'name': f'bench-{run}-{index}', 'plan': {'tier': rng.choice(['free', 'pro', 'enterprise'])}}
+        for index in range(tenants)
+    ]
+    user_rows = []
+    membership_rows = []
+    members: list[SeededUser] = []
+    for tenant in tenant_rows:
+        for index in range(users_per_tenant):
+            user_id = uuid4()
+            email = f'user{index}-{user_id.hex[:12]}@bench-{run}.example.com'
+            user_rows.append({'id': user_id, 'email': email, 'full_name': f'Bench User {index}'})
+            membership_rows.append(
+                {
+                    'membership_id': uuid4(),
+                    'user_id': user_id,
+                    'tenant_id': tenant['id'],
+                    'role': rng.choice(list(Role)),
+                    'scopes': rng.sample(['users:read', 'users:manage', 'billing:read', 'reports:read'], k=2),
+                    'plan': tenant['plan'],
+                }
+            )
+            members.append(SeededUser(user_id, email, tenant['id']))
+    loner_rows = [
+        {'id': uuid4(), 'email': f'loner{index}-{run}@bench.example.com', 'full_name': None} for index in range(loners)
+    ]
+
+    timestamps = {'created_at': now, 'updated_at': now}
+    with engine.begin() as connection:
+        connection.execute(insert(Tenant.__table__), [{**row, **timestamps} for row in tenant_rows])  # type: ignore[arg-type]
+        connection.execute(
+            insert(User.__table__),  # type: ignore[arg-type]
+            [{**row, 'hashed_password': hashed, 'is_active': True, **timestamps} for row in user_rows + loner_rows],
+        )
+        if membership_rows:
+            connection.execute(
+                insert(Membership.__table__),  # type: ignore[arg-type]
+                [{**row, **timestamps} for row in membership_rows],
+            )
+
+    return SeedData([row['id'] for row in tenant_rows], members, [row['id'] for row in loner_rows])
+
+
+__all__ = [
+    'SQLITE_URL',
+    'BENCHMARK_PASSWORD',
+    'SeededUser',
+    'SeedData',
+    'configure_environment',
+    'prepare_database',
+    'seed',
+]
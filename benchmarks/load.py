@@ -0,0 +1,165 @@
+"""End-to-end load harness driving login, `/users/me`, registration and membership creation.
+
+Requests go through the full ASGI stack in-process (no network), with `--concurrency` requests in flight:
+
+    uv run python -m benchmarks.load --users-per-tenant 200 --requests 2000
+    uv run python -m benchmarks.load --database-url postgresql://... --baseline benchmarks/baselines/load.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.database import (
+    BENCHMARK_PASSWORD,
+    SQLITE_URL,
+    SeedData,
+    prepare_database,
+    seed,
+)
+from benchmarks.reporting import Summary, report, summarize
+
+Operation = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+SCENARIOS = ('login', 'me', 'register', 'membership')
+WARMUP_REQUESTS = 20
+
+
+def build_operations(data: SeedData, rng: random.Random) -> dict[str, Operation]:
+    from core.config import get_settings
+    from users.authorization import INTERNAL_TOKEN_HEADER
+    from users.models import Role
+    from users.security import create_access_token
+
+    # Tokens are issued up front so `/users/me` measures token verification and lookups only.
+    tokens = [
+        create_access_token(subject=member.id, tenant_id=member.tenant_id, role=Role.viewer, scopes=['users:read'])
+        for member in rng.sample(data.members, k=min(len(data.members), 500))
+    ]
+    # Every (loner, tenant) pair can be joined exactly once.
+    membership_targets = itertools.product(data.loners, data.tenants)
+    registrations = itertools.count()
+    run = uuid4().hex[:8]
+    # Membership grants are made as a trusted internal caller, the way a provisioning service would.
+    internal = {INTERNAL_TOKEN_HEADER: get_settings().internal_auth_token.get_secret_value()}
+
+    async def login(client: httpx.AsyncClient) -> httpx.Response:
+        member = rng.choice(data.members)
+        payload = {'email': member.email, 'password': BENCHMARK_PASSWORD, 'tenant_id': str(member.tenant_id)}
+        return await client.post('/identity/auth/login', json=payload)
+
+    async def me(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get('/identity/users/me', headers={'Authorization': f'Bearer {rng.choice(tokens)}'})
+
+    async def register(client: httpx.AsyncClient) -> httpx.Response:
+        payload = {
+            'email': f'new{next(registrations)}-{run}@bench.example.com',
+            'password': BENCHMARK_PASSWORD,
+            'full_name': 'New',
+        }
+        return await client.post('/identity/users', json=payload)
+
+    async def membership(client: httpx.AsyncClient) -> httpx.Response:
+        user_id, tenant_id = next(membership_targets)
+        payload = {'tenant_id': str(tenant_id), 'role': 'viewer', 'scopes': ['users:read']}
+        return await client.post(f'/identity/users/{user_id}/memberships', json=payload, headers=internal)
+
+    return {'login': login, 'me': me, 'register': register, 'membership': membership}
+
+
+async def drive(app: Any, name: str, operation: Operation, *, requests: int, concurrency: int) -> Summary:
+    durations: list[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while next(counter) < requests:
+            start = perf_counter()
+            response = await operation(client)
+            elapsed = perf_counter() - start
+            # Rejected requests are counted but kept out of the latency and throughput figures.
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                durations.append(elapsed)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        started = perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall_seconds = perf_counter() - started
+    return summarize(name, durations, wall_seconds=wall_seconds, errors=errors)
+
+
+def run(
+    *,
+    database_url: str,
+    tenants: int,
+    users_per_tenant: int,
+    requests: int,
+    concurrency: int,
+    scenarios: list[str],
+    seed_value: int,
+) -> list[Summary]:
+    engine = prepare_database(database_url)
+    rng = random.Random(seed_value)
+    # Membership creation consumes one (user, tenant) pair per request.
+    loners = -(-(requests + WARMUP_REQUESTS) // max(tenants, 1)) if 'membership' in scenarios else 0
+    data = seed(engine, tenants=tenants, users_per_tenant=users_per_tenant, loners=loners, rng=rng)
+
+    from main import create_app
+
+    app = create_app()
+    operations = build_operations(data, rng)
+
+    async def run_all() -> list[Summary]:
+        summaries = []
+        for name in scenarios:
+            # Short warm-up so connection pools and caches are populated before measuring.
+            await drive(app, f'{name} (warm-up)', operations[name], requests=WARMUP_REQUESTS, concurrency=1)
+            summaries.append(await drive(app, name, operations[name], requests=requests, concurrency=concurrency))
+        return summaries
+
+    return asyncio.run(run_all())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Drive the Accentra identity API and report latency percentiles.')
+    parser.add_argument('--database-url', default=SQLITE_URL, help='Target database (default: throwaway SQLite).')
+    parser.add_argument('--tenants', type=int, default=20)
+    parser.add_argument('--users-per-tenant', type=int, default=250)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Repeat to select (default: all).')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data and request mix.')
+    parser.add_argument('--baseline', type=Path, help='Compare against this baseline file.')
+    parser.add_argument('--save-baseline', type=Path, help='Write the results as a new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed regression as a fraction.')
+    args = parser.parse_args(argv)
+
+    summaries = run(
+        database_url=args.database_url,
+        tenants=args.tenants,
+        users_per_tenant=args.users_per_tenant,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        scenarios=args.scenario or list(SCENARIOS),
+        seed_value=args.seed,
+    )
+    return report('load', summaries, baseline=args.baseline, save=args.save_baseline, tolerance=args.tolerance)
+
+
+if __name__ == '__main__':  # pragma: no cover - CLI entry point
+    sys.exit(main())
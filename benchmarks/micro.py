@@ -0,0 +1,99 @@
+"""Micro-benchmarks for password hashing, JWT handling and user serialisation.
+
+uv run python -m benchmarks.micro --save-baseline benchmarks/baselines/micro.json
+uv run python -m benchmarks.micro --baseline benchmarks/baselines/micro.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from time import perf_counter
+
+from benchmarks.database import BENCHMARK_PASSWORD, SQLITE_URL, prepare_database, seed
+from benchmarks.reporting import Summary, report, summarize
+
+
+def measure(name: str, fn: Callable[[], object], *, iterations: int, warmup: int = 3) -> Summary:
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(iterations):
+        start = perf_counter()
+        fn()
+        durations.append(perf_counter() - start)
+    return summarize(name, durations)
+
+
+def run(*, database_url: str, scale: float) -> list[Summary]:
+    engine = prepare_database(database_url)
+    data = seed(engine, tenants=5, users_per_tenant=20)
+
+    from sqlmodel import Session
+
+    from users.api import serialize_user
+    from users.models import Membership, Role
+    from users.security import (
+        create_access_token,
+        decode_access_token,
+        hash_password,
+        verify_password,
+    )
+    from users.service import get_user
+
+    member = data.members[0]
+    encoded = hash_password(BENCHMARK_PASSWORD)
+
+    def issue() -> str:
+        return create_access_token(
+            subject=member.id,
+            tenant_id=member.tenant_id,
+            role=Role.editor,
+            scopes=['users:read', 'reports:read'],
+            plan={'tier': 'pro'},
+        )
+
+    token = issue()
+
+    # Give the serialised user several memberships, as a multi-tenant account would have.
+    with Session(engine) as session:
+        for tenant_id in data.tenants:
+            if tenant_id != member.tenant_id:
+                session.add(Membership(user_id=member.id, tenant_id=tenant_id, role=Role.viewer, scopes=['users:read']))
+        session.commit()
+
+    def serialize() -> object:
+        with Session(engine) as session:
+            user = get_user(session, member.id)
+            assert user is not None
+            return serialize_user(session, user)
+
+    def iterations(count: int) -> int:
+        return max(1, int(count * scale))
+
+    return [
+        measure('hash_password', lambda: hash_password(BENCHMARK_PASSWORD), iterations=iterations(20)),
+        measure('verify_password', lambda: verify_password(BENCHMARK_PASSWORD, encoded), iterations=iterations(20)),
+        measure('create_access_token', issue, iterations=iterations(5_000)),
+        measure('decode_access_token', lambda: decode_access_token(token), iterations=iterations(5_000)),
+        measure('serialize_user', serialize, iterations=iterations(1_000)),
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Run the Accentra identity micro-benchmarks.')
+    parser.add_argument('--database-url', default=SQLITE_URL, help='Database for serialize_user (default: SQLite).')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every iteration count.')
+    parser.add_argument('--baseline', type=Path, help='Compare against this baseline file.')
+    parser.add_argument('--save-baseline', type=Path, help='Write the results as a new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed regression as a fraction.')
+    args = parser.parse_args(argv)
+
+    summaries = run(database_url=args.database_url, scale=args.scale)
+    return report('micro', summaries, baseline=args.baseline, save=args.save_baseline, tolerance=args.tolerance)
+
+
+if __name__ == '__main__':  # pragma: no cover - CLI entry point
+    sys.exit(main())
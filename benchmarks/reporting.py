@@ -0,0 +1,137 @@
+"""Latency summaries and baseline comparison shared by the micro-benchmarks and the load harness."""
+
+from __future__ import annotations
+
+import json
+import platform
+import sys
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Summary:
+    name: str
+    count: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline if self.baseline else float('inf')
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.metric} {self.baseline:.3f} -> {self.current:.3f} ({self.change:+.1%})'
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Linearly interpolated percentile of an ascending list (`fraction` in [0, 1])."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def summarize(name: str, durations: list[float], *, wall_seconds: float | None = None, errors: int = 0) -> Summary:
+    """Summarise per-operation durations (seconds); throughput uses `wall_seconds` when operations overlapped."""
+    ordered = sorted(durations)
+    elapsed = wall_seconds if wall_seconds is not None else sum(ordered)
+    return Summary(
+        name=name,
+        count=len(ordered),
+        errors=errors,
+        throughput=len(ordered) / elapsed if elapsed > 0 else 0.0,
+        p50_ms=percentile(ordered, 0.50) * 1000,
+        p95_ms=percentile(ordered, 0.95) * 1000,
+        p99_ms=percentile(ordered, 0.99) * 1000,
+    )
+
+
+def format_table(summaries: list[Summary]) -> str:
+    lines = [f'{"benchmark":<28} {"ops":>7} {"errors":>6} {"ops/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}']
+    for item in summaries:
+        lines.append(
+            f'{item.name:<28} {item.count:>7} {item.errors:>6} {item.throughput:>10.1f} '
+            f'{item.p50_ms:>9.3f} {item.p95_ms:>9.3f} {item.p99_ms:>9.3f}'
+        )
+    return '\n'.join(lines)
+
+
+def save_baseline(path: Path, suite: str, summaries: list[Summary], **metadata: Any) -> None:
+    document = {
+        'suite': suite,
+        'recorded_at': datetime.now(UTC).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'machine': platform.platform(),
+        **metadata,
+        'results': [asdict(item) for item in summaries],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2) + '\n')
+
+
+def load_baseline(path: Path) -> dict[str, Summary]:
+    document = json.loads(path.read_text())
+    return {item['name']: Summary(**item) for item in document['results']}
+
+
+def compare(current: list[Summary], baseline: dict[str, Summary], *, tolerance: float) -> list[Regression]:
+    """Report benchmarks whose p95 latency grew, or whose throughput fell, by more than `tolerance` (a fraction)."""
+    regressions: list[Regression] = []
+    for item in current:
+        reference = baseline.get(item.name)
+        if reference is None:
+            continue
+        if reference.p95_ms and item.p95_ms > reference.p95_ms * (1 + tolerance):
+            regressions.append(Regression(item.name, 'p95_ms', reference.p95_ms, item.p95_ms))
+        if reference.throughput and item.throughput < reference.throughput * (1 - tolerance):
+            regressions.append(Regression(item.name, 'throughput', reference.throughput, item.throughput))
+    return regressions
+
+
+def report(suite: str, summaries: list[Summary], *, baseline: Path | None, save: Path | None, tolerance: float) -> int:
+    """Print results, optionally compare with and/or record a baseline; returns the process exit code."""
+    print(format_table(summaries))
+    exit_code = 0
+    if baseline is not None:
+        regressions = compare(summaries, load_baseline(baseline), tolerance=tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {tolerance:.0%} of {baseline}:', file=sys.stderr)
+            for regression in regressions:
+                print(f'  {regression}', file=sys.stderr)
+            exit_code = 1
+        else:
+            print(f'\nNo regressions beyond {tolerance:.0%} of {baseline}.')
+    if save is not None:
+        save_baseline(save, suite, summaries)
+        print(f'Baseline written to {save}.')
+    return exit_code
+
+
+__all__ = [
+    'Summary',
+    'Regression',
+    'percentile',
+    'summarize',
+    'format_table',
+    'save_baseline',
+    'load_baseline',
+    'compare',
+    'report',
+]
@@ -1,8 +1,32 @@
-from tenauth.tenancy import dsn_with_tenant
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from tenauth.tenancy import dsn_with_tenant
+
+    from core.config import get_settings
+    from core.logging import configure_logging
+    from core.observability import init_observability
+
+# Resolved on first attribute access so `import core` does not pull in settings, tenauth or OpenTelemetry.
+_EXPORTS = {
+    'get_settings': 'core.config',
+    'configure_logging': 'core.logging',
+    'init_observability': 'core.observability',
+    'dsn_with_tenant': 'tenauth.tenancy',
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
 
-from core.config import get_settings
-from core.logging import configure_logging
-from core.observability import init_observability
 
 __all__ = [
     'get_settings',
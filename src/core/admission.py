@@ -0,0 +1,170 @@
+"""Admission control: bounded concurrency per route class with queue deadlines and fast 503 rejections."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+from dataclasses import dataclass
+from time import perf_counter
+
+from core.config import Settings, get_settings
+from core.instrumentation import (
+    ASGIApp,
+    Receive,
+    Scope,
+    Send,
+    add_count,
+    record_duration,
+)
+
+AUTH = 'auth'
+READ = 'read'
+WRITE = 'write'
+_READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, route_class: str, reason: str) -> None:
+        super().__init__(f'{route_class} admission rejected: {reason}')
+        self.route_class = route_class
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class GateStats:
+    name: str
+    limit: int
+    in_flight: int
+    waiting: int
+
+
+class AdmissionGate:
+    """Counting semaphore that refuses to queue more than `max_waiting` callers or wait past a deadline."""
+
+    def __init__(self, name: str, limit: int, max_waiting: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(limit)
+        self._waiting = 0
+
+    async def acquire(self, deadline: float) -> None:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self._waiting >= self.max_waiting:
+            raise AdmissionRejected(self.name, 'queue_full')
+        timeout = deadline - perf_counter()
+        if timeout <= 0:
+            raise AdmissionRejected(self.name, 'deadline')
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except TimeoutError:
+            raise AdmissionRejected(self.name, 'deadline') from None
+        finally:
+            self._waiting -= 1
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    def stats(self) -> GateStats:
+        in_flight = self.limit - self._semaphore._value  # the semaphore exposes no public counter
+        return GateStats(self.name, self.limit, in_flight, self._waiting)
+
+
+def _class_limit(total: int, share: float) -> int:
+    return max(1, min(total, math.ceil(total * share)))
+
+
+class AdmissionControlMiddleware:
+    """Admit requests through a per-class gate and then the shared capacity gate, or fail fast with 503.
+
+    Route classes: `auth` (password hashing routes, capped at `admission_auth_share` of capacity), `write` (other
+    mutating methods) and `read`. Requests that cannot get a slot within `admission_queue_timeout_ms`, or that find
+    the class queue full, are rejected before they occupy a worker thread or a database connection.
+    """
+
+    def __init__(self, app: ASGIApp, settings: Settings | None = None) -> None:
+        self.app = app
+        settings = settings or get_settings()
+        total = settings.admission_max_concurrency
+        self.capacity = AdmissionGate('total', total, settings.admission_max_queue)
+        self.gates = {
+            AUTH: AdmissionGate(AUTH, _class_limit(total, settings.admission_auth_share), settings.admission_max_queue),
+            WRITE: AdmissionGate(
+                WRITE, _class_limit(total, settings.admission_write_share), settings.admission_max_queue
+            ),
+            READ: AdmissionGate(READ, _class_limit(total, settings.admission_read_share), settings.admission_max_queue),
+        }
+        self.auth_routes = frozenset(settings.admission_auth_routes)
+        self.exempt_paths = frozenset(settings.admission_exempt_paths)
+        self.queue_timeout = settings.admission_queue_timeout_ms / 1000
+        self.retry_after = str(settings.admission_retry_after_seconds)
+
+    def classify(self, method: str, path: str) -> str:
+        if f'{method} {path}' in self.auth_routes:
+            return AUTH
+        return READ if method in _READ_METHODS else WRITE
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({'detail': 'Service overloaded, retry later'}).encode()
+        headers: list[tuple[bytes, bytes]] = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'retry-after', self.retry_after.encode()),
+        ]
+        await send({'type': 'http.response.start', 'status': 503, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def stats(self) -> list[GateStats]:
+        return [gate.stats() for gate in (*self.gates.values(), self.capacity)]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['path'] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.classify(scope['method'], scope['path'].rstrip('/') or '/')
+        gate = self.gates[route_class]
+        started = perf_counter()
+        deadline = started + self.queue_timeout
+        try:
+            await gate.acquire(deadline)
+            try:
+                await self.capacity.acquire(deadline)
+            except AdmissionRejected:
+                gate.release()
+                raise
+        except AdmissionRejected as exc:
+            add_count('accentra.admission.rejected', 1, {'route.class': route_class, 'reason': exc.reason})
+            await self._reject(send)
+            return
+
+        record_duration('accentra.admission.queue_time', perf_counter() - started, {'route.class': route_class})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.capacity.release()
+            gate.release()
+
+
+def size_threadpool(settings: Settings | None = None) -> None:
+    """Match the worker threadpool to the admitted concurrency so admitted requests never queue for a thread."""
+    import anyio.to_thread
+
+    settings = settings or get_settings()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.admission_max_concurrency
+
+
+__all__ = [
+    'AUTH',
+    'READ',
+    'WRITE',
+    'AdmissionRejected',
+    'GateStats',
+    'AdmissionGate',
+    'AdmissionControlMiddleware',
+    'size_threadpool',
+]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+@dataclass(frozen=True)
+class BufferStats:
+    size: int
+    capacity: int
+    accepted: int
+    dropped: int
+
+
+class BoundedBuffer(Generic[T]):
+    """Thread-safe FIFO with a hard capacity.
+
+    `offer` never blocks the caller: when the buffer is full the item is rejected and counted as dropped, which is the
+    backpressure signal for producers on the request path.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self._capacity = capacity
+        self._items: deque[T] = deque()
+        self._lock = threading.Lock()
+        self._accepted = 0
+        self._dropped = 0
+
+    def offer(self, item: T) -> bool:
+        with self._lock:
+            if len(self._items) >= self._capacity:
+                self._dropped += 1
+                return False
+            self._items.append(item)
+            self._accepted += 1
+            return True
+
+    def drain(self, max_items: int) -> list[T]:
+        with self._lock:
+            count = min(max_items, len(self._items))
+            return [self._items.popleft() for _ in range(count)]
+
+    def record_dropped(self, count: int) -> None:
+        """Account for items that were accepted but could not be delivered downstream."""
+        with self._lock:
+            self._dropped += count
+
+    def stats(self) -> BufferStats:
+        with self._lock:
+            return BufferStats(
+                size=len(self._items),
+                capacity=self._capacity,
+                accepted=self._accepted,
+                dropped=self._dropped,
+            )
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class BackgroundFlusher:
+    """Run `flush` on a daemon thread every `interval` seconds or as soon as `wake` is called."""
+
+    def __init__(self, name: str, flush: Callable[[], object], *, interval: float) -> None:
+        self._name = name
+        self._flush = flush
+        self._interval = interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _flush_safely(self) -> None:
+        try:
+            self._flush()
+        except Exception:  # the flusher thread must survive downstream outages
+            logger.exception('Background flush failed | flusher=%s', self._name)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self._flush_safely()
+            if self._stopping.is_set():
+                return
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def stop(self, *, timeout: float = 5.0) -> None:
+        """Stop the thread after a final flush."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        thread.join(timeout)
+        self._thread = None
+
+
+__all__ = ['BoundedBuffer', 'BufferStats', 'BackgroundFlusher']
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hmac
 from functools import lru_cache
 from pathlib import Path
 from typing import Literal
@@ -7,6 +8,9 @@ from typing import Literal
 from pydantic import AliasChoices, Field, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Well-known default of `internal_auth_token`; only honoured when `env` is `development`.
+DEV_INTERNAL_AUTH_TOKEN = 'dev-internal-token'
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -23,7 +27,26 @@ class Settings(BaseSettings):
 
     # Accept several common environment variable names for DB/Redis URLs
     postgres_url: SecretStr = Field(validation_alias=AliasChoices('POSTGRES_URL', 'DATABASE_URL', 'POSTGRESQL_URL'))
-    redis_url: SecretStr = Field(validation_alias=AliasChoices('REDIS_URL', 'REDIS_URI'))
+    redis_url: SecretStr | None = Field(default=None, validation_alias=AliasChoices('REDIS_URL', 'REDIS_URI'))
+    # SQLAlchemy compiled-statement cache entries per engine, and executions before psycopg 3 prepares a statement
+    # server-side (None disables; needed behind transaction-pooling PgBouncer). Ignored by psycopg2.
+    db_query_cache_size: int = 1000
+    db_prepare_threshold: int | None = 5
+    # Slow-query log (`core.db`): statements slower than the threshold are logged, and a sample of slow reads on
+    # Postgres gets an `EXPLAIN (ANALYZE, BUFFERS)` captured on a background thread
+    slow_query_log_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+    slow_query_explain_sample_ratio: float = Field(default=0.1, ge=0.0, le=1.0)
+    slow_query_explain_interval_seconds: float = 300.0
+    slow_query_explain_timeout_ms: int = 5000
+    slow_query_explain_queue_size: int = 100
+    # Shared Redis pool (`core.redis`), per process
+    redis_max_connections: int = 20
+    redis_socket_timeout_ms: int = 1000
+    redis_connect_timeout_ms: int = 500
+    redis_health_check_interval_seconds: int = 30
+    redis_health_cache_seconds: float = 5.0
+    redis_pipeline_chunk_size: int = 500
 
     # JWT/Auth configuration
     jwt_secret_key: SecretStr = SecretStr('dev-secret-key')
@@ -32,13 +55,129 @@ class Settings(BaseSettings):
     jwt_issuer: str | None = None
     jwt_audience: str | None = None
 
+    # Service accounts (client-credentials grant)
+    service_account_secret_key: SecretStr | None = None  # HMAC key for client secrets; defaults to jwt_secret_key
+    service_token_cache_seconds: int = 300
+    service_token_min_remaining_seconds: int = 120
+    service_token_cache_size: int = 10_000
+
     log_level: Literal['CRITICAL', 'ERROR', 'WARNING', 'INFO', 'DEBUG'] = 'INFO'
+    log_format: Literal['json', 'text'] = 'json'
+    log_queue_size: int = 10_000
+    log_queue_policy: Literal['drop', 'block'] = 'drop'
     otlp_endpoint: str | None = None
     otlp_headers: str | None = None
     otel_logs_enabled: bool = False
     otel_traces_enabled: bool = True
     otel_metrics_enabled: bool = True
-    internal_auth_token: SecretStr = SecretStr('dev-internal-token')
+    otel_instrumentation_enabled: bool = True
+    # Trace sampling and exporter pipeline
+    otel_traces_sample_ratio: float = Field(default=1.0, ge=0.0, le=1.0)
+    otel_traces_excluded_routes: list[str] = ['/healthz', '/readyz']
+    otel_traces_always_sample_errors: bool = True
+    otel_bsp_max_queue_size: int = 2048
+    otel_bsp_max_export_batch_size: int = 512
+    otel_bsp_schedule_delay_ms: int = 5000
+    otel_bsp_export_timeout_ms: int = 30_000
+    otel_metric_export_interval_ms: int = 60_000
+    otel_metric_export_timeout_ms: int = 30_000
+    otel_metric_max_export_batch_size: int | None = None
+    # Readiness probe (`/readyz`), refreshed by a background checker
+    readiness_check_interval_seconds: float = 5.0
+    readiness_stale_after_seconds: float = 15.0
+    readiness_required_checks: list[str] = ['database', 'redis']
+    # `X-Internal-Token` secret; empty, or left at the default outside development, disables internal callers
+    internal_auth_token: SecretStr = SecretStr(DEV_INTERNAL_AUTH_TOKEN)
+
+    # Opt-in live diagnosis (`core.profiling`): Server-Timing headers and `POST /internal/profile`
+    profiling_enabled: bool = False
+    profiling_max_seconds: float = 60.0
+    profiling_sample_interval_ms: int = 10
+
+    # Prefork production server (`accentra-serve`)
+    server_host: str = Field(default='0.0.0.0', validation_alias=AliasChoices('SERVER_HOST', 'HOST'))
+    server_port: int = Field(default=8000, validation_alias=AliasChoices('SERVER_PORT', 'PORT'))
+    server_workers: int | None = None
+    server_preload: bool = True
+    server_max_requests: int = 0
+    server_max_requests_jitter: int = 0
+    server_timeout_seconds: int = 30
+    server_graceful_timeout_seconds: int = 30
+    server_keepalive_seconds: int = 5
+
+    # Admission control (per route class concurrency caps with queue deadlines)
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 40
+    admission_auth_share: float = Field(default=0.25, gt=0.0, le=1.0)
+    admission_write_share: float = Field(default=0.5, gt=0.0, le=1.0)
+    admission_read_share: float = Field(default=1.0, gt=0.0, le=1.0)
+    admission_max_queue: int = 100
+    admission_queue_timeout_ms: int = 1000
+    admission_retry_after_seconds: int = 1
+    admission_auth_routes: list[str] = [
+        'POST /identity/auth/login',
+        'POST /identity/users',
+        'POST /identity/provision',
+    ]
+    admission_exempt_paths: list[str] = ['/healthz', '/readyz']
+
+    # Rate limiting (Redis token buckets with an in-process pre-check)
+    rate_limit_enabled: bool = True
+    rate_limit_login_per_ip: str = '30/minute'
+    rate_limit_login_per_email: str = '10/minute'
+    rate_limit_register_per_ip: str = '20/minute'
+    rate_limit_tenant_default: str = '600/minute'
+    rate_limit_tenant_plans: dict[str, str] = {'free': '300/minute', 'pro': '1200/minute', 'enterprise': '6000/minute'}
+    rate_limit_login_max_failures: int = 5
+    rate_limit_lockout_seconds: int = 900
+    rate_limit_local_fraction: float = Field(default=0.1, ge=0.0, le=1.0)
+    rate_limit_local_ttl_ms: int = 1000
+    rate_limit_redis_retry_seconds: float = 5.0
+    rate_limit_local_max_keys: int = 10_000
+
+    # Coalesce concurrent identical identity lookups into one query
+    singleflight_enabled: bool = True
+
+    # Tenant export: rows fetched per round-trip from the server-side cursor
+    export_batch_size: int = 1000
+
+    # Identity change feed (transactional outbox relayed to Redis Streams)
+    change_stream_name: str = 'identity:changes'
+    change_stream_maxlen: int = 100_000
+    change_relay_batch_size: int = 500
+    # Each API process enqueues `relay_identity_changes` this often
+    change_relay_enabled: bool = True
+    change_relay_interval_seconds: float = 5.0
+    change_feed_settle_ms: int = 1000
+
+    # Audit trail (buffered in-process, written in batches by a Dramatiq actor)
+    audit_enabled: bool = True
+    audit_buffer_size: int = 10_000
+    audit_flush_batch_size: int = 2_000
+    audit_flush_interval_seconds: float = 1.0
+    audit_insert_page_size: int = 5_000
+
+    # Per-tenant usage metering (aggregated in memory, written by the Dramatiq actor `write_usage`)
+    metering_enabled: bool = True
+    metering_bucket_seconds: int = 3600
+    metering_flush_interval_seconds: float = 10.0
+    metering_flush_batch_size: int = 500
+    metering_hll_precision: int = Field(default=12, ge=4, le=16)
+
+    # Cold archiving of inactive and soft-deleted users (Dramatiq actor `archive_inactive_users`)
+    archive_inactive_after_days: int = 180
+    archive_batch_size: int = 500
+
+    @property
+    def internal_auth_enabled(self) -> bool:
+        token = self.internal_auth_token.get_secret_value()
+        return bool(token) and (token != DEV_INTERNAL_AUTH_TOKEN or self.env == 'development')
+
+    def internal_token_matches(self, supplied: str | None) -> bool:
+        """Whether `supplied` is the configured internal token; always False while internal auth is disabled."""
+        if not supplied or not self.internal_auth_enabled:
+            return False
+        return hmac.compare_digest(supplied.encode(), self.internal_auth_token.get_secret_value().encode())
 
     @property
     def pg_vector_url(self) -> SecretStr:
@@ -1,18 +1,276 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import random
+import re
 from collections.abc import Iterator
 from contextlib import contextmanager
-from typing import Generator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, Any, Generator
+from uuid import UUID
 
-from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, ExceptionContext
 from sqlalchemy.pool import StaticPool
 from sqlmodel import Session, create_engine
-from tenauth.schemas import AccessContext
 
+from core.buffering import BackgroundFlusher, BoundedBuffer
 from core.config import get_settings
+from core.instrumentation import (
+    ASGIApp,
+    Receive,
+    Scope,
+    Send,
+    add_count,
+    get_tracer,
+    record_duration,
+)
+from core.profiling import add_phase_time
+
+if TYPE_CHECKING:
+    from tenauth.schemas import AccessContext
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('core.db.slow_queries')
 
 _engine: Engine | None = None
+_statement_timing_installed = False
+
+
+def _prepared_statement_args(url: str, prepare_threshold: int | None) -> dict[str, object]:
+    """Server-side prepared statements for drivers that support them (psycopg 3); psycopg2 has no such option."""
+    if url.startswith('postgresql+psycopg://'):
+        return {'prepare_threshold': prepare_threshold}
+    return {}
+
+
+@dataclass
+class StatementContext:
+    """Where the statements of the current request come from, for the slow-query log."""
+
+    scope: Scope | None = None
+    tenant_id: UUID | None = None
+
+    @property
+    def route(self) -> str | None:
+        if self.scope is None:
+            return None
+        route = self.scope.get('route')
+        return getattr(route, 'path', None) or '<unmatched>'
+
+
+_statement_context: ContextVar[StatementContext | None] = ContextVar('accentra_statement_context', default=None)
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w$.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?')
+_IN_LIST = re.compile(r'\bIN \(\?(?:, \?)+\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'(\(\?(?:, \?)*\))(?:, \(\?(?:, \?)*\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def normalize_statement(statement: str) -> tuple[str, str]:
+    """Statement text with literals and bind parameters replaced by `?`, and its 16-hex-digit fingerprint.
+
+    Expanded `IN` lists collapse to `IN (?)` and multi-row `VALUES` to their first row, so one query shape has one fingerprint
+    whatever the number of parameters. Results are cached: SQLAlchemy renders the same text for each execution.
+    """
+    normalized = _WHITESPACE.sub(' ', statement).strip()
+    normalized = _STRING_LITERAL.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _IN_LIST.sub('IN (?)', normalized)
+    normalized = _VALUES_ROWS.sub(r'\1', normalized)
+    return normalized, hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+def redact_parameters(parameters: Any, executemany: bool = False) -> Any:
+    """Parameter names (or positions) with their types instead of values."""
+    if executemany:
+        return f'<{len(parameters)} rows>'
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _operation_name(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else 'UNKNOWN'
+
+
+def _before_cursor_execute(conn, cursor, statement: str, parameters, context, executemany: bool) -> None:
+    if context is None:
+        return
+    context._accentra_started = perf_counter()
+    tracer = get_tracer()
+    if tracer is not None:
+        from opentelemetry.trace import SpanKind
+
+        operation = _operation_name(statement)
+        context._accentra_span = tracer.start_span(
+            f'{operation} {conn.dialect.name}',
+            kind=SpanKind.CLIENT,
+            attributes={'db.system': conn.dialect.name, 'db.operation.name': operation, 'db.query.text': statement},
+        )
+
+
+@dataclass(frozen=True)
+class ExplainRequest:
+    fingerprint: str
+    statement: str
+    parameters: Any
+    elapsed: float
+    route: str | None
+    tenant_id: UUID | None
+
+
+_explain_buffer: BoundedBuffer[tuple[ExplainRequest, Engine]] | None = None
+_explain_flusher: BackgroundFlusher | None = None
+_explained_at: dict[str, float] = {}
+_DATA_MODIFYING = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE)\b', re.IGNORECASE
+)
+
+
+def _explainable(statement: str) -> bool:
+    # EXPLAIN ANALYZE runs the statement, so only plain reads are captured; writes and row locks would repeat.
+    return _operation_name(statement) in {'SELECT', 'WITH'} and _DATA_MODIFYING.search(statement) is None
+
+
+def explain_statement(engine: Engine, statement: str, parameters: Any, *, timeout_ms: int) -> str:
+    """`EXPLAIN (ANALYZE, BUFFERS)` of `statement` on its own connection, in a transaction that is rolled back.
+
+    Quoted constants in the plan (bound strings, UUIDs, timestamps) are replaced by `'?'`.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(slow_query_log=False)
+        transaction = conn.begin()
+        try:
+            conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+            rows = conn.exec_driver_sql(f'EXPLAIN (ANALYZE, BUFFERS) {statement}', parameters).all()
+        finally:
+            transaction.rollback()
+    # Plans print bound values as quoted constants in their conditions; redact them like the logged statement.
+    return _STRING_LITERAL.sub("'?'", '\n'.join(row[0] for row in rows))
+
+
+def capture_explains() -> None:
+    """Drain queued plan captures; runs on the `explain-capture` thread, never on the request path."""
+    if _explain_buffer is None:
+        return
+    timeout_ms = get_settings().slow_query_explain_timeout_ms
+    while requests := _explain_buffer.drain(10):
+        for request, engine in requests:
+            try:
+                plan = explain_statement(engine, request.statement, request.parameters, timeout_ms=timeout_ms)
+            except Exception:  # a failed capture must not stop the others
+                logger.warning('EXPLAIN capture failed | fingerprint=%s', request.fingerprint, exc_info=True)
+                continue
+            slow_query_logger.warning(
+                'Slow statement plan | fingerprint=%s duration_ms=%.1f route=%s tenant_id=%s\n%s',
+                request.fingerprint,
+                request.elapsed * 1000,
+                request.route,
+                request.tenant_id,
+                plan,
+            )
+
+
+def _offer_explain(request: ExplainRequest, engine: Engine) -> None:
+    """Queue a sampled plan capture; at most one per fingerprint per `slow_query_explain_interval_seconds`."""
+    global _explain_buffer, _explain_flusher
+    settings = get_settings()
+    if settings.slow_query_explain_sample_ratio <= 0 or random.random() >= settings.slow_query_explain_sample_ratio:
+        return
+    now = monotonic()
+    last = _explained_at.get(request.fingerprint)
+    if last is not None and now - last < settings.slow_query_explain_interval_seconds:
+        return
+    _explained_at[request.fingerprint] = now
+    if _explain_buffer is None:
+        _explain_buffer = BoundedBuffer(settings.slow_query_explain_queue_size)
+    if not _explain_buffer.offer((request, engine)):
+        add_count('accentra.db.explain_dropped')
+        return
+    if _explain_flusher is None:
+        _explain_flusher = BackgroundFlusher('explain-capture', capture_explains, interval=1.0)
+    _explain_flusher.start()
+    _explain_flusher.wake()
+
+
+def _log_slow_statement(
+    conn, statement: str, parameters, executemany: bool, elapsed: float, normalized: str, fingerprint: str
+) -> None:
+    context = _statement_context.get()
+    route = context.route if context is not None else None
+    tenant_id = context.tenant_id if context is not None else None
+    add_count('accentra.db.slow_statements', 1, {'db.query.fingerprint': fingerprint})
+    slow_query_logger.warning(
+        'Slow statement | duration_ms=%.1f fingerprint=%s route=%s tenant_id=%s statement=%s parameters=%s',
+        elapsed * 1000,
+        fingerprint,
+        route,
+        tenant_id,
+        normalized,
+        redact_parameters(parameters, executemany),
+    )
+    if not executemany and conn.dialect.name == 'postgresql' and _explainable(statement):
+        _offer_explain(ExplainRequest(fingerprint, statement, parameters, elapsed, route, tenant_id), conn.engine)
+
+
+def _after_cursor_execute(conn, cursor, statement: str, parameters, context, executemany: bool) -> None:
+    started: float | None = getattr(context, '_accentra_started', None)
+    if started is None:
+        return
+    elapsed = perf_counter() - started
+    add_phase_time('db', elapsed)
+    operation = _operation_name(statement)
+    record_duration(
+        'db.client.operation.duration', elapsed, {'db.system': conn.dialect.name, 'db.operation.name': operation}
+    )
+    span: Any = getattr(context, '_accentra_span', None)
+    if span is not None:
+        span.end()
+
+    settings = get_settings()
+    if not settings.slow_query_log_enabled or not context.execution_options.get('slow_query_log', True):
+        return
+    normalized, fingerprint = normalize_statement(statement)
+    record_duration(
+        'accentra.db.statement.duration', elapsed, {'db.operation.name': operation, 'db.query.fingerprint': fingerprint}
+    )
+    if elapsed * 1000 >= settings.slow_query_threshold_ms:
+        _log_slow_statement(conn, statement, parameters, executemany, elapsed, normalized, fingerprint)
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    span: Any = getattr(exception_context.execution_context, '_accentra_span', None)
+    if span is None:
+        return
+    from opentelemetry.trace import Status, StatusCode
+
+    span.record_exception(exception_context.original_exception)
+    span.set_status(Status(StatusCode.ERROR))
+    span.end()
+
+
+def install_statement_timing() -> None:
+    """Time every SQL statement on all engines, for instrumentation, profiling and the slow-query log."""
+    global _statement_timing_installed
+    if _statement_timing_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(Engine, 'handle_error', _handle_error)
+    _statement_timing_installed = True
 
 
 def get_engine() -> Engine:
@@ -27,10 +285,32 @@ def get_engine() -> Engine:
                 engine_kwargs['poolclass'] = StaticPool
             _engine = create_engine(url, connect_args=connect_args, **engine_kwargs)
         else:
-            _engine = create_engine(url, echo=settings.debug or False, pool_pre_ping=True, pool_recycle=3600)
+            _engine = create_engine(
+                url,
+                echo=settings.debug or False,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                query_cache_size=settings.db_query_cache_size,
+                connect_args=_prepared_statement_args(url, settings.db_prepare_threshold),
+            )
+        if settings.slow_query_log_enabled:
+            install_statement_timing()
     return _engine
 
 
+def dispose_engine_after_fork() -> None:
+    """Drop pooled connections inherited from the parent process without closing the parent's sockets."""
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+
+def set_statement_tenant(tenant_id: UUID) -> None:
+    """Attribute the current request's statements to `tenant_id` in the slow-query log."""
+    context = _statement_context.get()
+    if context is not None:
+        context.tenant_id = tenant_id
+
+
 def _apply_access_context(session: Session, access_context: AccessContext) -> None:
     bind = session.get_bind()
     if bind is not None and bind.dialect.name.startswith('postgresql'):
@@ -45,6 +325,7 @@ def _apply_access_context(session: Session, access_context: AccessContext) -> No
 
     session.info['tenant_id'] = access_context.tenant_id
     session.info['user_id'] = access_context.user_id
+    set_statement_tenant(access_context.tenant_id)
 
 
 def _reset_access_context(session: Session) -> None:
@@ -77,3 +358,69 @@ def session_scope(access_context: AccessContext | None = None) -> Generator[Sess
 def get_session_dependency() -> Iterator[Session]:
     with session_scope() as session:
         yield session
+
+
+# `session.info` flag set once a session writes in its current transaction (ORM flush or a Core INSERT/UPDATE/DELETE).
+# Such a session sees its own uncommitted rows, so it must not share reads with other sessions.
+_WROTE = 'accentra_wrote'
+
+
+def session_has_writes(session: Session) -> bool:
+    return session.info.get(_WROTE, False)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed(session: Session, flush_context: Any) -> None:
+    session.info[_WROTE] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_core_write(orm_execute_state: Any) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE] = True
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _clear_writes(session: Session) -> None:
+    session.info.pop(_WROTE, None)
+
+
+class StatementContextMiddleware:
+    """Give each HTTP request a `StatementContext`; the route is read from the scope once routing has matched it."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        token = _statement_context.set(StatementContext(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _statement_context.reset(token)
+
+
+def stop_explain_capture() -> None:
+    if _explain_flusher is not None:
+        _explain_flusher.stop()
+
+
+__all__ = [
+    'get_engine',
+    'dispose_engine_after_fork',
+    'session_scope',
+    'get_session_dependency',
+    'session_has_writes',
+    'StatementContext',
+    'StatementContextMiddleware',
+    'set_statement_tenant',
+    'normalize_statement',
+    'redact_parameters',
+    'explain_statement',
+    'capture_explains',
+    'stop_explain_capture',
+    'install_statement_timing',
+]
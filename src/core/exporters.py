@@ -0,0 +1,34 @@
+"""Export plumbing for the readiness check; imported only once metrics are configured."""
+
+from __future__ import annotations
+
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter,
+    MetricExportResult,
+    MetricsData,
+)
+
+
+class RecordingMetricExporter(MetricExporter):
+    """Metric exporter wrapper that remembers the result of the last export, so readiness can report failures."""
+
+    def __init__(self, delegate: MetricExporter) -> None:
+        super().__init__(
+            preferred_temporality=delegate._preferred_temporality,
+            preferred_aggregation=delegate._preferred_aggregation,
+        )
+        self._delegate = delegate
+        self.last_result: MetricExportResult | None = None
+
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        self.last_result = self._delegate.export(metrics_data, timeout_millis=timeout_millis, **kwargs)
+        return self.last_result
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return self._delegate.force_flush(timeout_millis=timeout_millis)
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self._delegate.shutdown(timeout_millis=timeout_millis, **kwargs)
+
+
+__all__ = ['RecordingMetricExporter']
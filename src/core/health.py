@@ -0,0 +1,191 @@
+"""Readiness checks for `/readyz`: dependencies are probed by a background thread, the endpoint reads the results.
+
+Kubelet probes then cost a dictionary copy instead of a database round-trip, and a dependency that hangs makes its
+result go stale (and the pod unready) rather than making the probe itself hang.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from time import monotonic, perf_counter
+from typing import Any
+
+from sqlalchemy import text
+
+from core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# A check raises on failure and may return a short detail such as 'disabled'.
+Check = Callable[[], str | None]
+
+
+@dataclass(frozen=True)
+class CheckResult:
+    ok: bool
+    latency_ms: float
+    checked_at: datetime
+    detail: str | None = None
+    error: str | None = None
+
+
+def check_database() -> str | None:
+    from core.db import get_engine
+
+    with get_engine().connect() as connection:
+        connection.execute(text('SELECT 1'))
+    return None
+
+
+def check_redis() -> str | None:
+    from core.redis import check_health, redis_configured
+
+    if not redis_configured():
+        return 'not configured'
+    health = check_health(max_age=0)
+    if not health.ok:
+        raise RuntimeError(health.error)
+    return None
+
+
+def check_exporters() -> str | None:
+    from core.observability import check_exporters as exporters_health
+
+    return exporters_health()
+
+
+DEFAULT_CHECKS: dict[str, Check] = {
+    'database': check_database,
+    'redis': check_redis,
+    'exporters': check_exporters,
+}
+
+
+class ReadinessChecker:
+    """Run every check each `interval` seconds on a daemon thread and keep the latest result per check."""
+
+    def __init__(
+        self,
+        checks: dict[str, Check] | None = None,
+        *,
+        required: list[str] | None = None,
+        interval: float | None = None,
+        stale_after: float | None = None,
+    ) -> None:
+        settings = get_settings()
+        self.checks = dict(checks if checks is not None else DEFAULT_CHECKS)
+        self.required = frozenset(required if required is not None else settings.readiness_required_checks)
+        self.interval = interval if interval is not None else settings.readiness_check_interval_seconds
+        self.stale_after = stale_after if stale_after is not None else settings.readiness_stale_after_seconds
+        self._results: dict[str, tuple[CheckResult, float]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def run_once(self) -> None:
+        for name, check in self.checks.items():
+            started = perf_counter()
+            try:
+                detail = check()
+            except Exception as exc:  # a failing dependency is a result, not a crash of the checker
+                result = CheckResult(
+                    ok=False,
+                    latency_ms=(perf_counter() - started) * 1000,
+                    checked_at=datetime.now(UTC),
+                    error=f'{type(exc).__name__}: {exc}',
+                )
+                if name in self.required:
+                    logger.warning('Readiness check failed | check=%s error=%s', name, result.error)
+            else:
+                result = CheckResult(
+                    ok=True,
+                    latency_ms=(perf_counter() - started) * 1000,
+                    checked_at=datetime.now(UTC),
+                    detail=detail,
+                )
+            # Replacing a whole entry is atomic, so readers never see a half-written result.
+            self._results[name] = (result, monotonic())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='readiness-checker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def snapshot(self) -> tuple[bool, dict[str, dict[str, Any]]]:
+        """Return `(ready, per-check report)` from the cached results; never touches a dependency."""
+        now = monotonic()
+        results = dict(self._results)
+        ready = True
+        report: dict[str, dict[str, Any]] = {}
+        for name in self.checks:
+            required = name in self.required
+            entry = results.get(name)
+            if entry is None:
+                report[name] = {'ok': False, 'required': required, 'error': 'not checked yet'}
+                ready = ready and not required
+                continue
+            result, recorded = entry
+            ok = result.ok
+            data = {**asdict(result), 'required': required}
+            if now - recorded > self.stale_after:
+                ok = data['ok'] = False
+                data['error'] = f'stale: last checked {now - recorded:.0f}s ago'
+            data['latency_ms'] = round(result.latency_ms, 2)
+            report[name] = data
+            ready = ready and (ok or not required)
+        return ready, report
+
+
+_checker: ReadinessChecker | None = None
+
+
+def start_readiness_checker() -> ReadinessChecker:
+    global _checker
+    if _checker is None:
+        _checker = ReadinessChecker()
+    _checker.start()
+    return _checker
+
+
+def stop_readiness_checker() -> None:
+    global _checker
+    if _checker is not None:
+        _checker.stop()
+        _checker = None
+
+
+def readiness() -> tuple[bool, dict[str, dict[str, Any]]]:
+    """Cached readiness for `/readyz`; not ready until the checker has started and reported."""
+    if _checker is None:
+        return False, {}
+    return _checker.snapshot()
+
+
+__all__ = [
+    'Check',
+    'CheckResult',
+    'DEFAULT_CHECKS',
+    'ReadinessChecker',
+    'check_database',
+    'check_redis',
+    'check_exporters',
+    'start_readiness_checker',
+    'stop_readiness_checker',
+    'readiness',
+]
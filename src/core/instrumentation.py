@@ -0,0 +1,186 @@
+"""Low-overhead spans and histograms for hot code paths.
+
+Everything here is a no-op until `enable_instrumentation()` runs (from `init_observability()`): decorated functions
+pay a single module-global check, and no SQLAlchemy listeners are registered.
+"""
+
+from __future__ import annotations
+
+import functools
+from collections.abc import Awaitable, Callable, Mapping
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+
+if TYPE_CHECKING:
+    from opentelemetry.metrics import Counter, Histogram, Meter, MeterProvider
+    from opentelemetry.trace import Tracer, TracerProvider
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+Attributes = Mapping[str, str | int | float | bool]
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+INSTRUMENTATION_SCOPE = 'accentra'
+
+_enabled = False
+_tracer: Tracer | None = None
+_meter: Meter | None = None
+_histograms: dict[str, Histogram] = {}
+_counters: dict[str, Counter] = {}
+
+
+def instrumentation_enabled() -> bool:
+    return _enabled
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def enable_instrumentation(
+    *,
+    tracing: bool,
+    metrics: bool,
+    tracer_provider: TracerProvider | None = None,
+    meter_provider: MeterProvider | None = None,
+) -> None:
+    """Switch hot-path instrumentation on for the configured signal types (global providers by default)."""
+    global _enabled, _tracer, _meter
+    from opentelemetry import metrics as otel_metrics
+    from opentelemetry import trace as otel_trace
+
+    _tracer = otel_trace.get_tracer(INSTRUMENTATION_SCOPE, tracer_provider=tracer_provider) if tracing else None
+    _meter = otel_metrics.get_meter(INSTRUMENTATION_SCOPE, meter_provider=meter_provider) if metrics else None
+    _histograms.clear()
+    _counters.clear()
+    _enabled = tracing or metrics
+
+
+def disable_instrumentation() -> None:
+    global _enabled, _tracer, _meter
+    _enabled = False
+    _tracer = None
+    _meter = None
+    _histograms.clear()
+    _counters.clear()
+
+
+def record_duration(name: str, seconds: float, attributes: Attributes | None = None) -> None:
+    """Record `seconds` on the histogram `name` (unit `s`)."""
+    if _meter is None:
+        return
+    histogram = _histograms.get(name)
+    if histogram is None:
+        histogram = _histograms[name] = _meter.create_histogram(name, unit='s')
+    histogram.record(seconds, attributes)
+
+
+def add_count(name: str, value: int = 1, attributes: Attributes | None = None) -> None:
+    """Increment the monotonic counter `name`."""
+    if _meter is None:
+        return
+    counter = _counters.get(name)
+    if counter is None:
+        counter = _counters[name] = _meter.create_counter(name)
+    counter.add(value, attributes)
+
+
+def _call_instrumented(name: str, metric_name: str, fn: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+    start = perf_counter()
+    try:
+        if _tracer is None:
+            return fn(*args, **kwargs)
+        with _tracer.start_as_current_span(name):
+            return fn(*args, **kwargs)
+    finally:
+        record_duration(metric_name, perf_counter() - start)
+
+
+def instrumented(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Time calls to the decorated function as span `name` and histogram `<name>.duration`."""
+    metric_name = f'{name}.duration'
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            return _call_instrumented(name, metric_name, fn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get('route')
+    return getattr(route, 'path', None) or '<unmatched>'
+
+
+class RequestInstrumentationMiddleware:
+    """Request-level server span and duration histogram, named after the matched route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def _record(scope: Scope, method: str, status_code: int, seconds: float) -> str:
+        route = _route_template(scope)
+        record_duration(
+            'http.server.request.duration',
+            seconds,
+            {'http.request.method': method, 'http.route': route, 'http.response.status_code': status_code},
+        )
+        return route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not _enabled or scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status_code = 500
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        start = perf_counter()
+        if _tracer is None:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                self._record(scope, method, status_code, perf_counter() - start)
+            return
+
+        from opentelemetry.trace import SpanKind, Status, StatusCode
+
+        attributes = {'http.request.method': method, 'url.path': scope['path']}
+        with _tracer.start_as_current_span(method, kind=SpanKind.SERVER, attributes=attributes) as span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = self._record(scope, method, status_code, perf_counter() - start)
+                span.update_name(f'{method} {route}')
+                span.set_attribute('http.route', route)
+                span.set_attribute('http.response.status_code', status_code)
+                if status_code >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
+
+
+__all__ = [
+    'instrumentation_enabled',
+    'get_tracer',
+    'enable_instrumentation',
+    'disable_instrumentation',
+    'record_duration',
+    'add_count',
+    'instrumented',
+    'RequestInstrumentationMiddleware',
+]
@@ -1,19 +1,149 @@
+"""Logging setup: records are queued on the calling thread and formatted/exported by a background listener."""
+
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import queue
+from collections.abc import Callable
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
 
 from core.config import Settings, get_settings
 from core.observability import build_resource, parse_otlp_headers
 
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+# Uvicorn attaches its own synchronous stream handlers; route these through the queue instead.
+_UVICORN_LOGGERS = ('uvicorn', 'uvicorn.error', 'uvicorn.access')
+
 _configured = False
+_listener: QueueListener | None = None
+
+
+def _no_span_context() -> Any:
+    return None
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hand records to the listener; when the queue is full either drop (counting the loss) or block."""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue[logging.LogRecord],
+        *,
+        block: bool,
+        span_context: Callable[[], Any] = _no_span_context,
+    ) -> None:
+        super().__init__(log_queue)
+        self._log_queue = log_queue  # `self.queue` is typed as a put_nowait-only protocol
+        self.block = block
+        self.dropped = 0
+        self._span_context = span_context
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message on the calling thread (args may be mutated later) and capture the active span, which
+        # is not visible from the listener thread. Formatting itself is left to the listener.
+        record.msg = record.getMessage()
+        record.args = None
+        record.otel_span_context = self._span_context()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block:
+            self._log_queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            # Imported lazily: instrumentation is optional and must never be logged from here.
+            from core.instrumentation import add_count
+
+            add_count('accentra.logging.dropped')
+
 
+_queue_handler: BoundedQueueHandler | None = None
 
-def _configure_otel_logging(settings: Settings, *, level: int, root_logger: logging.Logger) -> None:
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the trace and span ids captured when the record was emitted."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            'timestamp': datetime.fromtimestamp(record.created, UTC).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        span_context = getattr(record, 'otel_span_context', None)
+        if span_context is not None:
+            payload['trace_id'] = format(span_context.trace_id, '032x')
+            payload['span_id'] = format(span_context.span_id, '016x')
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        if record.stack_info:
+            payload['stack'] = record.stack_info
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class _TraceContextHandler(logging.Handler):
+    """Re-activate the emitting span around the OTLP bridge so exported records keep their trace correlation."""
+
+    def __init__(self, delegate: logging.Handler) -> None:
+        super().__init__(delegate.level)
+        self.delegate = delegate
+
+    def emit(self, record: logging.LogRecord) -> None:
+        from opentelemetry import context, trace
+
+        span_context = getattr(record, 'otel_span_context', None)
+        if span_context is None:
+            self.delegate.handle(record)
+            return
+        token = context.attach(trace.set_span_in_context(trace.NonRecordingSpan(span_context)))
+        try:
+            self.delegate.handle(record)
+        finally:
+            context.detach(token)
+
+    def flush(self) -> None:
+        self.delegate.flush()
+
+    def close(self) -> None:
+        self.delegate.close()
+        super().close()
+
+
+def _current_span_context_getter() -> Callable[[], Any]:
+    try:
+        from opentelemetry import trace
+    except ImportError:  # pragma: no cover - optional dependency
+        return _no_span_context
+
+    def current_span_context() -> Any:
+        span_context = trace.get_current_span().get_span_context()
+        return span_context if span_context.is_valid else None
+
+    return current_span_context
+
+
+def _build_formatter(settings: Settings) -> logging.Formatter:
+    if settings.log_format == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def _configure_otel_logging(settings: Settings, *, level: int, root_logger: logging.Logger) -> logging.Handler | None:
     try:
         from opentelemetry.exporter.otlp.proto.http._log_exporter import OTLPLogExporter
     except ImportError:  # pragma: no cover - optional dependency
         root_logger.warning('OpenTelemetry log exporter not available; skipping OTLP log forwarding.')
-        return
+        return None
     try:
         from opentelemetry.sdk._logs import (  # type: ignore[attr-defined]
             LoggerProvider,
@@ -24,13 +154,13 @@ def _configure_otel_logging(settings: Settings, *, level: int, root_logger: logg
         )
     except ImportError:  # pragma: no cover - optional dependency
         root_logger.warning('OpenTelemetry logging SDK modules not available; skipping OTLP log forwarding.')
-        return
+        return None
 
     try:
         resource = build_resource(settings)
     except RuntimeError:
         root_logger.warning('OpenTelemetry SDK not available; skipping OTLP log forwarding.')
-        return
+        return None
 
     exporter = OTLPLogExporter(
         endpoint=settings.otlp_endpoint,
@@ -41,12 +171,26 @@ def _configure_otel_logging(settings: Settings, *, level: int, root_logger: logg
 
     otel_handler = LoggingHandler(level=level, logger_provider=provider)
     otel_handler.setLevel(level)
-    root_logger.addHandler(otel_handler)
+    return _TraceContextHandler(otel_handler)
+
+
+def shutdown_logging() -> None:
+    """Drain the queue, stop the listener and close its handlers; `configure_logging()` may be called again after."""
+    global _configured, _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    _configured = False
 
 
 def configure_logging() -> None:
-    """Initialise stdlib logging and optionally bridge to OpenTelemetry."""
-    global _configured
+    """Initialise queue-backed stdlib logging and optionally bridge it to OpenTelemetry."""
+    global _configured, _listener, _queue_handler
     if _configured:
         return
 
@@ -55,17 +199,63 @@ def configure_logging() -> None:
     level = getattr(logging, level_name, logging.INFO)
 
     root_logger = logging.getLogger()
-    if not root_logger.handlers:
-        logging.basicConfig(
-            level=level,
-            format='%(asctime)s %(levelname)s [%(name)s] %(message)s',
-        )
     root_logger.setLevel(level)
 
+    # Leave handlers installed by a host application (or pytest) alone, as `basicConfig` would.
+    handlers: list[logging.Handler] = []
+    if not root_logger.handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(_build_formatter(settings))
+        handlers.append(stream_handler)
+        for name in _UVICORN_LOGGERS:
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers.clear()
+            uvicorn_logger.propagate = True
+
     if settings.otel_logs_enabled and settings.otlp_endpoint:
-        _configure_otel_logging(settings, level=level, root_logger=root_logger)
+        otel_handler = _configure_otel_logging(settings, level=level, root_logger=root_logger)
+        if otel_handler is not None:
+            handlers.append(otel_handler)
+
+    if handlers:
+        log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=settings.log_queue_size)
+        _queue_handler = BoundedQueueHandler(
+            log_queue,
+            block=settings.log_queue_policy == 'block',
+            span_context=_current_span_context_getter(),
+        )
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        root_logger.addHandler(_queue_handler)
+        atexit.unregister(shutdown_logging)
+        atexit.register(shutdown_logging)
 
     _configured = True
 
 
-__all__ = ['configure_logging']
+def dropped_log_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def reset_logging_after_fork() -> None:
+    """Rebuild the pipeline in a forked child, where the inherited listener thread no longer exists.
+
+    The inherited queue may still hold the parent's records, so it is abandoned rather than drained.
+    """
+    global _configured, _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    _queue_handler = None
+    _listener = None
+    _configured = False
+    configure_logging()
+
+
+__all__ = [
+    'configure_logging',
+    'reset_logging_after_fork',
+    'shutdown_logging',
+    'dropped_log_records',
+    'JsonFormatter',
+    'BoundedQueueHandler',
+]
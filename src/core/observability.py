@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict
+from typing import Any, Dict
 
 from core.config import Settings, get_settings
 
@@ -9,6 +9,10 @@ logger = logging.getLogger(__name__)
 
 _tracing_configured = False
 _metrics_configured = False
+# Kept for the readiness check on telemetry export.
+_span_processor: Any = None
+_metric_exporter: Any = None
+_SPAN_QUEUE_UNHEALTHY_FILL = 0.9
 
 
 def parse_otlp_headers(raw_headers: str | None) -> Dict[str, str]:
@@ -39,56 +43,106 @@ def build_resource(settings: Settings):
     )
 
 
+def _build_span_pipeline(settings: Settings):
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    exporter = OTLPSpanExporter(endpoint=settings.otlp_endpoint, headers=parse_otlp_headers(settings.otlp_headers))
+    return BatchSpanProcessor(
+        exporter,
+        max_queue_size=settings.otel_bsp_max_queue_size,
+        max_export_batch_size=settings.otel_bsp_max_export_batch_size,
+        schedule_delay_millis=settings.otel_bsp_schedule_delay_ms,
+        export_timeout_millis=settings.otel_bsp_export_timeout_ms,
+    )
+
+
+def _build_metric_exporter(settings: Settings):
+    from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+        OTLPMetricExporter,
+    )
+
+    return OTLPMetricExporter(
+        endpoint=settings.otlp_endpoint,
+        headers=parse_otlp_headers(settings.otlp_headers),
+        max_export_batch_size=settings.otel_metric_max_export_batch_size,
+    )
+
+
 def _configure_tracing(settings: Settings, resource) -> None:
-    global _tracing_configured
+    global _tracing_configured, _span_processor
     if _tracing_configured or not settings.otlp_endpoint or not settings.otel_traces_enabled:
         return
 
     try:
         from opentelemetry import trace
-        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
-            OTLPSpanExporter,
-        )
         from opentelemetry.sdk.trace import TracerProvider
-        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        from core.sampling import ErrorRetainingSpanProcessor, RouteAwareSampler
+
+        pipeline = _build_span_pipeline(settings)
     except ImportError:  # pragma: no cover - missing optional dependency
         logger.warning('OpenTelemetry tracing disabled: otlp exporter not available.')
         return
 
-    headers = parse_otlp_headers(settings.otlp_headers)
-    exporter = OTLPSpanExporter(endpoint=settings.otlp_endpoint, headers=headers)
-    provider = TracerProvider(resource=resource)
-    provider.add_span_processor(BatchSpanProcessor(exporter))
+    sampler = RouteAwareSampler(
+        settings.otel_traces_sample_ratio,
+        excluded_routes=settings.otel_traces_excluded_routes,
+        record_unsampled=settings.otel_traces_always_sample_errors,
+    )
+    _span_processor = ErrorRetainingSpanProcessor(pipeline, retain_errors=settings.otel_traces_always_sample_errors)
+    provider = TracerProvider(resource=resource, sampler=sampler)
+    provider.add_span_processor(_span_processor)
     trace.set_tracer_provider(provider)
 
     _tracing_configured = True
 
 
 def _configure_metrics(settings: Settings, resource) -> None:
-    global _metrics_configured
+    global _metrics_configured, _metric_exporter
     if _metrics_configured or not settings.otlp_endpoint or not settings.otel_metrics_enabled:
         return
 
     try:
         from opentelemetry import metrics
-        from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
-            OTLPMetricExporter,
-        )
         from opentelemetry.sdk.metrics import MeterProvider
         from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+        from core.exporters import RecordingMetricExporter
+
+        exporter = _build_metric_exporter(settings)
     except ImportError:  # pragma: no cover - missing optional dependency
         logger.warning('OpenTelemetry metrics disabled: otlp exporter not available.')
         return
 
-    headers = parse_otlp_headers(settings.otlp_headers)
-    exporter = OTLPMetricExporter(endpoint=settings.otlp_endpoint, headers=headers)
-    reader = PeriodicExportingMetricReader(exporter)
+    _metric_exporter = RecordingMetricExporter(exporter)
+    reader = PeriodicExportingMetricReader(
+        _metric_exporter,
+        export_interval_millis=settings.otel_metric_export_interval_ms,
+        export_timeout_millis=settings.otel_metric_export_timeout_ms,
+    )
     provider = MeterProvider(resource=resource, metric_readers=[reader])
     metrics.set_meter_provider(provider)
 
     _metrics_configured = True
 
 
+def check_exporters() -> str:
+    """Readiness check for telemetry export: raise when spans back up or the last metric export failed."""
+    if _span_processor is None and _metric_exporter is None:
+        return 'disabled'
+    if _span_processor is not None:
+        fill = _span_processor.queue_fill()
+        if fill >= _SPAN_QUEUE_UNHEALTHY_FILL:
+            raise RuntimeError(f'span export queue {fill:.0%} full')
+    if _metric_exporter is not None:
+        from opentelemetry.sdk.metrics.export import MetricExportResult
+
+        if _metric_exporter.last_result is MetricExportResult.FAILURE:
+            raise RuntimeError('last metric export failed')
+    return 'ok'
+
+
 def init_observability() -> None:
     """Configure tracing and metrics providers using OTLP exporters."""
     settings = get_settings()
@@ -101,5 +155,17 @@ def init_observability() -> None:
     _configure_tracing(settings, resource)
     _configure_metrics(settings, resource)
 
+    if settings.otel_instrumentation_enabled and (_tracing_configured or _metrics_configured):
+        from core.db import install_statement_timing
+        from core.instrumentation import enable_instrumentation
+
+        enable_instrumentation(tracing=_tracing_configured, metrics=_metrics_configured)
+        install_statement_timing()
+
 
-__all__ = ['init_observability', 'build_resource', 'parse_otlp_headers']
+__all__ = [
+    'init_observability',
+    'check_exporters',
+    'build_resource',
+    'parse_otlp_headers',
+]
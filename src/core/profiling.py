@@ -0,0 +1,370 @@
+"""Opt-in live diagnosis: `Server-Timing` phase breakdowns and on-demand sampling profiles.
+
+With `profiling_enabled` the `ProfilingMiddleware` gives every HTTP request a `RequestTiming` that code on the request
+path adds phase durations to (`auth`, `db`, `hash`, `serialize`), and it reports them in a `Server-Timing` response
+header to callers that send the internal token. Profiles are started through `POST /internal/profile`. A sampler thread
+reads `sys._current_frames()` at a fixed interval and counts stacks in the collapsed format read by `flamegraph.pl` and
+speedscope. It samples either the whole process or only the threads running a selected subset of requests.
+
+When profiling is disabled nothing here is installed, and the phase hooks cost one context-variable read. Without an
+active profile, an enabled middleware adds one small object per request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import random
+import sys
+import threading
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic, perf_counter
+from types import FrameType
+from typing import Any, Literal, ParamSpec, TypeVar
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+from core.config import get_settings
+from core.instrumentation import ASGIApp, Receive, Scope, Send
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+PHASES = ('auth', 'db', 'hash', 'serialize')
+
+_INTERNAL_TOKEN_HEADER = b'x-internal-token'
+
+ProfileMode = Literal['process', 'requests']
+
+
+def _frame_label(frame: FrameType) -> str:
+    # Without line numbers, so that calls from different lines of one function merge into one flame-graph frame.
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}:{frame.f_code.co_qualname}'
+
+
+def collapse_stack(frame: FrameType | None) -> str:
+    """Root-first `;`-separated stack of `frame`, one line of the collapsed (folded) flame-graph format."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfile:
+    """Stack sampler for one profiling window, run on its own daemon thread.
+
+    In `process` mode every thread except the sampler is sampled. In `requests` mode only threads that are currently
+    inside an endpoint or a timed phase of a selected request are sampled; requests are selected by `path_prefix` and
+    a `sample_ratio` coin flip when they start.
+    """
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        deadline = monotonic() + self.seconds
+        while not self._stop.is_set() and monotonic() < deadline:
+            frames = sys._current_frames()
+            if self.mode == 'requests':
+                with self._threads_lock:
+                    selected = [ident for ident in self._threads if ident in frames]
+            else:
+                selected = [ident for ident in frames if ident != own]
+            for ident in selected:
+                self.stacks[collapse_stack(frames[ident])] += 1
+            self.samples += 1
+            del frames
+            self._stop.wait(self.interval)
+
+    def __init__(
+        self,
+        *,
+        mode: ProfileMode,
+        seconds: float,
+        interval: float,
+        path_prefix: str | None = None,
+        sample_ratio: float = 1.0,
+    ) -> None:
+        self.mode = mode
+        self.seconds = seconds
+        self.interval = interval
+        self.path_prefix = path_prefix
+        self.sample_ratio = sample_ratio
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.requests = 0
+        self._threads: dict[int, int] = {}
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def selects(self, path: str) -> bool:
+        if self.mode != 'requests' or (self.path_prefix and not path.startswith(self.path_prefix)):
+            return False
+        if self.sample_ratio < 1.0 and random.random() >= self.sample_ratio:
+            return False
+        self.requests += 1
+        return True
+
+    def enter_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._threads_lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._threads_lock:
+            remaining = self._threads.get(ident, 0) - 1
+            if remaining > 0:
+                self._threads[ident] = remaining
+            else:
+                self._threads.pop(ident, None)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestTiming:
+    """Phase durations of one request; shared with the threadpool threads that run its sync code."""
+
+    __slots__ = ('endpoint_finished', 'phases', 'profile')
+
+    def __init__(self, profile: SamplingProfile | None = None) -> None:
+        self.phases: dict[str, float] = {}
+        self.endpoint_finished: float | None = None
+        self.profile = profile
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def header_value(self, total: float) -> str:
+        entries = [f'{phase};dur={self.phases[phase] * 1000:.2f}' for phase in PHASES if phase in self.phases]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+_timing: ContextVar[RequestTiming | None] = ContextVar('accentra_request_timing', default=None)
+_active_profile: SamplingProfile | None = None
+_profile_lock = threading.Lock()
+
+
+def add_phase_time(phase: str, seconds: float) -> None:
+    """Attribute `seconds` to `phase` of the current request, if it is being timed."""
+    timing = _timing.get()
+    if timing is not None:
+        timing.add(phase, seconds)
+
+
+@contextmanager
+def _timed(timing: RequestTiming, phase: str | None) -> Iterator[None]:
+    profile = timing.profile
+    if profile is not None:
+        profile.enter_thread()
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if phase is not None:
+            timing.add(phase, perf_counter() - start)
+        if profile is not None:
+            profile.exit_thread()
+
+
+def timed_phase(phase: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Add the run time of the decorated function to `phase` of the current request."""
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            timing = _timing.get()
+            if timing is None:
+                return fn(*args, **kwargs)
+            with _timed(timing, phase):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _mark_endpoint_finished(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Generators stream their body after the handler returns, so there is no serialisation step to separate out.
+    if inspect.isgeneratorfunction(endpoint) or inspect.isasyncgenfunction(endpoint):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            timing = _timing.get()
+            if timing is None:
+                return await endpoint(*args, **kwargs)
+            try:
+                with _timed(timing, None):
+                    return await endpoint(*args, **kwargs)
+            finally:
+                timing.endpoint_finished = perf_counter()
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        timing = _timing.get()
+        if timing is None:
+            return endpoint(*args, **kwargs)
+        try:
+            with _timed(timing, None):
+                return endpoint(*args, **kwargs)
+        finally:
+            timing.endpoint_finished = perf_counter()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """Route whose response validation and encoding after the endpoint returns is timed as the `serialize` phase."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _mark_endpoint_finished(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            timing = _timing.get()
+            if timing is not None and timing.endpoint_finished is not None:
+                timing.add('serialize', perf_counter() - timing.endpoint_finished)
+            return response
+
+        return timed_handler
+
+
+def _internal_caller(scope: Scope) -> bool:
+    supplied = next((value for name, value in scope['headers'] if name == _INTERNAL_TOKEN_HEADER), None)
+    return supplied is not None and get_settings().internal_token_matches(supplied.decode('latin-1'))
+
+
+class ProfilingMiddleware:
+    """Times request phases and attaches selected requests to the active profile.
+
+    The `Server-Timing` header is only added to responses for callers that send a valid internal token.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profile = _active_profile
+        timing = RequestTiming(profile if profile is not None and profile.selects(scope['path']) else None)
+        # Phase timings tell code paths apart (logins only hash a password for known emails), so only trusted callers
+        # get to see them.
+        reported = _internal_caller(scope)
+        token = _timing.set(timing)
+        start = perf_counter()
+
+        async def send_with_timing(message: dict[str, Any]) -> None:
+            if reported and message['type'] == 'http.response.start':
+                value = timing.header_value(perf_counter() - start)
+                message['headers'] = [*message.get('headers', []), (b'server-timing', value.encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timing.reset(token)
+
+
+def _require_internal_token(x_internal_token: str | None = Header(default=None)) -> None:
+    if not get_settings().internal_token_matches(x_internal_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Internal token required')
+
+
+def run_profile(profile: SamplingProfile) -> None:
+    """Claim the profiler for `profile` and start sampling; only one profile runs per process at a time."""
+    global _active_profile
+    with _profile_lock:
+        if _active_profile is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='A profile is already running')
+        _active_profile = profile
+    profile.start()
+
+
+def finish_profile(profile: SamplingProfile) -> None:
+    global _active_profile
+    profile.stop()
+    with _profile_lock:
+        if _active_profile is profile:
+            _active_profile = None
+
+
+router = APIRouter(prefix='/internal')
+
+
+@router.post('/profile', response_class=PlainTextResponse, dependencies=[Depends(_require_internal_token)])
+async def capture_profile(
+    mode: ProfileMode = 'process',
+    seconds: float = Query(default=10.0, gt=0),
+    interval_ms: int | None = Query(default=None, ge=1, le=1000),
+    path_prefix: str | None = None,
+    sample_ratio: float = Query(default=1.0, gt=0.0, le=1.0),
+) -> PlainTextResponse:
+    """Sample for `seconds` and return collapsed stacks, ready for `flamegraph.pl` or speedscope."""
+    settings = get_settings()
+    profile = SamplingProfile(
+        mode=mode,
+        seconds=min(seconds, settings.profiling_max_seconds),
+        interval=(interval_ms or settings.profiling_sample_interval_ms) / 1000,
+        path_prefix=path_prefix,
+        sample_ratio=sample_ratio,
+    )
+    run_profile(profile)
+    try:
+        await asyncio.sleep(profile.seconds)
+    finally:
+        finish_profile(profile)
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={'X-Profile-Samples': str(profile.samples), 'X-Profile-Requests': str(profile.requests)},
+    )
+
+
+__all__ = [
+    'PHASES',
+    'RequestTiming',
+    'add_phase_time',
+    'timed_phase',
+    'TimedRoute',
+    'collapse_stack',
+    'SamplingProfile',
+    'ProfilingMiddleware',
+    'run_profile',
+    'finish_profile',
+    'router',
+]
@@ -1,63 +1,175 @@
 from __future__ import annotations
 
+import functools
 import logging
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
 
-import dramatiq
-from dramatiq.brokers.redis import RedisBroker
+from core.config import get_settings
+from core.db import session_scope
+from core.logging import configure_logging
+from core.redis import get_redis, pipelined, redis_target
 
-from core import configure_logging, get_settings
+if TYPE_CHECKING:
+    from dramatiq import Actor, Message
+    from dramatiq.brokers.redis import RedisBroker
+
+    from users.models import ChangeEvent
 
 configure_logging()
 logger = logging.getLogger(__name__)
 
+_broker: RedisBroker | None = None
+_broker_lock = threading.Lock()
+_actors: dict[str, LazyActor] = {}
+
+
+class LazyActor:
+    """Actor declaration that is bound to the Redis broker on first use instead of at import time."""
+
+    def __init__(self, fn: Callable[..., Any], options: dict[str, Any]) -> None:
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.actor_name = fn.__name__
+        self.options = options
+        self._actor: Actor | None = None
+
+    @property
+    def actor(self) -> Actor:
+        if self._actor is None:
+            get_broker()
+        assert self._actor is not None
+        return self._actor
+
+    def bind(self, broker: RedisBroker) -> None:
+        import dramatiq
+
+        self._actor = dramatiq.actor(self.fn, broker=broker, actor_name=self.actor_name, **self.options)  # type: ignore[call-overload]
+
+    def send(self, *args: Any, **kwargs: Any) -> Message:
+        return self.actor.send(*args, **kwargs)
+
+    def send_with_options(self, **options: Any) -> Message:
+        return self.actor.send_with_options(**options)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.fn(*args, **kwargs)
+
+
+def actor(**options: Any) -> Callable[[Callable[..., Any]], LazyActor]:
+    """Register a Dramatiq actor without constructing the broker."""
+
+    def decorator(fn: Callable[..., Any]) -> LazyActor:
+        lazy = LazyActor(fn, options)
+        _actors[lazy.actor_name] = lazy
+        if _broker is not None:
+            lazy.bind(_broker)
+        return lazy
+
+    return decorator
+
 
 def _make_broker() -> RedisBroker:
-    """Construct a Redis broker from settings. Fail fast if missing."""
-    url = get_settings().redis_url.get_secret_value()
-    if not url:
-        raise RuntimeError('REDIS_URL/redis_url is not configured')
-    return RedisBroker(url=url)
+    """Construct a Redis broker on the shared connection pool. Fail fast if Redis is not configured."""
+    from dramatiq.brokers.redis import RedisBroker
+
+    return RedisBroker(client=get_redis())
+
+
+def _install_broker(new_broker: RedisBroker) -> RedisBroker:
+    import dramatiq
+
+    for lazy in _actors.values():
+        lazy.bind(new_broker)
+    dramatiq.set_broker(new_broker)
+    return new_broker
+
+
+def get_broker() -> RedisBroker:
+    """Return the process-wide broker, constructing it and binding all actors on first use."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = _install_broker(_make_broker())
+    return _broker
 
 
-# Expose a module-level broker so the CLI can import it via `queue:broker`.
-broker: RedisBroker = _make_broker()
+def __getattr__(name: str) -> Any:
+    # Keeps `dramatiq core.queueing:broker` working while deferring construction until it is requested.
+    if name == 'broker':
+        return get_broker()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def setup_broker() -> None:
     """Configure Dramatiq to use our broker when invoked via `queue:setup_broker`."""
-    global broker
-
-    new_broker = _make_broker()
-    current = dramatiq.get_broker()
-
-    def _conn_signature(rb: RedisBroker) -> tuple:
-        pool = getattr(rb, 'client', None)
-        if pool is None:
-            return ()
-        connection_pool = getattr(pool, 'connection_pool', None)
-        kwargs = getattr(connection_pool, 'connection_kwargs', {}) or {}
-        # Normalise to tuple of sorted items so secrets do not leak in logs.
-        return tuple(sorted(kwargs.items()))
-
-    new_signature = _conn_signature(new_broker)
-    if new_signature:
-        redacted = dict(new_signature)
-        if 'password' in redacted:
-            redacted['password'] = '<redacted>'
-        target_desc = f'{redacted}'
-    else:
-        target_desc = '<unknown>'
+    global _broker
+
+    client = get_redis()
+    with _broker_lock:
+        current = _broker
+        if current is not None and current.client is client:
+            return
+        _broker = _install_broker(_make_broker())
 
+    target = redis_target()
     if current is None:
-        dramatiq.set_broker(new_broker)
-        broker = new_broker
-        logger.info('Dramatiq Redis broker configured | settings=%s', target_desc)
-        return
+        logger.info('Dramatiq Redis broker configured | target=%s', target)
+    else:
+        logger.info('Dramatiq Redis broker reconfigured | target=%s', target)
 
-    if isinstance(current, RedisBroker) and _conn_signature(current) == new_signature:
-        broker = new_broker
-        return
 
-    dramatiq.set_broker(new_broker)
-    broker = new_broker
-    logger.info('Dramatiq Redis broker reconfigured | settings=%s', target_desc)
+@actor(queue_name='identity', max_retries=10)
+def relay_identity_changes() -> None:
+    """Drain the identity outbox into the configured Redis Stream in batches."""
+    # Imported lazily so the broker module stays free of domain imports at load time.
+    from users.events import publish_pending_changes, to_stream_fields
+
+    settings = get_settings()
+
+    def publish(events: list[ChangeEvent]) -> None:
+        pipelined(
+            events,
+            lambda pipe, event: pipe.xadd(
+                settings.change_stream_name,
+                to_stream_fields(event),
+                maxlen=settings.change_stream_maxlen,
+                approximate=True,
+            ),
+        )
+
+    total = 0
+    while True:
+        with session_scope() as session:
+            published = publish_pending_changes(session, publish, batch_size=settings.change_relay_batch_size)
+        total += published
+        if published < settings.change_relay_batch_size:
+            break
+    if total:
+        logger.info('Relayed identity change events | count=%s stream=%s', total, settings.change_stream_name)
+
+
+@actor(queue_name='audit', max_retries=5)
+def write_audit_events(messages: list[dict[str, Any]]) -> None:
+    """Persist a batch of buffered audit entries with a single bulk insert."""
+    from users.audit import write_audit_batch
+
+    write_audit_batch(messages)
+
+
+@actor(queue_name='metering', max_retries=20)
+def write_usage(batch_id: str, rows: list[dict[str, Any]]) -> None:
+    """Fold one batch of flushed usage aggregates into `identity.tenant_usage`; redelivered batches are skipped."""
+    from users.metering import write_usage_batch
+
+    write_usage_batch(batch_id, rows)
+
+
+@actor(queue_name='maintenance', max_retries=3)
+def archive_inactive_users() -> None:
+    """Move long-inactive and soft-deleted users with their memberships to the archive tables, batch by batch."""
+    from users.archive import run_archiver
+
+    run_archiver()
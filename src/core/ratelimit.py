@@ -0,0 +1,275 @@
+"""Token-bucket rate limiting shared across workers through Redis, with an in-process pre-check and fallback.
+
+Buckets live in Redis and are updated atomically by a Lua script. Each process also remembers how many tokens the
+last Redis call left and, while that is comfortably high, admits a slice of them locally; those admissions are
+charged to Redis on the next call. If Redis is unreachable, an in-process bucket enforces the same limit per worker.
+Keys are chosen by clients (IPs, emails), so the in-process state is bounded by `rate_limit_local_max_keys`.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from time import monotonic
+from typing import Any, TypeVar
+
+from core.config import get_settings
+from core.instrumentation import add_count
+from core.redis import get_redis, redis_configured
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_RATE_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+# KEYS[1] bucket; ARGV: capacity, refill per second, cost, debt (tokens already handed out locally, always charged).
+# Returns {allowed, remaining, retry_after_seconds}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local debt = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - debt
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+# KEYS[1] failure counter; ARGV: window seconds. Returns the failure count.
+RECORD_FAILURE_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[1]))
+end
+return count
+"""
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    period_seconds: float
+
+    @property
+    def per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    remaining: float
+    retry_after: float = 0.0
+
+
+@lru_cache(maxsize=64)
+def parse_rate(value: str) -> Rate:
+    """Parse `'<count>/<period>'` such as `'10/minute'` or `'100/5minutes'`."""
+    match = _RATE_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f'Invalid rate {value!r}; expected e.g. "10/minute"')
+    count, multiplier, period = match.groups()
+    return Rate(int(count), _PERIODS[period] * int(multiplier or 1))
+
+
+def make_room(entries: dict[K, V], max_size: int, expired: Callable[[V], bool]) -> None:
+    """Make room for one more entry: once `entries` is full, drop expired entries, then the oldest ones.
+
+    Trimming goes down to three quarters of `max_size`, so a flood of live keys costs one scan per `max_size / 4`
+    inserts rather than one per insert.
+    """
+    if len(entries) < max_size:
+        return
+    for key in [key for key, value in entries.items() if expired(value)]:
+        del entries[key]
+    while entries and len(entries) > max_size * 3 // 4:
+        # Dicts keep insertion order, so the first key is the oldest entry.
+        del entries[next(iter(entries))]
+
+
+@dataclass
+class _LocalBucket:
+    tokens: float
+    updated: float
+    full_at: float = 0.0  # from then on the bucket is indistinguishable from a fresh one and can be dropped
+
+    def take(self, rate: Rate, cost: float, now: float) -> Decision:
+        self.tokens = min(rate.capacity, self.tokens + (now - self.updated) * rate.per_second)
+        self.updated = now
+        allowed = self.tokens >= cost
+        if allowed:
+            self.tokens -= cost
+        self.full_at = now + (rate.capacity - self.tokens) / rate.per_second
+        if allowed:
+            return Decision(True, self.tokens)
+        return Decision(False, self.tokens, (cost - self.tokens) / rate.per_second)
+
+
+@dataclass
+class _Allowance:
+    """Tokens this process may hand out without asking Redis, plus what it already handed out."""
+
+    tokens: int
+    expires: float
+    pending: int = 0
+
+
+class RateLimiter:
+    def __init__(self, client: Any = None, *, prefix: str = 'ratelimit') -> None:
+        """Use `client` when given (tests), otherwise the shared pool from `core.redis`."""
+        settings = get_settings()
+        self._client = client
+        self._prefix = prefix
+        self._local_fraction = settings.rate_limit_local_fraction
+        self._local_ttl = settings.rate_limit_local_ttl_ms / 1000
+        self._redis_retry_seconds = settings.rate_limit_redis_retry_seconds
+        self._max_keys = settings.rate_limit_local_max_keys
+        self._lock = threading.Lock()
+        self._allowances: dict[str, _Allowance] = {}
+        self._fallback: dict[str, _LocalBucket] = {}
+        self._failures: dict[str, tuple[int, float]] = {}
+        self._redis_down_until = 0.0
+        self._bucket_script: Any = None
+        self._failure_script: Any = None
+
+    # -- Redis plumbing -------------------------------------------------------------------------------------------
+
+    def _redis(self) -> Any:
+        if monotonic() < self._redis_down_until:
+            return None
+        if self._client is not None:
+            client = self._client
+        elif redis_configured():
+            client = get_redis()
+        else:
+            return None
+        if self._bucket_script is None:
+            self._bucket_script = client.register_script(TOKEN_BUCKET_SCRIPT)
+            self._failure_script = client.register_script(RECORD_FAILURE_SCRIPT)
+        return client
+
+    def _redis_failed(self, operation: str, exc: Exception) -> None:
+        self._redis_down_until = monotonic() + self._redis_retry_seconds
+        add_count('accentra.ratelimit.redis_errors')
+        logger.warning('Rate limiter falling back to in-process state | operation=%s error=%r', operation, exc)
+
+    def _key(self, name: str) -> str:
+        return f'{self._prefix}:{name}'
+
+    def _grant_allowance(self, key: str, remaining: float, now: float) -> None:
+        tokens = math.floor(remaining * self._local_fraction)
+        if tokens > 0:
+            with self._lock:
+                make_room(self._allowances, self._max_keys, lambda allowance: now >= allowance.expires)
+                self._allowances[key] = _Allowance(tokens, now + self._local_ttl)
+
+    # -- token buckets --------------------------------------------------------------------------------------------
+
+    def hit(self, key: str, rate: Rate, cost: int = 1) -> Decision:
+        """Consume `cost` tokens from bucket `key`, refilled continuously at `rate`."""
+        now = monotonic()
+        with self._lock:
+            allowance = self._allowances.get(key)
+            if allowance is not None and now < allowance.expires and allowance.tokens >= cost:
+                allowance.tokens -= cost
+                allowance.pending += cost
+                add_count('accentra.ratelimit.local_hits')
+                return Decision(True, allowance.tokens)
+            pending = allowance.pending if allowance is not None else 0
+            self._allowances.pop(key, None)
+
+        client = self._redis()
+        if client is not None:
+            try:
+                allowed, remaining, retry_after = self._bucket_script(
+                    keys=[self._key(key)], args=[rate.capacity, rate.per_second, cost, pending], client=client
+                )
+            except Exception as exc:  # Redis trouble must not fail requests; degrade to per-process limits
+                self._redis_failed('hit', exc)
+            else:
+                decision = Decision(bool(allowed), float(remaining), float(retry_after))
+                self._grant_allowance(key, decision.remaining, now)
+                return decision
+
+        with self._lock:
+            bucket = self._fallback.get(key)
+            if bucket is None:
+                make_room(self._fallback, self._max_keys, lambda bucket: now >= bucket.full_at)
+                bucket = self._fallback[key] = _LocalBucket(rate.capacity, now)
+            return bucket.take(rate, cost, now)
+
+    # -- failure lockout ------------------------------------------------------------------------------------------
+
+    def failures(self, key: str) -> int:
+        client = self._redis()
+        if client is not None:
+            try:
+                return int(client.get(self._key(key)) or 0)
+            except Exception as exc:  # Redis trouble must not fail requests; degrade to per-process limits
+                self._redis_failed('failures', exc)
+        with self._lock:
+            count, expires = self._failures.get(key, (0, 0.0))
+            return count if monotonic() < expires else 0
+
+    def record_failure(self, key: str, window_seconds: int) -> int:
+        client = self._redis()
+        if client is not None:
+            try:
+                return int(self._failure_script(keys=[self._key(key)], args=[window_seconds], client=client))
+            except Exception as exc:  # Redis trouble must not fail requests; degrade to per-process limits
+                self._redis_failed('record_failure', exc)
+        now = monotonic()
+        with self._lock:
+            count, expires = self._failures.pop(key, (0, 0.0))
+            if now >= expires:
+                count, expires = 0, now + window_seconds
+            make_room(self._failures, self._max_keys, lambda failure: now >= failure[1])
+            self._failures[key] = (count + 1, expires)
+            return count + 1
+
+    def reset(self, key: str) -> None:
+        client = self._redis()
+        if client is not None:
+            try:
+                client.delete(self._key(key))
+            except Exception as exc:  # Redis trouble must not fail requests; degrade to per-process limits
+                self._redis_failed('reset', exc)
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+__all__ = ['Rate', 'Decision', 'RateLimiter', 'parse_rate', 'make_room', 'get_rate_limiter']
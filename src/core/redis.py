@@ -0,0 +1,262 @@
+"""Process-wide Redis clients: one fork-aware connection pool per process, shared by the broker, caches and limiters.
+
+`redis` is imported lazily so importing this module stays cheap for the web app's startup path. Clients returned here
+time every command into `accentra.redis.command.duration` (labelled by `db.operation`; pipelines as `PIPELINE`).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from core.config import get_settings
+from core.instrumentation import record_duration
+
+if TYPE_CHECKING:
+    import redis
+    import redis.asyncio
+
+T = TypeVar('T')
+
+COMMAND_DURATION = 'accentra.redis.command.duration'
+
+_lock = threading.Lock()
+_pid: int | None = None
+_client: redis.Redis | None = None
+_async_client: redis.asyncio.Redis | None = None
+
+
+@dataclass(frozen=True)
+class RedisHealth:
+    ok: bool
+    latency_ms: float | None = None
+    error: str | None = None
+
+
+_health: RedisHealth | None = None
+_health_expires = 0.0
+
+
+def _record(operation: Any, started: float) -> None:
+    name = operation.decode() if isinstance(operation, bytes) else str(operation)
+    record_duration(COMMAND_DURATION, perf_counter() - started, {'db.operation': name.upper()})
+
+
+@lru_cache(maxsize=1)
+def _client_classes() -> tuple[type[redis.Redis], type[redis.asyncio.Redis]]:
+    import redis
+    import redis.asyncio
+    import redis.asyncio.client
+    import redis.client
+
+    class InstrumentedPipeline(redis.client.Pipeline):
+        def execute(self, raise_on_error: bool = True) -> list[Any]:
+            started = perf_counter()
+            try:
+                return super().execute(raise_on_error)
+            finally:
+                _record('PIPELINE', started)
+
+    class InstrumentedRedis(redis.Redis):
+        def execute_command(self, *args: Any, **options: Any) -> Any:
+            started = perf_counter()
+            try:
+                return super().execute_command(*args, **options)
+            finally:
+                _record(args[0], started)
+
+        def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+            return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    class InstrumentedAsyncPipeline(redis.asyncio.client.Pipeline):
+        async def execute(self, raise_on_error: bool = True) -> list[Any]:
+            started = perf_counter()
+            try:
+                return await super().execute(raise_on_error)
+            finally:
+                _record('PIPELINE', started)
+
+    class InstrumentedAsyncRedis(redis.asyncio.Redis):
+        async def execute_command(self, *args: Any, **options: Any) -> Any:
+            started = perf_counter()
+            try:
+                return await super().execute_command(*args, **options)
+            finally:
+                _record(args[0], started)
+
+        def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedAsyncPipeline:
+            return InstrumentedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    return InstrumentedRedis, InstrumentedAsyncRedis
+
+
+def _url() -> str:
+    redis_url = get_settings().redis_url
+    url = redis_url.get_secret_value() if redis_url else ''
+    if not url:
+        raise RuntimeError('REDIS_URL/redis_url is not configured')
+    return url
+
+
+def _pool_options() -> dict[str, Any]:
+    settings = get_settings()
+    return {
+        'max_connections': settings.redis_max_connections,
+        # Wait this long for a free pooled connection before failing, rather than opening more.
+        'timeout': settings.redis_socket_timeout_ms / 1000,
+        'socket_timeout': settings.redis_socket_timeout_ms / 1000,
+        'socket_connect_timeout': settings.redis_connect_timeout_ms / 1000,
+        'socket_keepalive': True,
+        'health_check_interval': settings.redis_health_check_interval_seconds,
+    }
+
+
+def _check_fork() -> None:
+    """Forget clients inherited from a parent process; the child builds its own pool on next use."""
+    global _pid, _client, _async_client, _health
+    pid = os.getpid()
+    if _pid != pid:
+        _pid = pid
+        _client = _async_client = _health = None
+
+
+def get_redis() -> redis.Redis:
+    """Return the process-wide synchronous client. Raises `RuntimeError` when Redis is not configured."""
+    global _client
+    with _lock:
+        _check_fork()
+        if _client is None:
+            import redis
+
+            sync_class, _ = _client_classes()
+            pool = redis.BlockingConnectionPool.from_url(_url(), **_pool_options())
+            _client = sync_class(connection_pool=pool)
+        return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Return the process-wide asyncio client (its own pool, same limits). Use from one event loop only."""
+    global _async_client
+    with _lock:
+        _check_fork()
+        if _async_client is None:
+            import redis.asyncio
+
+            _, async_class = _client_classes()
+            pool = redis.asyncio.BlockingConnectionPool.from_url(_url(), **_pool_options())
+            _async_client = async_class(connection_pool=pool)
+        return _async_client
+
+
+def redis_configured() -> bool:
+    url = get_settings().redis_url
+    return url is not None and bool(url.get_secret_value())
+
+
+def redis_target() -> str:
+    """`host:port/db` of the shared pool, for logs (never includes credentials)."""
+    kwargs = get_redis().connection_pool.connection_kwargs
+    if 'path' in kwargs:
+        return f'unix://{kwargs["path"]}/{kwargs.get("db", 0)}'
+    return f'{kwargs.get("host", "localhost")}:{kwargs.get("port", 6379)}/{kwargs.get("db", 0)}'
+
+
+@contextmanager
+def pipeline(*, transaction: bool = False) -> Iterator[Any]:
+    """Queue commands on a pipeline and send them in one round-trip when the block exits without error."""
+    pipe = get_redis().pipeline(transaction=transaction)
+    try:
+        yield pipe
+        pipe.execute()
+    finally:
+        pipe.reset()
+
+
+def pipelined(
+    items: Iterable[T],
+    queue: Callable[[Any, T], object],
+    *,
+    chunk_size: int | None = None,
+    transaction: bool = False,
+) -> list[Any]:
+    """Queue one or more commands per item with `queue(pipe, item)`, flushing every `chunk_size` items.
+
+    Returns the replies of all queued commands in order. Chunking bounds client memory and server-side blocking for
+    large batches while still paying one round-trip per chunk instead of one per command.
+    """
+    chunk_size = chunk_size or get_settings().redis_pipeline_chunk_size
+    client = get_redis()
+    results: list[Any] = []
+    pipe = client.pipeline(transaction=transaction)
+    pending = 0
+    try:
+        for item in items:
+            queue(pipe, item)
+            pending += 1
+            if pending >= chunk_size:
+                results.extend(pipe.execute())
+                pending = 0
+        if pending:
+            results.extend(pipe.execute())
+    finally:
+        pipe.reset()
+    return results
+
+
+def check_health(*, max_age: float | None = None) -> RedisHealth:
+    """PING Redis, caching the outcome for `max_age` seconds (default `redis_health_cache_seconds`)."""
+    global _health, _health_expires
+    settings = get_settings()
+    max_age = settings.redis_health_cache_seconds if max_age is None else max_age
+    now = monotonic()
+    if _health is not None and now < _health_expires:
+        return _health
+    if not redis_configured():
+        health = RedisHealth(ok=False, error='not configured')
+    else:
+        started = perf_counter()
+        try:
+            get_redis().ping()
+        except Exception as exc:  # any failure means "not healthy"; the caller decides what that implies
+            health = RedisHealth(ok=False, error=f'{type(exc).__name__}: {exc}')
+        else:
+            health = RedisHealth(ok=True, latency_ms=(perf_counter() - started) * 1000)
+    with _lock:
+        _health, _health_expires = health, now + max_age
+    return health
+
+
+def reset_redis_after_fork() -> None:
+    """Drop clients inherited across `fork()` without touching the parent's sockets."""
+    with _lock:
+        _check_fork()
+
+
+def close_redis() -> None:
+    global _client, _health
+    with _lock:
+        client, _client, _health = _client, None, None
+    if client is not None:
+        client.close()
+        client.connection_pool.disconnect()
+
+
+__all__ = [
+    'COMMAND_DURATION',
+    'RedisHealth',
+    'get_redis',
+    'get_async_redis',
+    'redis_configured',
+    'redis_target',
+    'pipeline',
+    'pipelined',
+    'check_health',
+    'reset_redis_after_fork',
+    'close_redis',
+]
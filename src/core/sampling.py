@@ -0,0 +1,139 @@
+"""Trace sampling and span export policies; imported only once tracing is configured."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import (
+    Link,
+    SpanContext,
+    SpanKind,
+    StatusCode,
+    TraceFlags,
+    get_current_span,
+)
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+from core.instrumentation import add_count
+
+
+class RouteAwareSampler(Sampler):
+    """Parent-based ratio sampling that never samples excluded routes.
+
+    With `record_unsampled` enabled, root spans that lose the ratio draw are still recorded (but not exported) so
+    that `ErrorRetainingSpanProcessor` can export them if they end in an error.
+    """
+
+    def __init__(self, ratio: float, *, excluded_routes: Iterable[str] = (), record_unsampled: bool = False) -> None:
+        self._delegate = ParentBased(root=TraceIdRatioBased(ratio))
+        self._excluded_routes = frozenset(excluded_routes)
+        self._record_unsampled = record_unsampled
+
+    def should_sample(
+        self,
+        parent_context: Context | None,
+        trace_id: int,
+        name: str,
+        kind: SpanKind | None = None,
+        attributes: Attributes = None,
+        links: Sequence[Link] | None = None,
+        trace_state: TraceState | None = None,
+    ) -> SamplingResult:
+        if attributes and attributes.get('url.path') in self._excluded_routes:
+            return SamplingResult(Decision.DROP)
+
+        result = self._delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        is_root = not get_current_span(parent_context).get_span_context().is_valid
+        if result.decision is Decision.DROP and self._record_unsampled and is_root:
+            return SamplingResult(Decision.RECORD_ONLY, attributes, trace_state)
+        return result
+
+    def get_description(self) -> str:
+        return f'RouteAwareSampler{{{self._delegate.get_description()}}}'
+
+
+def _export_queue(processor: SpanProcessor) -> deque | None:
+    # The SDK keeps its bounded queue in a private attribute whose location moved between releases.
+    batch_processor = getattr(processor, '_batch_processor', None)
+    queue = getattr(batch_processor, '_queue', None) if batch_processor else getattr(processor, 'queue', None)
+    return queue if isinstance(queue, deque) and queue.maxlen else None
+
+
+def _as_sampled(span: ReadableSpan) -> ReadableSpan:
+    context = span.context
+    assert context is not None
+    sampled_context = SpanContext(
+        context.trace_id,
+        context.span_id,
+        context.is_remote,
+        TraceFlags(TraceFlags.SAMPLED),
+        context.trace_state,
+    )
+    return ReadableSpan(
+        name=span.name,
+        context=sampled_context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class ErrorRetainingSpanProcessor(SpanProcessor):
+    """Wrap a batch processor: export errored spans even if unsampled, and count spans dropped on a full queue."""
+
+    def __init__(self, delegate: SpanProcessor, *, retain_errors: bool = True) -> None:
+        self._retain_errors = retain_errors
+        self._delegate = delegate
+        self._queue = _export_queue(delegate)
+
+    def queue_fill(self) -> float:
+        """Fraction of the export queue in use (0.0 when the delegate exposes no queue)."""
+        queue = self._queue
+        if queue is None or not queue.maxlen:
+            return 0.0
+        return len(queue) / queue.maxlen
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        context = span.context
+        if context is None:
+            return
+        if not context.trace_flags.sampled:
+            if not (self._retain_errors and span.status.status_code is StatusCode.ERROR):
+                return
+            span = _as_sampled(span)
+            add_count('accentra.otel.spans.retained_errors')
+
+        queue = self._queue
+        if queue is not None and len(queue) >= queue.maxlen:  # type: ignore[operator]
+            add_count('accentra.otel.spans.dropped')
+        self._delegate.on_end(span)
+
+    def shutdown(self) -> None:
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
+
+
+__all__ = ['RouteAwareSampler', 'ErrorRetainingSpanProcessor']
@@ -0,0 +1,143 @@
+"""Prefork production server: gunicorn managing uvicorn workers, with fork-safe resource handling."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+from core.config import Settings, get_settings
+
+APP_MODULE = 'main'
+WORKER_CLASS = 'uvicorn_worker.UvicornWorker'
+
+logger = logging.getLogger(__name__)
+
+
+# cgroup v2 exposes "<quota> <period>" (quota `max` when unlimited); v1 splits them, with a quota of -1 when unlimited.
+CGROUP_V2_CPU_MAX = Path('/sys/fs/cgroup/cpu.max')
+CGROUP_V1_CPU_QUOTA = Path('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+CGROUP_V1_CPU_PERIOD = Path('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+
+
+def cgroup_cpu_limit() -> float | None:
+    """CPUs allowed by the cgroup CPU quota (`docker --cpus`, Kubernetes CPU limits), or None without a quota."""
+    try:
+        if CGROUP_V2_CPU_MAX.exists():
+            quota, period = CGROUP_V2_CPU_MAX.read_text().split()[:2]
+            return None if quota == 'max' else int(quota) / int(period)
+        if CGROUP_V1_CPU_QUOTA.exists():
+            quota = int(CGROUP_V1_CPU_QUOTA.read_text())
+            return None if quota <= 0 else quota / int(CGROUP_V1_CPU_PERIOD.read_text())
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def default_workers() -> int:
+    """One worker per CPU available to this process: its CPU set, capped by a cgroup CPU quota rounded up."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - platforms without sched_getaffinity
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def reset_after_fork() -> None:
+    """Drop state a worker must not share with the master: pooled DB/Redis connections and the log thread.
+
+    OTLP exporters need no reset: observability is set up in the application lifespan, which runs in each worker.
+    """
+    from core.db import dispose_engine_after_fork
+    from core.logging import reset_logging_after_fork
+    from core.redis import reset_redis_after_fork
+
+    dispose_engine_after_fork()
+    reset_redis_after_fork()
+    reset_logging_after_fork()
+
+
+def post_fork(_server: Any, worker: Any) -> None:
+    reset_after_fork()
+    logger.info('Worker started | pid=%s', worker.pid)
+
+
+def worker_exit(_server: Any, _worker: Any) -> None:
+    from core.logging import shutdown_logging
+
+    shutdown_logging()
+
+
+def build_options(settings: Settings, **overrides: Any) -> dict[str, Any]:
+    options: dict[str, Any] = {
+        'bind': f'{settings.server_host}:{settings.server_port}',
+        'workers': settings.server_workers or default_workers(),
+        'worker_class': WORKER_CLASS,
+        'preload_app': settings.server_preload,
+        'max_requests': settings.server_max_requests,
+        'max_requests_jitter': settings.server_max_requests_jitter,
+        'timeout': settings.server_timeout_seconds,
+        'graceful_timeout': settings.server_graceful_timeout_seconds,
+        'keepalive': settings.server_keepalive_seconds,
+        # Access logs come from uvicorn through the queue-backed logging pipeline.
+        'accesslog': None,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return options
+
+
+def _load_app() -> Any:
+    from importlib import import_module
+
+    return import_module(APP_MODULE).app
+
+
+def run(options: dict[str, Any]) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class AccentraServer(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Any:
+            return _load_app()
+
+    AccentraServer().run()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Run Accentra under a prefork process manager.')
+    parser.add_argument('--bind', help='host:port to listen on (default: SERVER_HOST:SERVER_PORT).')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: SERVER_WORKERS or CPU count).')
+    parser.add_argument('--max-requests', type=int, help='Recycle a worker after this many requests (0 disables).')
+    preload = parser.add_mutually_exclusive_group()
+    preload.add_argument('--preload', dest='preload_app', action='store_true', default=None)
+    preload.add_argument('--no-preload', dest='preload_app', action='store_false')
+    args = parser.parse_args(argv)
+
+    options = build_options(
+        get_settings(),
+        bind=args.bind,
+        workers=args.workers,
+        max_requests=args.max_requests,
+        preload_app=args.preload_app,
+    )
+    run(options)
+    return 0
+
+
+__all__ = ['cgroup_cpu_limit', 'default_workers', 'reset_after_fork', 'build_options', 'run', 'main']
+
+
+if __name__ == '__main__':  # pragma: no cover - CLI entry point
+    sys.exit(main())
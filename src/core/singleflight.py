@@ -0,0 +1,71 @@
+"""Request coalescing: concurrent callers asking for the same key share one in-flight load and its result."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar
+
+from core.instrumentation import add_count
+
+T = TypeVar('T')
+
+
+class _Call:
+    __slots__ = ('done', 'error', 'result')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Run at most one loader per key at a time; callers arriving while it runs wait for and share its outcome.
+
+    Nothing is remembered once the load finishes, so this only collapses bursts: it is meant to sit underneath a cache
+    (call the cache's loader through `do`) or directly in front of the database when there is no cache yet.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[str, Hashable], _Call] = {}
+
+    def do(self, entity: str, key: Hashable, load: Callable[[], T]) -> tuple[T, bool]:
+        """Return `(result, shared)`; `shared` is True when the result came from another caller's load.
+
+        Exceptions raised by the loader propagate to every caller waiting on it.
+        """
+        flight_key = (entity, key)
+        with self._lock:
+            call = self._calls.get(flight_key)
+            leader = call is None
+            if leader:
+                call = self._calls[flight_key] = _Call()
+        assert call is not None
+
+        if not leader:
+            add_count('accentra.singleflight.coalesced', 1, {'flight': self.name, 'entity': entity})
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = load()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(flight_key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+__all__ = ['SingleFlight']
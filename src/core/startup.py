@@ -0,0 +1,99 @@
+"""Cold-start profiling based on CPython's `-X importtime` report."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+_HEADER_PREFIX = 'import time: self'
+_LINE_PREFIX = 'import time:'
+
+
+class ImportProfileError(RuntimeError):
+    """Raised when the profiled import fails in the child interpreter."""
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def _child_env() -> dict[str, str]:
+    # Mirror the current interpreter's search path so the child resolves the same modules.
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if path)
+    return env
+
+
+def parse_importtime(report: str) -> list[ImportTiming]:
+    """Parse the stderr output of `python -X importtime` into timings in import order."""
+    timings: list[ImportTiming] = []
+    for line in report.splitlines():
+        if not line.startswith(_LINE_PREFIX) or line.startswith(_HEADER_PREFIX):
+            continue
+        self_part, cumulative_part, name_part = line[len(_LINE_PREFIX) :].split('|', 2)
+        module = name_part.strip()
+        depth = (len(name_part) - len(name_part.lstrip(' ')) - 1) // 2
+        timings.append(ImportTiming(module, int(self_part), int(cumulative_part), depth))
+    return timings
+
+
+def profile_imports(module: str, *, python: str = sys.executable) -> list[ImportTiming]:
+    """Import `module` in a fresh interpreter and return the per-module import timings."""
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        env=_child_env(),
+        check=False,
+    )
+    if result.returncode != 0:
+        raise ImportProfileError(f'Importing {module!r} failed:\n{result.stderr[-2000:]}')
+    return parse_importtime(result.stderr)
+
+
+def import_time_seconds(timings: list[ImportTiming], module: str) -> float:
+    """Return the cumulative cold import time of `module` from a profile."""
+    for timing in reversed(timings):
+        if timing.module == module and timing.depth == 0:
+            return timing.cumulative_us / 1_000_000
+    raise ImportProfileError(f'{module!r} does not appear as a top-level import in the profile')
+
+
+def format_report(timings: list[ImportTiming], module: str, *, top: int) -> str:
+    total = import_time_seconds(timings, module)
+    slowest = sorted(timings, key=lambda timing: timing.cumulative_us, reverse=True)[:top]
+    lines = [f'Cold import of {module}: {total * 1000:.1f} ms ({len(timings)} modules)', '']
+    lines.append(f'{"cumulative ms":>14} {"self ms":>9}  module')
+    for timing in slowest:
+        indent = '  ' * timing.depth
+        lines.append(f'{timing.cumulative_us / 1000:>14.1f} {timing.self_us / 1000:>9.1f}  {indent}{timing.module}')
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Report the cold import profile of an Accentra module.')
+    parser.add_argument('module', nargs='?', default='main', help='Module to import (default: main).')
+    parser.add_argument('--top', type=int, default=25, help='Number of slowest modules to list.')
+    parser.add_argument('--budget', type=float, default=None, help='Fail when the import exceeds this many seconds.')
+    args = parser.parse_args(argv)
+
+    timings = profile_imports(args.module)
+    print(format_report(timings, args.module, top=args.top))
+    if args.budget is not None and import_time_seconds(timings, args.module) > args.budget:
+        print(f'\nImport budget of {args.budget:.2f}s exceeded.', file=sys.stderr)
+        return 1
+    return 0
+
+
+__all__ = ['ImportTiming', 'ImportProfileError', 'parse_importtime', 'profile_imports', 'import_time_seconds', 'main']
+
+
+if __name__ == '__main__':  # pragma: no cover - CLI entry point
+    sys.exit(main())
@@ -1,8 +1,20 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from core import configure_logging, get_settings, init_observability
+from core.admission import AdmissionControlMiddleware, size_threadpool
+from core.db import StatementContextMiddleware, stop_explain_capture
+from core.health import readiness, start_readiness_checker, stop_readiness_checker
+from core.instrumentation import RequestInstrumentationMiddleware
 from users.api import router as identity_router
+from users.audit import start_audit_pipeline, stop_audit_pipeline
+from users.events import start_change_relay, stop_change_relay
+from users.metering import start_metering_pipeline, stop_metering_pipeline
 
 origins = [
     'http://localhost',
@@ -10,13 +22,50 @@ origins = [
 ]
 
 
+_app: FastAPI | None = None
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Exporters start with the server rather than at import so cold imports stay cheap.
+    init_observability()
+    if get_settings().admission_enabled:
+        size_threadpool()
+    start_audit_pipeline()
+    start_metering_pipeline()
+    start_change_relay()
+    start_readiness_checker()
+    try:
+        yield
+    finally:
+        stop_readiness_checker()
+        stop_change_relay()
+        stop_explain_capture()
+        stop_metering_pipeline()
+        stop_audit_pipeline()
+
+
 def create_app() -> FastAPI:
     configure_logging()
-    init_observability()
     settings = get_settings()
 
-    application = FastAPI(title=settings.app_name, version=settings.version)
+    application = FastAPI(title=settings.app_name, version=settings.version, lifespan=lifespan)
+
+    # Starlette wraps in reverse order: CORS, then instrumentation (which also sees rejections), then admission, then
+    # profiling, so Server-Timing covers the application and not the admission queue.
+    if settings.slow_query_log_enabled:
+        application.add_middleware(StatementContextMiddleware)
+    if settings.profiling_enabled:
+        from core.db import install_statement_timing
+        from core.profiling import ProfilingMiddleware
+        from core.profiling import router as profiling_router
 
+        install_statement_timing()
+        application.add_middleware(ProfilingMiddleware)
+        application.include_router(profiling_router)
+    if settings.admission_enabled:
+        application.add_middleware(AdmissionControlMiddleware)
+    application.add_middleware(RequestInstrumentationMiddleware)
     application.add_middleware(
         CORSMiddleware,
         allow_origins=origins,
@@ -30,11 +79,23 @@ def create_app() -> FastAPI:
         return {'status': 'ok'}
 
     @application.get('/readyz')
-    async def readyz():  # pragma: no cover - trivial endpoint
-        return {'status': 'ready'}
+    async def readyz() -> JSONResponse:
+        # Reads results cached by the background checker; never probes dependencies on the request path.
+        ready, checks = readiness()
+        return JSONResponse(
+            {'status': 'ready' if ready else 'not_ready', 'checks': jsonable_encoder(checks)},
+            status_code=200 if ready else 503,
+        )
 
     application.include_router(identity_router)
     return application
 
 
-app = create_app()
+def __getattr__(name: str) -> FastAPI:
+    # `uvicorn src.main:app` resolves the attribute lazily, so importing this module does not build the app.
+    global _app
+    if name != 'app':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    if _app is None:
+        _app = create_app()
+    return _app
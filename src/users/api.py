@@ -1,44 +1,84 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta
+from typing import Any, Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 
-from core.db import get_session_dependency
-from users.models import Membership, Tenant, User
+from core.config import get_settings
+from core.profiling import TimedRoute
+from users.archive import list_restorable_memberships, restore_user
+from users.audit import AuditEntry, record_audit
+from users.authorization import (
+    ensure_can_grant,
+    ensure_tenant,
+    get_current_principal,
+    get_session,
+    is_internal,
+    require,
+    require_internal,
+    role_at_least,
+    scope_set,
+)
+from users.events import list_changes
+from users.export import MEDIA_TYPES, stream_tenant_export
+from users.metering import query_usage, record_active_user, record_usage
+from users.models import AuditAction, Membership, Role, Tenant, UsageMetric, User
+from users.ratelimit import (
+    enforce_login_limits,
+    enforce_registration_limit,
+    record_login_failure,
+    record_login_success,
+)
 from users.schemas import (
+    ChangeEventRead,
+    ChangeFeed,
+    ClientCredentialsRequest,
     LoginRequest,
     MembershipCreate,
     MembershipRead,
+    ProvisionRequest,
+    ProvisionResult,
+    ServiceAccountCreate,
+    ServiceAccountCreated,
     TenantCreate,
     TenantRead,
+    TenantUsageReport,
     Token,
-    TokenPayload,
+    UsageBucket,
     UserCreate,
+    UserSearchPage,
     UserUpdate,
     UserWithMemberships,
 )
-from users.security import AuthenticationError, create_access_token, decode_access_token
+from users.security import create_access_token
 from users.service import (
+    Principal,
+    SearchMatch,
     authenticate_user,
     create_membership,
     create_tenant,
     create_user,
-    get_membership,
+    delete_user,
     get_tenant,
     get_user,
     list_memberships,
+    provision_user,
+    search_users,
     update_user,
 )
+from users.service_accounts import (
+    create_service_account,
+    deactivate_service_account,
+    get_service_account,
+    issue_client_token,
+    rotate_client_secret,
+)
 
-router = APIRouter(prefix='/identity')
-bearer_scheme = HTTPBearer(auto_error=False)
-
-
-def get_session(session: Session = Depends(get_session_dependency)) -> Session:
-    return session
+router = APIRouter(prefix='/identity', route_class=TimedRoute)
 
 
 def to_tenant_read(tenant: Tenant) -> TenantRead:
@@ -49,38 +89,31 @@ def to_membership_read(membership: Membership) -> MembershipRead:
     return MembershipRead.model_validate(membership, from_attributes=True)
 
 
-def serialize_user(session: Session, user: User) -> UserWithMemberships:
-    memberships = [to_membership_read(membership) for membership in list_memberships(session, user.id)]
-    data = UserWithMemberships.model_validate(user, from_attributes=True)
-    return data.model_copy(update={'memberships': memberships})
-
+def audit(request: Request, action: AuditAction, **fields: Any) -> None:
+    record_audit(
+        AuditEntry(
+            action=action,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get('user-agent'),
+            **fields,
+        )
+    )
 
-def get_current_context(
-    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
-    session: Session = Depends(get_session),
-) -> tuple[User, Membership, TokenPayload]:
-    if credentials is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Missing bearer token')
-    token = credentials.credentials
-    try:
-        payload = decode_access_token(token)
-    except AuthenticationError as exc:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
 
-    user = get_user(session, payload.sub)
-    if user is None or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found or inactive')
+def actor_of(principal: Principal) -> UUID | None:
+    return None if is_internal(principal) else principal.user_id
 
-    membership = get_membership(session, user.id, payload.tid)
-    if membership is None:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Membership not found for tenant')
 
-    return user, membership, payload
+def serialize_user(session: Session, user: User) -> UserWithMemberships:
+    memberships = [to_membership_read(membership) for membership in list_memberships(session, user.id)]
+    data = UserWithMemberships.model_validate(user, from_attributes=True)
+    return data.model_copy(update={'memberships': memberships})
 
 
 @router.post('/tenants', response_model=TenantRead, status_code=status.HTTP_201_CREATED, tags=['tenants'])
-def register_tenant(payload: TenantCreate, session: Session = Depends(get_session)) -> TenantRead:
+def register_tenant(payload: TenantCreate, request: Request, session: Session = Depends(get_session)) -> TenantRead:
     tenant = create_tenant(session, payload)
+    audit(request, AuditAction.tenant_created, subject_id=tenant.id, tenant_id=tenant.id)
     return to_tenant_read(tenant)
 
 
@@ -92,38 +125,265 @@ def read_tenant(tenant_id: UUID, session: Session = Depends(get_session)) -> Ten
     return to_tenant_read(tenant)
 
 
+@router.get('/tenants/{tenant_id}/export', response_class=StreamingResponse, tags=['tenants'])
+def export_tenant(
+    tenant_id: UUID,
+    request: Request,
+    export_format: Literal['ndjson', 'csv'] = Query(default='ndjson', alias='format'),
+    after: UUID | None = Query(default=None, description='Resume after this `membership_id` (last one received).'),
+    limit: int | None = Query(default=None, ge=1),
+    principal: Principal = Depends(require('tenants:export')),
+    session: Session = Depends(get_session),
+) -> StreamingResponse:
+    ensure_tenant(principal, tenant_id)
+    if get_tenant(session, tenant_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Tenant not found')
+    audit(
+        request,
+        AuditAction.tenant_exported,
+        actor_id=principal.user_id,
+        tenant_id=tenant_id,
+        details={'format': export_format, 'after': str(after) if after else None},
+    )
+    return StreamingResponse(
+        stream_tenant_export(tenant_id, export_format, after=after, limit=limit),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="tenant-{tenant_id}.{export_format}"'},
+    )
+
+
+@router.post(
+    '/tenants/{tenant_id}/service-accounts',
+    response_model=ServiceAccountCreated,
+    status_code=status.HTTP_201_CREATED,
+    tags=['tenants'],
+)
+def register_service_account(
+    tenant_id: UUID,
+    payload: ServiceAccountCreate,
+    request: Request,
+    principal: Principal = Depends(require('service_accounts:write')),
+    session: Session = Depends(get_session),
+) -> ServiceAccountCreated:
+    ensure_tenant(principal, tenant_id)
+    ensure_can_grant(principal, payload.role, payload.scopes)
+    if get_tenant(session, tenant_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Tenant not found')
+    account = create_service_account(session, tenant_id, payload)
+    audit(
+        request,
+        AuditAction.service_account_created,
+        actor_id=actor_of(principal),
+        subject_id=account.id,
+        tenant_id=tenant_id,
+        details={'role': account.role.value},
+    )
+    return account
+
+
+@router.post(
+    '/tenants/{tenant_id}/service-accounts/{account_id}/rotate-secret',
+    response_model=ServiceAccountCreated,
+    tags=['tenants'],
+)
+def rotate_service_account_secret(
+    tenant_id: UUID,
+    account_id: UUID,
+    request: Request,
+    principal: Principal = Depends(require('service_accounts:write')),
+    session: Session = Depends(get_session),
+) -> ServiceAccountCreated:
+    ensure_tenant(principal, tenant_id)
+    account = get_service_account(session, tenant_id, account_id)
+    # Whoever holds the new secret acts with the account's role and scopes.
+    ensure_can_grant(principal, account.role, account.scopes)
+    created = rotate_client_secret(session, account)
+    audit(
+        request,
+        AuditAction.service_account_secret_rotated,
+        actor_id=actor_of(principal),
+        subject_id=account_id,
+        tenant_id=tenant_id,
+    )
+    return created
+
+
+@router.delete(
+    '/tenants/{tenant_id}/service-accounts/{account_id}', status_code=status.HTTP_204_NO_CONTENT, tags=['tenants']
+)
+def remove_service_account(
+    tenant_id: UUID,
+    account_id: UUID,
+    request: Request,
+    principal: Principal = Depends(require('service_accounts:delete')),
+    session: Session = Depends(get_session),
+) -> Response:
+    ensure_tenant(principal, tenant_id)
+    account = get_service_account(session, tenant_id, account_id)
+    if not role_at_least(principal.role, account.role):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail='Cannot manage a service account with a higher role'
+        )
+    deactivate_service_account(session, account)
+    audit(
+        request,
+        AuditAction.service_account_deactivated,
+        actor_id=actor_of(principal),
+        subject_id=account_id,
+        tenant_id=tenant_id,
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get('/tenants/{tenant_id}/usage', response_model=TenantUsageReport, tags=['tenants'])
+def read_tenant_usage(
+    tenant_id: UUID,
+    start: datetime | None = Query(default=None, description='Inclusive UTC start; defaults to 30 days before `end`.'),
+    end: datetime | None = Query(default=None, description='Exclusive UTC end; defaults to now.'),
+    metric: list[UsageMetric] | None = Query(default=None, description='Limit the report to these metrics.'),
+    principal: Principal = Depends(require('usage:read')),
+    session: Session = Depends(get_session),
+) -> TenantUsageReport:
+    ensure_tenant(principal, tenant_id)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    totals, buckets = query_usage(session, tenant_id, start, end, metric)
+    return TenantUsageReport(
+        tenant_id=tenant_id,
+        start=start,
+        end=end,
+        totals=totals,
+        buckets=[UsageBucket.model_validate(bucket, from_attributes=True) for bucket in buckets],
+    )
+
+
 @router.post('/users', response_model=UserWithMemberships, status_code=status.HTTP_201_CREATED, tags=['users'])
-def register_user(payload: UserCreate, session: Session = Depends(get_session)) -> UserWithMemberships:
+def register_user(
+    payload: UserCreate, request: Request, session: Session = Depends(get_session)
+) -> UserWithMemberships:
+    enforce_registration_limit(request)
     user = create_user(session, payload)
+    audit(request, AuditAction.user_created, subject_id=user.id)
     return serialize_user(session, user)
 
 
 @router.get('/users/me', response_model=UserWithMemberships, tags=['users'])
 def read_current_user(
-    context: tuple[User, Membership, TokenPayload] = Depends(get_current_context),
+    principal: Principal = Depends(get_current_principal),
     session: Session = Depends(get_session),
 ) -> UserWithMemberships:
-    user, membership, _ = context
-    # Refresh membership to ensure latest data is returned.
-    session.refresh(user)
-    session.refresh(membership)
+    user = get_user(session, principal.user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found or inactive')
     return serialize_user(session, user)
 
 
+@router.get('/users/search', response_model=UserSearchPage, tags=['users'])
+def find_users(
+    q: str = Query(
+        min_length=3, max_length=255, description='Start (or, with `match=contains`, part) of email or name.'
+    ),
+    match: SearchMatch = Query(default='prefix'),
+    tenant_id: UUID | None = Query(default=None, description='Tenant to search; defaults to the token tenant.'),
+    after: UUID | None = Query(default=None, description='Cursor returned as `next_cursor` by the previous page.'),
+    limit: int = Query(default=20, ge=1, le=100),
+    principal: Principal = Depends(require('users:read')),
+    session: Session = Depends(get_session),
+) -> UserSearchPage:
+    # Bearer callers only ever see their own tenant; internal callers search everyone unless they pass a tenant.
+    if not is_internal(principal):
+        if tenant_id is not None:
+            ensure_tenant(principal, tenant_id)
+        tenant_id = principal.tenant_id
+    return search_users(session, q, tenant_id=tenant_id, match=match, after=after, limit=limit)
+
+
 @router.get('/users/{user_id}', response_model=UserWithMemberships, tags=['users'])
 def read_user(user_id: UUID, session: Session = Depends(get_session)) -> UserWithMemberships:
     user = get_user(session, user_id)
-    if user is None:
+    if user is None or user.deleted_at is not None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
     return serialize_user(session, user)
 
 
-@router.patch('/users/{user_id}', response_model=UserWithMemberships, tags=['users'])
-def modify_user(user_id: UUID, payload: UserUpdate, session: Session = Depends(get_session)) -> UserWithMemberships:
+def ensure_can_manage(principal: Principal, roles: dict[UUID, Role], *, account_wide: bool = False) -> None:
+    """Reject bearer callers that may not manage a user whose role per tenant is `roles`.
+
+    Members are only managed by callers of at least their role in the tenant. `account_wide` changes (password,
+    activation, deletion, restore) affect every tenant the user belongs to, so they are refused for users who are also
+    members of other tenants.
+    """
+    role = roles.get(principal.tenant_id)
+    if role is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
+    if not role_at_least(principal.role, role):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Cannot manage a member with a higher role')
+    if account_wide and any(tenant_id != principal.tenant_id for tenant_id in roles):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='User is also a member of other tenants')
+
+
+def load_managed_user(
+    session: Session, principal: Principal, user_id: UUID, scope: str, *, account_wide: bool = False
+) -> User:
+    """Load a user the caller may act on: themselves, or with `scope` a member of the caller's tenant."""
+    if principal.user_id != user_id and not is_internal(principal):
+        if not scope_set(principal).allows(scope):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Insufficient scope')
+        roles = {membership.tenant_id: membership.role for membership in list_memberships(session, user_id)}
+        ensure_can_manage(principal, roles, account_wide=account_wide)
     user = get_user(session, user_id)
-    if user is None:
+    if user is None or user.deleted_at is not None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
+    return user
+
+
+@router.patch('/users/{user_id}', response_model=UserWithMemberships, tags=['users'])
+def modify_user(
+    user_id: UUID,
+    payload: UserUpdate,
+    request: Request,
+    principal: Principal = Depends(require()),
+    session: Session = Depends(get_session),
+) -> UserWithMemberships:
+    account_wide = bool({'password', 'is_active'} & payload.model_fields_set)
+    user = load_managed_user(session, principal, user_id, 'users:write', account_wide=account_wide)
     user = update_user(session, user, payload)
+    audit(
+        request,
+        AuditAction.user_updated,
+        actor_id=actor_of(principal),
+        subject_id=user.id,
+        details={'fields': sorted(payload.model_fields_set)},
+    )
+    return serialize_user(session, user)
+
+
+@router.delete('/users/{user_id}', status_code=status.HTTP_204_NO_CONTENT, tags=['users'])
+def remove_user(
+    user_id: UUID,
+    request: Request,
+    principal: Principal = Depends(require()),
+    session: Session = Depends(get_session),
+) -> Response:
+    delete_user(session, load_managed_user(session, principal, user_id, 'users:delete', account_wide=True))
+    audit(request, AuditAction.user_deleted, actor_id=actor_of(principal), subject_id=user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post('/users/{user_id}/restore', response_model=UserWithMemberships, tags=['users'])
+def restore_deleted_user(
+    user_id: UUID,
+    request: Request,
+    principal: Principal = Depends(require('users:write')),
+    session: Session = Depends(get_session),
+) -> UserWithMemberships:
+    tenant_id = None
+    if not is_internal(principal):
+        tenant_id = principal.tenant_id
+        # Restoring reactivates the whole account, so it is authorized like any other account-wide change.
+        ensure_can_manage(principal, list_restorable_memberships(session, user_id), account_wide=True)
+    user = restore_user(session, user_id, tenant_id=tenant_id)
+    audit(request, AuditAction.user_restored, actor_id=actor_of(principal), subject_id=user_id, tenant_id=tenant_id)
     return serialize_user(session, user)
 
 
@@ -133,14 +393,71 @@ def modify_user(user_id: UUID, payload: UserUpdate, session: Session = Depends(g
     status_code=status.HTTP_201_CREATED,
     tags=['users'],
 )
-def add_membership(user_id: UUID, payload: MembershipCreate, session: Session = Depends(get_session)) -> MembershipRead:
+def add_membership(
+    user_id: UUID,
+    payload: MembershipCreate,
+    request: Request,
+    principal: Principal = Depends(require('memberships:write')),
+    session: Session = Depends(get_session),
+) -> MembershipRead:
+    ensure_tenant(principal, payload.tenant_id)
+    ensure_can_grant(principal, payload.role, payload.scopes)
     membership = create_membership(session, user_id, payload)
+    audit(
+        request,
+        AuditAction.membership_created,
+        actor_id=actor_of(principal),
+        subject_id=user_id,
+        tenant_id=membership.tenant_id,
+        details={'role': membership.role.value},
+    )
     return to_membership_read(membership)
 
 
+@router.post('/provision', response_model=ProvisionResult, status_code=status.HTTP_201_CREATED, tags=['users'])
+def provision(
+    payload: ProvisionRequest,
+    request: Request,
+    principal: Principal = Depends(require('users:write', 'memberships:write')),
+    session: Session = Depends(get_session),
+) -> ProvisionResult:
+    ensure_tenant(principal, payload.tenant_id)
+    ensure_can_grant(principal, payload.role, payload.scopes)
+    result = provision_user(session, payload)
+    if result.user_created:
+        audit(request, AuditAction.user_created, actor_id=actor_of(principal), subject_id=result.user.id)
+    audit(
+        request,
+        AuditAction.membership_created,
+        actor_id=actor_of(principal),
+        subject_id=result.user.id,
+        tenant_id=result.membership.tenant_id,
+        details={'role': result.membership.role.value},
+    )
+    return result
+
+
 @router.post('/auth/login', response_model=Token, tags=['auth'])
-def login(payload: LoginRequest, session: Session = Depends(get_session)) -> Token:
-    user, membership = authenticate_user(session, payload)
+def login(payload: LoginRequest, request: Request, session: Session = Depends(get_session)) -> Token:
+    # Limits and lockout are checked before authenticate_user spends any time on password hashing.
+    enforce_login_limits(request, session, payload.email, payload.tenant_id)
+    try:
+        user, membership = authenticate_user(session, payload)
+    except HTTPException as exc:
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            record_login_failure(payload.email)
+        audit(
+            request,
+            AuditAction.login_failed,
+            tenant_id=payload.tenant_id,
+            details={'email': payload.email, 'status': exc.status_code},
+        )
+        raise
+    record_login_success(payload.email)
+    record_usage(membership.tenant_id, UsageMetric.logins)
+    record_usage(membership.tenant_id, UsageMetric.tokens_issued)
+    record_active_user(membership.tenant_id, user.id)
+    audit(request, AuditAction.login_succeeded, actor_id=user.id, subject_id=user.id, tenant_id=membership.tenant_id)
     token = create_access_token(
         subject=user.id,
         tenant_id=membership.tenant_id,
@@ -149,3 +466,23 @@ def login(payload: LoginRequest, session: Session = Depends(get_session)) -> Tok
         plan=membership.plan,
     )
     return Token(access_token=token)
+
+
+@router.post('/auth/token', response_model=Token, tags=['auth'])
+def client_credentials_token(payload: ClientCredentialsRequest, session: Session = Depends(get_session)) -> Token:
+    # Repeated requests with the same credentials are answered from the token cache without a database query.
+    return issue_client_token(session, payload.client_id, payload.client_secret)
+
+
+@router.get('/changes', response_model=ChangeFeed, tags=['changes'])
+def read_changes(
+    after: int = Query(default=0, ge=0, description='Cursor returned as `next_cursor` by the previous page.'),
+    limit: int = Query(default=100, ge=1, le=500),
+    _: Principal = Depends(require_internal),
+    session: Session = Depends(get_session),
+) -> ChangeFeed:
+    events = list_changes(session, after=after, limit=limit, settle_ms=get_settings().change_feed_settle_ms)
+    return ChangeFeed(
+        events=[ChangeEventRead.model_validate(event, from_attributes=True) for event in events],
+        next_cursor=events[-1].id if events else after,  # type: ignore[arg-type]
+    )
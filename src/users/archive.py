@@ -0,0 +1,141 @@
+"""Cold archiving: long-inactive users and their memberships move to archive tables, and back on restore.
+
+Inactive users cannot log in, but while they stay in `users` and `user_tenants` every unique index, membership join and
+export still carries them. The archiver moves them out in small transactions so the hot tables only hold the working
+set; a restore moves a user back.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from core.config import get_settings
+from core.instrumentation import add_count
+from users.models import (
+    ChangeAction,
+    Membership,
+    MembershipArchive,
+    Role,
+    User,
+    UserArchive,
+)
+from users.service import get_user, record_user_change
+
+logger = logging.getLogger(__name__)
+
+# Columns shared by each hot table and its archive; `archived_at` is filled in by the archive table's default.
+_USER_COLUMNS = tuple(column.name for column in User.__table__.columns)  # type: ignore[attr-defined]
+_MEMBERSHIP_COLUMNS = tuple(column.name for column in Membership.__table__.columns)  # type: ignore[attr-defined]
+
+
+def _move(session: Session, source: type, target: type, columns: tuple[str, ...], where) -> int:
+    source_table, target_table = source.__table__, target.__table__
+    rows = select(*(source_table.c[name] for name in columns)).where(where)
+    session.execute(insert(target_table).from_select(list(columns), rows))
+    return session.execute(delete(source_table).where(where)).rowcount  # type: ignore[attr-defined]
+
+
+def archive_inactive_users(session: Session, *, inactive_days: int | None = None, batch_size: int | None = None) -> int:
+    """Move one batch of users inactive for `inactive_days` (and their memberships) to the archive tables.
+
+    Candidates are locked with `SKIP LOCKED`, so concurrent archivers take disjoint batches and a user being edited
+    right now is skipped rather than waited for. Returns the number of users archived.
+    """
+    settings = get_settings()
+    inactive_days = inactive_days if inactive_days is not None else settings.archive_inactive_after_days
+    batch_size = batch_size or settings.archive_batch_size
+    cutoff = datetime.utcnow() - timedelta(days=inactive_days)
+
+    candidates = (
+        select(User.id)
+        .where(User.is_active.is_(False), User.updated_at < cutoff)  # type: ignore[attr-defined]
+        .order_by(User.updated_at)  # type: ignore[arg-type]
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    user_ids = list(session.exec(candidates).all())
+    if not user_ids:
+        return 0
+
+    # Memberships first: they reference the users being removed.
+    memberships = _move(
+        session,
+        Membership,
+        MembershipArchive,
+        _MEMBERSHIP_COLUMNS,
+        Membership.user_id.in_(user_ids),  # type: ignore[attr-defined]
+    )
+    archived = _move(session, User, UserArchive, _USER_COLUMNS, User.id.in_(user_ids))  # type: ignore[attr-defined]
+    add_count('accentra.archive.users', archived)
+    add_count('accentra.archive.memberships', memberships)
+    return archived
+
+
+def list_restorable_memberships(session: Session, user_id: UUID) -> dict[UUID, Role]:
+    """The user's role in every tenant it belongs to, whether its memberships are live or archived."""
+    live = select(Membership.tenant_id, Membership.role).where(Membership.user_id == user_id)
+    archived = select(MembershipArchive.tenant_id, MembershipArchive.role).where(MembershipArchive.user_id == user_id)
+    return {tenant_id: Role(role) for tenant_id, role in session.execute(union_all(live, archived)).all()}
+
+
+def restore_user(session: Session, user_id: UUID, *, tenant_id: UUID | None = None) -> User:
+    """Bring a soft-deleted or archived user back, with the memberships it had (only those of `tenant_id`, if given).
+
+    Deletion is undone and the account reactivated. A user that was deactivated rather than deleted is moved out of the
+    archive but stays inactive; reactivating it is an ordinary update. Callers authorize the restore beforehand.
+    """
+    user = get_user(session, user_id)
+    if user is None:
+        if session.get(UserArchive, user_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='User not found')
+        memberships = MembershipArchive.user_id == user_id
+        if tenant_id is not None:
+            memberships = memberships & (MembershipArchive.tenant_id == tenant_id)  # type: ignore[operator]
+        try:
+            with session.begin_nested():
+                _move(session, UserArchive, User, _USER_COLUMNS, UserArchive.id == user_id)
+                _move(session, MembershipArchive, Membership, _MEMBERSHIP_COLUMNS, memberships)
+        except IntegrityError as exc:  # the email was registered again while the user was archived
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Email is in use by another user') from exc
+        user = get_user(session, user_id)
+        assert user is not None
+    elif user.deleted_at is None:
+        return user
+
+    if user.deleted_at is not None:
+        user.is_active = True
+        user.deleted_at = None
+    # Also restarts the archiving clock, so a restored user is not archived again by the next run.
+    user.updated_at = datetime.utcnow()
+    session.add(user)
+    session.flush()
+    session.refresh(user)
+    record_user_change(session, user, ChangeAction.updated)
+    return user
+
+
+def run_archiver() -> int:
+    """Archive batches until no candidates are left, one transaction per batch; returns the total archived."""
+    from core.db import session_scope
+
+    batch_size = get_settings().archive_batch_size
+    total = 0
+    while True:
+        with session_scope() as session:
+            archived = archive_inactive_users(session, batch_size=batch_size)
+        total += archived
+        if archived < batch_size:
+            break
+    if total:
+        logger.info('Archived inactive users | count=%s', total)
+    return total
+
+
+__all__ = ['archive_inactive_users', 'list_restorable_memberships', 'restore_user', 'run_archiver']
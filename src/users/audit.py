@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection
+
+from core.buffering import BackgroundFlusher, BoundedBuffer, BufferStats
+from core.config import get_settings
+from core.db import session_scope
+from core.instrumentation import add_count
+from users.models import IDENTITY_SCHEMA, AuditAction, AuditEvent
+
+logger = logging.getLogger(__name__)
+
+# Client-supplied values are cut to their column widths: one oversized header must not fail a whole batch insert.
+_IP_ADDRESS_LENGTH: int = AuditEvent.__table__.c.ip_address.type.length  # type: ignore[attr-defined]
+_USER_AGENT_LENGTH: int = AuditEvent.__table__.c.user_agent.type.length  # type: ignore[attr-defined]
+
+
+def _truncate(value: str | None, length: int) -> str | None:
+    return value[:length] if value is not None else None
+
+
+@dataclass(frozen=True)
+class AuditEntry:
+    action: AuditAction
+    actor_id: UUID | None = None
+    subject_id: UUID | None = None
+    tenant_id: UUID | None = None
+    ip_address: str | None = None
+    user_agent: str | None = None
+    details: dict[str, Any] = field(default_factory=dict)
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+    id: UUID = field(default_factory=uuid4)
+
+    def to_message(self) -> dict[str, Any]:
+        """Serialise into a JSON-friendly dict suitable for a Dramatiq message."""
+        return {
+            'id': str(self.id),
+            'occurred_at': self.occurred_at.isoformat(),
+            'action': self.action.value,
+            'actor_id': str(self.actor_id) if self.actor_id else None,
+            'subject_id': str(self.subject_id) if self.subject_id else None,
+            'tenant_id': str(self.tenant_id) if self.tenant_id else None,
+            'ip_address': _truncate(self.ip_address, _IP_ADDRESS_LENGTH),
+            'user_agent': _truncate(self.user_agent, _USER_AGENT_LENGTH),
+            'details': self.details,
+        }
+
+
+_buffer: BoundedBuffer[AuditEntry] | None = None
+_flusher: BackgroundFlusher | None = None
+_known_partitions: set[str] = set()
+
+
+def _get_buffer() -> BoundedBuffer[AuditEntry]:
+    global _buffer
+    if _buffer is None:
+        _buffer = BoundedBuffer(get_settings().audit_buffer_size)
+    return _buffer
+
+
+def record_audit(entry: AuditEntry) -> bool:
+    """Queue an audit entry without touching the database; returns False when the entry was dropped."""
+    settings = get_settings()
+    if not settings.audit_enabled:
+        return False
+    buffer = _get_buffer()
+    accepted = buffer.offer(entry)
+    if not accepted:
+        add_count('accentra.audit.dropped')
+        logger.warning('Audit buffer full; dropping entry | action=%s', entry.action.value)
+    elif _flusher is not None and len(buffer) >= settings.audit_flush_batch_size:
+        _flusher.wake()
+    return accepted
+
+
+def audit_stats() -> BufferStats:
+    return _get_buffer().stats()
+
+
+def flush_audit_buffer() -> int:
+    """Ship buffered entries to the audit writer actor in batches; returns the number of entries sent."""
+    # Imported lazily: the broker is only needed once there is something to flush.
+    from core.queueing import write_audit_events
+
+    settings = get_settings()
+    buffer = _get_buffer()
+    sent = 0
+    while batch := buffer.drain(settings.audit_flush_batch_size):
+        try:
+            write_audit_events.send([entry.to_message() for entry in batch])
+        except Exception:  # broker outages must not take the flusher down; account for the loss instead
+            buffer.record_dropped(len(batch))
+            add_count('accentra.audit.dropped', len(batch))
+            logger.exception('Failed to enqueue audit batch | size=%s', len(batch))
+            break
+        sent += len(batch)
+    return sent
+
+
+def start_audit_pipeline() -> None:
+    global _flusher
+    settings = get_settings()
+    if not settings.audit_enabled:
+        return
+    if _flusher is None:
+        _flusher = BackgroundFlusher(
+            'audit-flusher',
+            flush_audit_buffer,
+            interval=settings.audit_flush_interval_seconds,
+        )
+    _flusher.start()
+
+
+def stop_audit_pipeline() -> None:
+    if _flusher is not None:
+        _flusher.stop()
+
+
+def _month_partition(occurred_at: datetime) -> tuple[str, datetime, datetime]:
+    start = occurred_at.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return f'audit_events_{start:%Y_%m}', start, end
+
+
+def ensure_audit_partitions(connection: Connection, timestamps: Iterable[datetime]) -> set[str]:
+    """Create the monthly partitions covering `timestamps`; returns the partitions that had to be checked."""
+    if not connection.dialect.name.startswith('postgresql'):
+        return set()
+    pending = {_month_partition(occurred_at) for occurred_at in timestamps}
+    checked: set[str] = set()
+    for name, start, end in sorted(pending):
+        if name in _known_partitions:
+            continue
+        connection.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS {IDENTITY_SCHEMA}.{name} PARTITION OF {IDENTITY_SCHEMA}.audit_events '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        checked.add(name)
+    return checked
+
+
+def write_audit_batch(messages: list[dict[str, Any]]) -> int:
+    """Bulk insert serialised audit entries, several thousand rows per statement."""
+    if not messages:
+        return 0
+    rows: list[dict[str, Any]] = [
+        {
+            **message,
+            'id': UUID(message['id']),
+            'occurred_at': datetime.fromisoformat(message['occurred_at']),
+            'actor_id': UUID(message['actor_id']) if message['actor_id'] else None,
+            'subject_id': UUID(message['subject_id']) if message['subject_id'] else None,
+            'tenant_id': UUID(message['tenant_id']) if message['tenant_id'] else None,
+        }
+        for message in messages
+    ]
+    page_size = get_settings().audit_insert_page_size
+    with session_scope() as session:
+        connection = session.connection(execution_options={'insertmanyvalues_page_size': page_size})
+        partitions = ensure_audit_partitions(connection, (row['occurred_at'] for row in rows))
+        connection.execute(insert(AuditEvent.__table__), rows)  # type: ignore[arg-type]
+    # Only remember partitions once the DDL has been committed.
+    _known_partitions.update(partitions)
+    return len(rows)
+
+
+__all__ = [
+    'AuditEntry',
+    'record_audit',
+    'audit_stats',
+    'flush_audit_buffer',
+    'start_audit_pipeline',
+    'stop_audit_pipeline',
+    'ensure_audit_partitions',
+    'write_audit_batch',
+]
@@ -0,0 +1,207 @@
+"""Role hierarchy, compiled scope matchers and the FastAPI dependencies that enforce them.
+
+Scopes are `:`-separated names such as `users:write`. A granted scope may use `*` as a whole segment (`users:*`,
+`*:read`) or alone (`*`, everything). A principal's grants are its role's defaults plus `Membership.scopes`. They are
+compiled once per distinct (role, scopes) combination, and answers for route scopes are memoised, so a check is a dict
+lookup.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlmodel import Session
+
+from core.config import get_settings
+from core.db import get_session_dependency, set_statement_tenant
+from core.profiling import timed_phase
+from users.metering import record_active_user, record_usage
+from users.models import Role, UsageMetric
+from users.ratelimit import enforce_tenant_limit
+from users.security import AuthenticationError, decode_access_token
+from users.service import Principal, resolve_principal
+from users.service_accounts import resolve_service_principal
+
+INTERNAL_TOKEN_HEADER = 'X-Internal-Token'
+
+ROLE_RANK: dict[Role, int] = {Role.viewer: 0, Role.editor: 1, Role.admin: 2, Role.owner: 3}
+
+# Scopes every member of a role holds in addition to `Membership.scopes`.
+ROLE_SCOPES: dict[Role, tuple[str, ...]] = {
+    Role.owner: ('*',),
+    Role.admin: ('users:*', 'memberships:*', 'service_accounts:*', 'tenants:read', 'tenants:export', 'usage:read'),
+    Role.editor: ('users:read', 'memberships:read', 'tenants:read'),
+    Role.viewer: ('users:read', 'tenants:read'),
+}
+
+# Trusted service-to-service caller (authenticated by `X-Internal-Token`): every scope, every tenant.
+INTERNAL_PRINCIPAL = Principal(UUID(int=0), UUID(int=0), UUID(int=0), Role.owner, ('*',))
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def role_at_least(role: Role, minimum: Role) -> bool:
+    return ROLE_RANK[role] >= ROLE_RANK[minimum]
+
+
+def _wildcard_regex(scope: str) -> str:
+    if scope == '*':
+        return '.*'
+    return ':'.join('[^:]+' if segment == '*' else re.escape(segment) for segment in scope.split(':'))
+
+
+class ScopeSet:
+    """Granted scopes compiled into an exact-match set plus one regex for the wildcard patterns."""
+
+    __slots__ = ('_allowed', '_exact', '_pattern')
+
+    def __init__(self, granted: Iterable[str]) -> None:
+        exact: set[str] = set()
+        wildcards: list[str] = []
+        for scope in granted:
+            if '*' in scope:
+                wildcards.append(scope)
+            else:
+                exact.add(scope)
+        self._exact = frozenset(exact)
+        self._pattern = re.compile('|'.join(_wildcard_regex(scope) for scope in wildcards)) if wildcards else None
+        self._allowed: dict[str, bool] = {}
+
+    def allows(self, scope: str) -> bool:
+        """Memoised check, for the fixed scopes routes declare; use `matches` for scopes taken from requests."""
+        allowed = self._allowed.get(scope)
+        if allowed is None:
+            allowed = self._allowed[scope] = self.matches(scope)
+        return allowed
+
+    def matches(self, scope: str) -> bool:
+        """Uncached check, so arbitrary client-supplied scopes cannot grow the memo of a shared `ScopeSet`."""
+        return scope in self._exact or (self._pattern is not None and self._pattern.fullmatch(scope) is not None)
+
+    def allows_all(self, scopes: Iterable[str]) -> bool:
+        return all(self.allows(scope) for scope in scopes)
+
+
+@lru_cache(maxsize=1024)
+def compile_scopes(role: Role, scopes: tuple[str, ...]) -> ScopeSet:
+    return ScopeSet((*ROLE_SCOPES[role], *scopes))
+
+
+def scope_set(principal: Principal) -> ScopeSet:
+    return compile_scopes(principal.role, principal.scopes)
+
+
+def is_internal(principal: Principal) -> bool:
+    return principal is INTERNAL_PRINCIPAL
+
+
+def ensure_tenant(principal: Principal, tenant_id: UUID) -> None:
+    """Reject callers acting on a tenant other than the one their token was issued for."""
+    if not is_internal(principal) and principal.tenant_id != tenant_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Token is not valid for this tenant')
+
+
+def ensure_can_grant(principal: Principal, role: Role, scopes: Iterable[str] = ()) -> None:
+    """Members may hand out their own role or a lower one, and only scopes they hold themselves.
+
+    A wildcard grant such as `users:*` is checked as a literal scope, so it is only allowed when one of the caller's
+    own grants covers the whole pattern (`users:*` or `*`), not merely some scopes it would match.
+    """
+    if is_internal(principal):
+        return
+    if not role_at_least(principal.role, role):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f'Cannot grant role {role.value}')
+    granted = scope_set(principal)
+    withheld = sorted(scope for scope in set(scopes) if not granted.matches(scope))
+    if withheld:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f'Cannot grant scopes {", ".join(withheld)}')
+
+
+def get_session(session: Session = Depends(get_session_dependency)) -> Session:
+    return session
+
+
+@timed_phase('auth')
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    session: Session = Depends(get_session),
+) -> Principal:
+    """Authenticate the bearer token and resolve the caller without loading `User`/`Membership` entities."""
+    if credentials is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Missing bearer token')
+    try:
+        payload = decode_access_token(credentials.credentials)
+    except AuthenticationError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
+
+    set_statement_tenant(payload.tid)
+    enforce_tenant_limit(session, payload.tid)
+    if payload.typ == 'service':
+        principal = resolve_service_principal(session, payload.sub, payload.tid)
+    else:
+        principal = resolve_principal(session, payload.sub, payload.tid)
+        record_active_user(principal.tenant_id, principal.user_id)
+    record_usage(principal.tenant_id, UsageMetric.api_calls)
+    return principal
+
+
+def _internal_caller(request: Request) -> bool:
+    return get_settings().internal_token_matches(request.headers.get(INTERNAL_TOKEN_HEADER))
+
+
+def require_internal(request: Request) -> Principal:
+    """Dependency for cross-tenant routes that only trusted services (`X-Internal-Token`) may call."""
+    if not request.headers.get(INTERNAL_TOKEN_HEADER):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Missing internal token')
+    if not _internal_caller(request):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Invalid internal token')
+    return INTERNAL_PRINCIPAL
+
+
+def require(*scopes: str, role: Role | None = None) -> Callable[..., Principal]:
+    """Dependency returning the caller once it holds every scope in `scopes` and at least `role`.
+
+    Requests carrying a valid `X-Internal-Token` header pass as `INTERNAL_PRINCIPAL`.
+    """
+    required = tuple(scopes)
+
+    def dependency(
+        request: Request,
+        credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+        session: Session = Depends(get_session),
+    ) -> Principal:
+        if _internal_caller(request):
+            return INTERNAL_PRINCIPAL
+        principal = get_current_principal(credentials, session)
+        if role is not None and not role_at_least(principal.role, role):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Insufficient role')
+        if not scope_set(principal).allows_all(required):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Insufficient scope')
+        return principal
+
+    return dependency
+
+
+__all__ = [
+    'INTERNAL_TOKEN_HEADER',
+    'INTERNAL_PRINCIPAL',
+    'ROLE_RANK',
+    'ROLE_SCOPES',
+    'ScopeSet',
+    'bearer_scheme',
+    'role_at_least',
+    'compile_scopes',
+    'scope_set',
+    'is_internal',
+    'ensure_tenant',
+    'ensure_can_grant',
+    'get_session',
+    'get_current_principal',
+    'require',
+    'require_internal',
+]
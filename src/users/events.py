@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlmodel import Session, select
+
+from core.buffering import BackgroundFlusher
+from core.config import get_settings
+from core.redis import redis_configured
+from users.models import ChangeAction, ChangeEntity, ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+Publisher = Callable[[list[ChangeEvent]], None]
+
+_relay_trigger: BackgroundFlusher | None = None
+
+
+def record_change(
+    session: Session,
+    *,
+    entity: ChangeEntity,
+    entity_id: UUID,
+    action: ChangeAction,
+    payload: BaseModel,
+    tenant_id: UUID | None = None,
+) -> ChangeEvent:
+    """Stage an outbox row; it is committed together with the caller's transaction."""
+    event = ChangeEvent(
+        entity=entity.value,
+        entity_id=entity_id,
+        tenant_id=tenant_id,
+        action=action.value,
+        payload=payload.model_dump(mode='json'),
+    )
+    session.add(event)
+    return event
+
+
+def list_changes(session: Session, *, after: int, limit: int, settle_ms: int = 0) -> list[ChangeEvent]:
+    """Return change events with ids greater than `after` in commit-id order.
+
+    Rows younger than `settle_ms` are held back so that transactions which allocated a lower id but commit
+    slightly later are not skipped by consumers advancing their cursor.
+    """
+    statement = select(ChangeEvent).where(ChangeEvent.id > after)  # type: ignore[operator]
+    if settle_ms > 0:
+        cutoff = datetime.utcnow() - timedelta(milliseconds=settle_ms)
+        statement = statement.where(ChangeEvent.created_at <= cutoff)
+    statement = statement.order_by(ChangeEvent.id).limit(limit)  # type: ignore[arg-type]
+    return list(session.exec(statement).all())
+
+
+def publish_pending_changes(session: Session, publish: Publisher, *, batch_size: int) -> int:
+    """Hand one batch of unpublished events to `publish` and mark them as published.
+
+    Rows are locked with `SKIP LOCKED` so several relay workers can drain the outbox concurrently.
+    """
+    statement = (
+        select(ChangeEvent)
+        .where(ChangeEvent.published_at.is_(None))  # type: ignore[union-attr]
+        .order_by(ChangeEvent.id)  # type: ignore[arg-type]
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    events = list(session.exec(statement).all())
+    if not events:
+        return 0
+
+    publish(events)
+    published_at = datetime.utcnow()
+    for event in events:
+        event.published_at = published_at
+        session.add(event)
+    session.flush()
+    return len(events)
+
+
+def to_stream_fields(event: ChangeEvent) -> dict[str, str]:
+    """Flatten an event into the string field map expected by Redis Streams."""
+    return {
+        'id': str(event.id),
+        'entity': event.entity,
+        'entity_id': str(event.entity_id),
+        'tenant_id': str(event.tenant_id) if event.tenant_id else '',
+        'action': event.action,
+        'payload': json.dumps(event.payload, separators=(',', ':')),
+        'created_at': event.created_at.isoformat(),
+    }
+
+
+def enqueue_change_relay() -> None:
+    """Ask a worker to drain the outbox; concurrent relays claim disjoint rows, so extra triggers are harmless."""
+    from core.queueing import relay_identity_changes
+
+    relay_identity_changes.send()
+
+
+def start_change_relay() -> None:
+    """Enqueue `relay_identity_changes` every `change_relay_interval_seconds` from this process."""
+    global _relay_trigger
+    settings = get_settings()
+    if not settings.change_relay_enabled:
+        return
+    if not redis_configured():
+        logger.info('Identity change relay not scheduled | reason=redis not configured')
+        return
+    if _relay_trigger is None:
+        _relay_trigger = BackgroundFlusher(
+            'change-relay-trigger',
+            enqueue_change_relay,
+            interval=settings.change_relay_interval_seconds,
+        )
+    _relay_trigger.start()
+
+
+def stop_change_relay() -> None:
+    if _relay_trigger is not None:
+        _relay_trigger.stop()
+
+
+__all__ = [
+    'record_change',
+    'list_changes',
+    'publish_pending_changes',
+    'to_stream_fields',
+    'enqueue_change_relay',
+    'start_change_relay',
+    'stop_change_relay',
+]
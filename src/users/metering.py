@@ -0,0 +1,298 @@
+"""Per-tenant usage metering: counters and distinct-user sketches aggregated in memory, written in batches.
+
+Recording a login or an API call is a dictionary update under a lock; no database work happens on the request path.
+A background flusher hands the aggregates to the `write_usage` actor every `metering_flush_interval_seconds`, and the
+actor folds them into `identity.tenant_usage` with bulk upserts. Batches are queued in Redis and carry an id that is
+recorded in the same transaction, so a batch survives worker restarts and a redelivered batch is applied once.
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import threading
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import bindparam, func, tuple_, update
+from sqlmodel import Session, select
+
+from core.buffering import BackgroundFlusher
+from core.config import get_settings
+from core.db import session_scope
+from core.hll import HyperLogLog
+from core.instrumentation import add_count
+from users.models import TenantUsage, UsageFlush, UsageMetric
+
+logger = logging.getLogger(__name__)
+
+UsageKey = tuple[UUID, UsageMetric, datetime]
+
+
+class UsageAggregator:
+    """Counters and HyperLogLog sketches per (tenant, metric, bucket start), swapped out whole on flush."""
+
+    def __init__(self, precision: int) -> None:
+        self._precision = precision
+        self._counters: dict[UsageKey, int] = {}
+        self._sketches: dict[UsageKey, HyperLogLog] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: UsageKey, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_distinct(self, key: UsageKey, member: bytes) -> None:
+        with self._lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = HyperLogLog(self._precision)
+            sketch.add(member)
+
+    def swap(self) -> tuple[dict[UsageKey, int], dict[UsageKey, HyperLogLog]]:
+        with self._lock:
+            counters, sketches = self._counters, self._sketches
+            self._counters, self._sketches = {}, {}
+        return counters, sketches
+
+    def restore(self, counters: dict[UsageKey, int], sketches: dict[UsageKey, HyperLogLog]) -> None:
+        """Fold aggregates that could not be flushed back in, so they go out with the next flush."""
+        with self._lock:
+            for key, amount in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + amount
+            for key, sketch in sketches.items():
+                current = self._sketches.get(key)
+                self._sketches[key] = sketch if current is None else current.merge(sketch)
+
+    def __len__(self) -> int:
+        return len(self._counters) + len(self._sketches)
+
+
+_aggregator: UsageAggregator | None = None
+_flusher: BackgroundFlusher | None = None
+
+
+def _get_aggregator() -> UsageAggregator:
+    global _aggregator
+    if _aggregator is None:
+        _aggregator = UsageAggregator(get_settings().metering_hll_precision)
+    return _aggregator
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(moment: datetime, bucket_seconds: int) -> datetime:
+    """Start of the bucket containing the naive UTC `moment`; buckets are aligned to the Unix epoch."""
+    seconds = int((moment - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % bucket_seconds)
+
+
+def _current_bucket() -> datetime:
+    return bucket_start(datetime.utcnow(), get_settings().metering_bucket_seconds)
+
+
+def record_usage(tenant_id: UUID, metric: UsageMetric, amount: int = 1) -> None:
+    if get_settings().metering_enabled:
+        _get_aggregator().add((tenant_id, metric, _current_bucket()), amount)
+
+
+def record_active_user(tenant_id: UUID, user_id: UUID) -> None:
+    if get_settings().metering_enabled:
+        _get_aggregator().add_distinct((tenant_id, UsageMetric.active_users, _current_bucket()), user_id.bytes)
+
+
+def _to_messages(
+    counters: dict[UsageKey, int], sketches: dict[UsageKey, HyperLogLog], chunk_size: int
+) -> Iterator[tuple[list[dict[str, Any]], dict[UsageKey, int], dict[UsageKey, HyperLogLog]]]:
+    """JSON rows in chunks of `chunk_size`, each with the aggregates it carries (to put back if sending fails)."""
+    items: list[tuple[UsageKey, int | HyperLogLog]] = [*counters.items(), *sketches.items()]
+    for offset in range(0, len(items), chunk_size):
+        chunk = items[offset : offset + chunk_size]
+        rows = []
+        for (tenant_id, metric, bucket), value in chunk:
+            row: dict[str, Any] = {
+                'tenant_id': str(tenant_id),
+                'metric': metric.value,
+                'bucket_start': bucket.isoformat(),
+            }
+            if isinstance(value, HyperLogLog):
+                row['sketch'] = base64.b64encode(value.to_bytes()).decode()
+            else:
+                row['value'] = value
+            rows.append(row)
+        yield (
+            rows,
+            {key: value for key, value in chunk if not isinstance(value, HyperLogLog)},
+            {key: value for key, value in chunk if isinstance(value, HyperLogLog)},
+        )
+
+
+def flush_usage() -> int:
+    """Enqueue the aggregates to the usage writer actor; returns the number of rows sent."""
+    from core.queueing import write_usage
+
+    aggregator = _get_aggregator()
+    counters, sketches = aggregator.swap()
+    sent = 0
+    chunks = _to_messages(counters, sketches, get_settings().metering_flush_batch_size)
+    for rows, chunk_counters, chunk_sketches in chunks:
+        try:
+            write_usage.send(str(uuid4()), rows)
+        except Exception:  # keep billing data for the next attempt rather than dropping it
+            aggregator.restore(chunk_counters, chunk_sketches)
+            for _, rest_counters, rest_sketches in chunks:
+                aggregator.restore(rest_counters, rest_sketches)
+            add_count('accentra.metering.flush_failures')
+            logger.exception('Failed to enqueue usage batch; retained for the next flush | rows=%s', len(rows))
+            break
+        sent += len(rows)
+    return sent
+
+
+def _row_key(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        'tenant_id': UUID(row['tenant_id']),
+        'metric': row['metric'],
+        'bucket_start': datetime.fromisoformat(row['bucket_start']),
+    }
+
+
+def _insert_for(session: Session):
+    if session.get_bind().dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+
+def _add_counters(session: Session, rows: list[dict[str, Any]]) -> None:
+    table = TenantUsage.__table__  # type: ignore[attr-defined]
+    statement = _insert_for(session)(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['tenant_id', 'metric', 'bucket_start'],
+        set_={'value': table.c.value + statement.excluded.value, 'updated_at': func.now()},  # type: ignore[attr-defined]
+    )
+    session.execute(statement, rows)
+
+
+def _merge_sketches(session: Session, sketches: dict[tuple[Any, ...], HyperLogLog]) -> None:
+    # Registers are unioned in Python, so rows are created first and then locked: two writers merging into the same
+    # bucket serialise on the row lock instead of overwriting each other's sketch.
+    table = TenantUsage.__table__  # type: ignore[attr-defined]
+    keys = list(sketches)
+    session.execute(
+        _insert_for(session)(table).on_conflict_do_nothing(index_elements=['tenant_id', 'metric', 'bucket_start']),
+        [{'tenant_id': tenant_id, 'metric': metric, 'bucket_start': bucket} for tenant_id, metric, bucket in keys],
+    )
+    key_columns = tuple_(table.c.tenant_id, table.c.metric, table.c.bucket_start)  # type: ignore[attr-defined]
+    existing = session.execute(
+        select(table.c.tenant_id, table.c.metric, table.c.bucket_start, table.c.sketch)  # type: ignore[attr-defined]
+        .where(key_columns.in_(keys))
+        .with_for_update()
+    ).all()
+    updates = []
+    for tenant_id, metric, bucket, stored in existing:
+        sketch = sketches[(tenant_id, metric, bucket)]
+        if stored is not None:
+            sketch = sketch.merge(HyperLogLog.from_bytes(stored))
+        updates.append(
+            {
+                'k_tenant': tenant_id,
+                'k_metric': metric,
+                'k_bucket': bucket,
+                'sketch': sketch.to_bytes(),
+                'value': sketch.count(),
+            }
+        )
+    session.execute(
+        update(table)
+        .where(
+            table.c.tenant_id == bindparam('k_tenant'),  # type: ignore[attr-defined]
+            table.c.metric == bindparam('k_metric'),  # type: ignore[attr-defined]
+            table.c.bucket_start == bindparam('k_bucket'),  # type: ignore[attr-defined]
+        )
+        .values(sketch=bindparam('sketch'), value=bindparam('value'), updated_at=func.now()),
+        updates,
+    )
+
+
+def write_usage_batch(batch_id: str, rows: list[dict[str, Any]]) -> int:
+    """Apply one flushed batch: add counters, union sketches. Returns 0 when the batch was already applied."""
+    with session_scope() as session:
+        insert = _insert_for(session)
+        claimed = session.execute(
+            insert(UsageFlush.__table__)  # type: ignore[attr-defined]
+            .values(batch_id=UUID(batch_id))
+            .on_conflict_do_nothing(index_elements=['batch_id'])
+            .returning(UsageFlush.__table__.c.batch_id)  # type: ignore[attr-defined]
+        ).first()
+        if claimed is None:
+            add_count('accentra.metering.duplicate_batches')
+            return 0
+
+        counters = [_row_key(row) | {'value': row['value']} for row in rows if 'sketch' not in row]
+        sketches = {
+            tuple(_row_key(row).values()): HyperLogLog.from_bytes(base64.b64decode(row['sketch']))
+            for row in rows
+            if 'sketch' in row
+        }
+        if counters:
+            _add_counters(session, counters)
+        if sketches:
+            _merge_sketches(session, sketches)
+    return len(rows)
+
+
+def query_usage(
+    session: Session, tenant_id: UUID, start: datetime, end: datetime, metrics: list[UsageMetric] | None = None
+) -> tuple[dict[UsageMetric, int], list[TenantUsage]]:
+    """Buckets in `[start, end)` and per-metric totals; distinct metrics are totalled by unioning their sketches."""
+    statement = select(TenantUsage).where(
+        TenantUsage.tenant_id == tenant_id, TenantUsage.bucket_start >= start, TenantUsage.bucket_start < end
+    )
+    if metrics:
+        statement = statement.where(TenantUsage.metric.in_([metric.value for metric in metrics]))  # type: ignore[attr-defined]
+    buckets = list(session.exec(statement.order_by(TenantUsage.metric, TenantUsage.bucket_start)).all())  # type: ignore[arg-type]
+
+    totals: dict[UsageMetric, int] = {}
+    unions: dict[UsageMetric, HyperLogLog] = {}
+    for bucket in buckets:
+        metric = UsageMetric(bucket.metric)
+        if bucket.sketch is not None:
+            sketch = HyperLogLog.from_bytes(bucket.sketch)
+            unions[metric] = sketch if metric not in unions else unions[metric].merge(sketch)
+        else:
+            totals[metric] = totals.get(metric, 0) + bucket.value
+    totals.update({metric: sketch.count() for metric, sketch in unions.items()})
+    return totals, buckets
+
+
+def start_metering_pipeline() -> None:
+    global _flusher
+    settings = get_settings()
+    if not settings.metering_enabled:
+        return
+    if _flusher is None:
+        _flusher = BackgroundFlusher('usage-flusher', flush_usage, interval=settings.metering_flush_interval_seconds)
+    _flusher.start()
+
+
+def stop_metering_pipeline() -> None:
+    if _flusher is not None:
+        _flusher.stop()
+
+
+__all__ = [
+    'UsageAggregator',
+    'bucket_start',
+    'record_usage',
+    'record_active_user',
+    'flush_usage',
+    'write_usage_batch',
+    'query_usage',
+    'start_metering_pipeline',
+    'stop_metering_pipeline',
+]
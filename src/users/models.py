@@ -5,14 +5,31 @@ from enum import Enum
 from typing import Any
 from uuid import UUID, uuid4
 
-from sqlalchemy import JSON, Boolean, Column, DateTime
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime
 from sqlalchemy import Enum as SqlEnum
-from sqlalchemy import String, UniqueConstraint, func, text
+from sqlalchemy import Index, Integer, LargeBinary, String, UniqueConstraint, func, text
 from sqlmodel import Field, SQLModel
 
 IDENTITY_SCHEMA = 'identity'
 
-__all__ = ['IDENTITY_SCHEMA', 'Role', 'Tenant', 'User', 'Membership']
+__all__ = [
+    'IDENTITY_SCHEMA',
+    'Role',
+    'ChangeEntity',
+    'ChangeAction',
+    'Tenant',
+    'User',
+    'Membership',
+    'UserArchive',
+    'MembershipArchive',
+    'ServiceAccount',
+    'UsageMetric',
+    'TenantUsage',
+    'UsageFlush',
+    'ChangeEvent',
+    'AuditAction',
+    'AuditEvent',
+]
 
 
 class Role(str, Enum):
@@ -22,6 +39,40 @@ class Role(str, Enum):
     viewer = 'viewer'
 
 
+class ChangeEntity(str, Enum):
+    user = 'user'
+    tenant = 'tenant'
+    membership = 'membership'
+
+
+class ChangeAction(str, Enum):
+    created = 'created'
+    updated = 'updated'
+    deleted = 'deleted'
+
+
+class UsageMetric(str, Enum):
+    logins = 'logins'
+    tokens_issued = 'tokens_issued'
+    api_calls = 'api_calls'
+    active_users = 'active_users'
+
+
+class AuditAction(str, Enum):
+    login_succeeded = 'login_succeeded'
+    login_failed = 'login_failed'
+    tenant_created = 'tenant_created'
+    user_created = 'user_created'
+    user_updated = 'user_updated'
+    membership_created = 'membership_created'
+    tenant_exported = 'tenant_exported'
+    user_deleted = 'user_deleted'
+    user_restored = 'user_restored'
+    service_account_created = 'service_account_created'
+    service_account_deactivated = 'service_account_deactivated'
+    service_account_secret_rotated = 'service_account_secret_rotated'
+
+
 class Tenant(SQLModel, table=True):
     __tablename__ = 'tenants'  # type: ignore[bad-override]
     __table_args__ = {'schema': IDENTITY_SCHEMA}
@@ -50,10 +101,21 @@ class Tenant(SQLModel, table=True):
 
 class User(SQLModel, table=True):
     __tablename__ = 'users'  # type: ignore[bad-override]
-    __table_args__ = {'schema': IDENTITY_SCHEMA}
+    __table_args__ = (
+        # Emails are unique regardless of case; lookups compare lower(email). See migration 0008.
+        Index('ix_identity_users_email_lower', func.lower(text('email')), unique=True),
+        # Archiver candidates; see migration 0009.
+        Index(
+            'ix_identity_users_inactive',
+            'updated_at',
+            postgresql_where=text('NOT is_active'),
+            sqlite_where=text('NOT is_active'),
+        ),
+        {'schema': IDENTITY_SCHEMA},
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True, index=True)
-    email: str = Field(sa_column=Column(String(length=255), nullable=False, unique=True, index=True))
+    email: str = Field(sa_column=Column(String(length=255), nullable=False))
     full_name: str | None = Field(default=None, sa_column=Column(String(length=255), nullable=True))
     hashed_password: str = Field(sa_column=Column(String(length=512), nullable=False))
     is_active: bool = Field(
@@ -73,12 +135,19 @@ class User(SQLModel, table=True):
             server_onupdate=func.now(),
         ),
     )
+    deleted_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=False), nullable=True),
+        description='Set when the user is soft-deleted; such users are inactive and archived after a grace period.',
+    )
 
 
 class Membership(SQLModel, table=True):
     __tablename__ = 'user_tenants'  # type: ignore[bad-override]
     __table_args__ = (
         UniqueConstraint('user_id', 'tenant_id', name='uq_user_tenant_membership'),
+        # Tenant-wide scans (exports) in keyset order; see migration 0006.
+        Index('ix_identity_user_tenants_tenant', 'tenant_id', 'membership_id'),
         {'schema': IDENTITY_SCHEMA},
     )
 
@@ -109,3 +178,173 @@ class Membership(SQLModel, table=True):
             server_onupdate=func.now(),
         ),
     )
+
+
+class UserArchive(SQLModel, table=True):
+    """Cold copy of a long-inactive user, moved out of `users` by the archiver and moved back on restore."""
+
+    __tablename__ = 'users_archive'  # type: ignore[bad-override]
+    __table_args__ = {'schema': IDENTITY_SCHEMA}
+
+    id: UUID = Field(primary_key=True)
+    email: str = Field(sa_column=Column(String(length=255), nullable=False))
+    full_name: str | None = Field(default=None, sa_column=Column(String(length=255), nullable=True))
+    hashed_password: str = Field(sa_column=Column(String(length=512), nullable=False))
+    is_active: bool = Field(sa_column=Column(Boolean, nullable=False))
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=False), nullable=False))
+    updated_at: datetime = Field(sa_column=Column(DateTime(timezone=False), nullable=False))
+    deleted_at: datetime | None = Field(default=None, sa_column=Column(DateTime(timezone=False), nullable=True))
+    archived_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+
+
+class MembershipArchive(SQLModel, table=True):
+    """Memberships of archived users; no foreign keys, so archived rows never constrain the hot tables."""
+
+    __tablename__ = 'user_tenants_archive'  # type: ignore[bad-override]
+    __table_args__ = (
+        Index('ix_identity_user_tenants_archive_user', 'user_id'),
+        {'schema': IDENTITY_SCHEMA},
+    )
+
+    membership_id: UUID = Field(primary_key=True)
+    user_id: UUID = Field(nullable=False)
+    tenant_id: UUID = Field(nullable=False)
+    role: Role = Field(
+        sa_column=Column(SqlEnum(Role, name='identity_role', create_constraint=True), nullable=False),
+    )
+    scopes: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False, default=list))
+    plan: Any | None = Field(default=None, sa_column=Column(JSON, nullable=True))
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=False), nullable=False))
+    updated_at: datetime = Field(sa_column=Column(DateTime(timezone=False), nullable=False))
+    archived_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+
+
+class ServiceAccount(SQLModel, table=True):
+    """Machine client of one tenant that obtains tokens with the client-credentials grant instead of a password."""
+
+    __tablename__ = 'service_accounts'  # type: ignore[bad-override]
+    __table_args__ = (
+        Index('ix_identity_service_accounts_tenant', 'tenant_id'),
+        {'schema': IDENTITY_SCHEMA},
+    )
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True, description='Doubles as the OAuth `client_id`.')
+    tenant_id: UUID = Field(foreign_key=f'{IDENTITY_SCHEMA}.tenants.id', nullable=False)
+    name: str = Field(sa_column=Column(String(length=255), nullable=False))
+    secret_hash: str = Field(sa_column=Column(String(length=128), nullable=False))
+    role: Role = Field(
+        sa_column=Column(SqlEnum(Role, name='identity_role', create_constraint=True), nullable=False),
+    )
+    scopes: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False, default=list))
+    is_active: bool = Field(
+        default=True,
+        sa_column=Column(Boolean, nullable=False, server_default=text('TRUE')),
+    )
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+
+
+class TenantUsage(SQLModel, table=True):
+    """Usage of one metric by one tenant in one time bucket, accumulated by the metering writer."""
+
+    __tablename__ = 'tenant_usage'  # type: ignore[bad-override]
+    __table_args__ = {'schema': IDENTITY_SCHEMA}
+
+    tenant_id: UUID = Field(primary_key=True)
+    metric: str = Field(sa_column=Column(String(length=32), primary_key=True))
+    bucket_start: datetime = Field(sa_column=Column(DateTime(timezone=False), primary_key=True))
+    # Counters hold the running total; for `active_users` it is the sketch's estimate.
+    value: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default=text('0')))
+    # HyperLogLog registers for distinct-count metrics, so buckets and ranges can be unioned exactly.
+    sketch: bytes | None = Field(default=None, sa_column=Column(LargeBinary, nullable=True))
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+
+
+class UsageFlush(SQLModel, table=True):
+    """Ids of applied metering batches; a redelivered batch finds its id here and is skipped."""
+
+    __tablename__ = 'usage_flushes'  # type: ignore[bad-override]
+    __table_args__ = {'schema': IDENTITY_SCHEMA}
+
+    batch_id: UUID = Field(primary_key=True)
+    applied_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+
+
+class ChangeEvent(SQLModel, table=True):
+    """Outbox row written in the same transaction as the identity change it describes."""
+
+    __tablename__ = 'change_events'  # type: ignore[bad-override]
+    __table_args__ = (
+        Index(
+            'ix_identity_change_events_unpublished',
+            'id',
+            postgresql_where=text('published_at IS NULL'),
+        ),
+        {'schema': IDENTITY_SCHEMA},
+    )
+
+    id: int | None = Field(
+        default=None,
+        sa_column=Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True),
+    )
+    entity: str = Field(sa_column=Column(String(length=32), nullable=False))
+    entity_id: UUID = Field(nullable=False)
+    tenant_id: UUID | None = Field(default=None, nullable=True)
+    action: str = Field(sa_column=Column(String(length=32), nullable=False))
+    payload: dict[str, Any] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False, default=dict),
+    )
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), nullable=False, server_default=func.now()),
+    )
+    published_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=False), nullable=True),
+    )
+
+
+class AuditEvent(SQLModel, table=True):
+    """Append-only audit trail, range-partitioned by month on `occurred_at` in PostgreSQL."""
+
+    __tablename__ = 'audit_events'  # type: ignore[bad-override]
+    __table_args__ = (
+        Index('ix_identity_audit_events_subject', 'subject_id', 'occurred_at'),
+        Index('ix_identity_audit_events_tenant', 'tenant_id', 'occurred_at'),
+        {'schema': IDENTITY_SCHEMA, 'postgresql_partition_by': 'RANGE (occurred_at)'},
+    )
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    occurred_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=False), primary_key=True, nullable=False),
+    )
+    action: str = Field(sa_column=Column(String(length=64), nullable=False))
+    actor_id: UUID | None = Field(default=None, nullable=True)
+    subject_id: UUID | None = Field(default=None, nullable=True)
+    tenant_id: UUID | None = Field(default=None, nullable=True)
+    ip_address: str | None = Field(default=None, sa_column=Column(String(length=64), nullable=True))
+    user_agent: str | None = Field(default=None, sa_column=Column(String(length=512), nullable=True))
+    details: dict[str, Any] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False, default=dict),
+    )
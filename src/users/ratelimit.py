@@ -0,0 +1,133 @@
+"""Identity rate-limit policies: per client IP, per email, per tenant (by plan tier) and failed-login lockout."""
+
+from __future__ import annotations
+
+import math
+import threading
+from time import monotonic
+from typing import Any
+from uuid import UUID
+
+from fastapi import HTTPException, Request, status
+from sqlmodel import Session
+
+from core.config import get_settings
+from core.instrumentation import add_count
+from core.ratelimit import Decision, Rate, get_rate_limiter, make_room, parse_rate
+from users.service import get_tenant
+
+_TIER_CACHE_SECONDS = 60.0
+_TIER_CACHE_SIZE = 10_000
+
+_tier_cache: dict[UUID, tuple[str, float]] = {}
+_tier_lock = threading.Lock()
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else 'unknown'
+
+
+def _email_key(email: str) -> str:
+    return email.strip().lower()
+
+
+def _too_many_requests(scope: str, retry_after: float, detail: str = 'Too many requests') -> HTTPException:
+    add_count('accentra.ratelimit.rejected', 1, {'scope': scope})
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _enforce(scope: str, key: str, rate: Rate) -> Decision:
+    decision = get_rate_limiter().hit(f'{scope}:{key}', rate)
+    if not decision.allowed:
+        raise _too_many_requests(scope, decision.retry_after)
+    return decision
+
+
+def plan_tier(plan: Any) -> str | None:
+    if isinstance(plan, dict):
+        tier = plan.get('tier')
+        return str(tier) if tier is not None else None
+    return None
+
+
+def tenant_tier(session: Session, tenant_id: UUID, *, lookup: bool = True) -> str | None:
+    """Plan tier from `Tenant.plan`, cached briefly per process so authenticated requests skip the lookup.
+
+    Without `lookup` only the cache is consulted: tenant ids from unauthenticated requests must not cost a query.
+    """
+    now = monotonic()
+    cached = _tier_cache.get(tenant_id)
+    if cached is not None and cached[1] > now:
+        return cached[0] or None
+    if not lookup:
+        return None
+    tenant = get_tenant(session, tenant_id)
+    tier = plan_tier(tenant.plan) if tenant is not None else None
+    with _tier_lock:
+        _tier_cache.pop(tenant_id, None)
+        make_room(_tier_cache, _TIER_CACHE_SIZE, lambda entry: entry[1] <= now)
+        _tier_cache[tenant_id] = (tier or '', now + _TIER_CACHE_SECONDS)
+    return tier
+
+
+def tenant_rate(tier: str | None) -> Rate:
+    settings = get_settings()
+    return parse_rate(settings.rate_limit_tenant_plans.get(tier or '', settings.rate_limit_tenant_default))
+
+
+def enforce_tenant_limit(session: Session, tenant_id: UUID, *, authenticated: bool = True) -> None:
+    """Charge one request to the tenant's budget; unauthenticated callers get the default tier unless it is cached."""
+    settings = get_settings()
+    if not settings.rate_limit_enabled:
+        return
+    _enforce('tenant', str(tenant_id), tenant_rate(tenant_tier(session, tenant_id, lookup=authenticated)))
+
+
+def enforce_login_limits(request: Request, session: Session, email: str, tenant_id: UUID) -> None:
+    """Reject a login before any password hashing when the caller is locked out or over a limit."""
+    settings = get_settings()
+    if not settings.rate_limit_enabled:
+        return
+    email_key = _email_key(email)
+    limiter = get_rate_limiter()
+    if limiter.failures(f'login-failures:{email_key}') >= settings.rate_limit_login_max_failures:
+        raise _too_many_requests(
+            'lockout', settings.rate_limit_lockout_seconds, detail='Too many failed login attempts; try again later'
+        )
+    _enforce('login-ip', client_ip(request), parse_rate(settings.rate_limit_login_per_ip))
+    _enforce('login-email', email_key, parse_rate(settings.rate_limit_login_per_email))
+    enforce_tenant_limit(session, tenant_id, authenticated=False)
+
+
+def record_login_failure(email: str) -> None:
+    settings = get_settings()
+    if settings.rate_limit_enabled:
+        get_rate_limiter().record_failure(f'login-failures:{_email_key(email)}', settings.rate_limit_lockout_seconds)
+
+
+def record_login_success(email: str) -> None:
+    if get_settings().rate_limit_enabled:
+        get_rate_limiter().reset(f'login-failures:{_email_key(email)}')
+
+
+def enforce_registration_limit(request: Request) -> None:
+    settings = get_settings()
+    if settings.rate_limit_enabled:
+        _enforce('register-ip', client_ip(request), parse_rate(settings.rate_limit_register_per_ip))
+
+
+__all__ = [
+    'client_ip',
+    'plan_tier',
+    'tenant_tier',
+    'tenant_rate',
+    'enforce_tenant_limit',
+    'enforce_login_limits',
+    'record_login_failure',
+    'record_login_success',
+    'enforce_registration_limit',
+]
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 from uuid import UUID
 
 from pydantic import BaseModel, EmailStr, Field
 
-from users.models import Role
+from users.models import ChangeAction, ChangeEntity, Role, UsageMetric
 
 PlanData = str | dict[str, Any] | None
 
@@ -42,6 +42,11 @@ class UserRead(UserBase):
     updated_at: datetime
 
 
+class UserSearchPage(BaseModel):
+    users: list[UserRead] = Field(default_factory=list)
+    next_cursor: UUID | None = None
+
+
 class UserUpdate(BaseModel):
     full_name: str | None = Field(default=None, max_length=255)
     password: str | None = Field(default=None, min_length=8, max_length=256)
@@ -69,6 +74,60 @@ class UserWithMemberships(UserRead):
     memberships: list[MembershipRead] = Field(default_factory=list)
 
 
+class ProvisionRequest(MembershipBase):
+    """Create (or reuse, matched by email) a user and attach a membership in one transaction."""
+
+    email: EmailStr
+    full_name: str | None = Field(default=None, max_length=255)
+    # Omit for SSO users: no password is hashed and password login stays impossible for them.
+    password: str | None = Field(default=None, min_length=8, max_length=256)
+
+
+class ProvisionResult(BaseModel):
+    user: UserRead
+    membership: MembershipRead
+    user_created: bool
+
+
+class ServiceAccountCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    role: Role = Role.viewer
+    scopes: list[str] = Field(default_factory=list)
+
+
+class ServiceAccountRead(ServiceAccountCreate):
+    id: UUID
+    tenant_id: UUID
+    is_active: bool
+    created_at: datetime
+
+
+class ServiceAccountCreated(ServiceAccountRead):
+    # Returned once at creation; only a keyed hash is stored.
+    client_secret: str
+
+
+class ClientCredentialsRequest(BaseModel):
+    grant_type: Literal['client_credentials']
+    client_id: UUID
+    client_secret: str = Field(..., min_length=1, max_length=256)
+
+
+class UsageBucket(BaseModel):
+    metric: UsageMetric
+    bucket_start: datetime
+    value: int
+
+
+class TenantUsageReport(BaseModel):
+    tenant_id: UUID
+    start: datetime
+    end: datetime
+    # Counters are summed over the range; `active_users` counts distinct users across the whole range.
+    totals: dict[UsageMetric, int] = Field(default_factory=dict)
+    buckets: list[UsageBucket] = Field(default_factory=list)
+
+
 class LoginRequest(BaseModel):
     email: EmailStr
     # Accept any non-empty password to allow proper 401 responses for bad credentials
@@ -79,6 +138,7 @@ class LoginRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = 'bearer'
+    expires_in: int | None = None
 
 
 class TokenPayload(BaseModel):
@@ -86,8 +146,25 @@ class TokenPayload(BaseModel):
     tid: UUID
     role: Role
     scopes: list[str]
+    # `service` tokens are minted for service accounts; `sub` is then the service account id.
+    typ: Literal['user', 'service'] = 'user'
     plan: PlanData = None
     iat: int
     exp: int
     iss: str | None = None
     aud: str | None = None
+
+
+class ChangeEventRead(BaseModel):
+    id: int
+    entity: ChangeEntity
+    entity_id: UUID
+    tenant_id: UUID | None = None
+    action: ChangeAction
+    payload: dict[str, Any]
+    created_at: datetime
+
+
+class ChangeFeed(BaseModel):
+    events: list[ChangeEventRead] = Field(default_factory=list)
+    next_cursor: int
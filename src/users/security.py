@@ -11,22 +11,30 @@ import jwt
 from jwt import InvalidTokenError
 
 from core.config import get_settings
+from core.instrumentation import instrumented
+from core.profiling import timed_phase
 from users.models import Role
 from users.schemas import PlanData, TokenPayload
 
 PBKDF_ITERATIONS = 390000
+# Stored for accounts without a password (e.g. SSO). It has no `salt$digest` form, so it never verifies.
+UNUSABLE_PASSWORD = '!'
 
 
 class AuthenticationError(Exception):
     """Raised when token verification or password checks fail."""
 
 
+@timed_phase('hash')
+@instrumented('accentra.password.hash')
 def hash_password(password: str) -> str:
     salt = secrets.token_hex(16)
     derived = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), bytes.fromhex(salt), PBKDF_ITERATIONS)
     return f'{salt}${derived.hex()}'
 
 
+@timed_phase('hash')
+@instrumented('accentra.password.verify')
 def verify_password(password: str, encoded: str) -> bool:
     try:
         salt_hex, digest_hex = encoded.split('$', 1)
@@ -36,6 +44,27 @@ def verify_password(password: str, encoded: str) -> bool:
     return hmac.compare_digest(digest_hex, derived.hex())
 
 
+def generate_client_secret() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_client_secret(secret: str) -> str:
+    """Keyed HMAC-SHA256 of a generated client secret.
+
+    Client secrets carry 256 random bits, so unlike passwords they cannot be guessed and need no deliberately slow
+    key derivation: one HMAC (microseconds instead of PBKDF2's ~100 ms) is enough, and the server-side key means a
+    leaked hash table alone cannot be used to check guesses.
+    """
+    settings = get_settings()
+    key = (settings.service_account_secret_key or settings.jwt_secret_key).get_secret_value()
+    return hmac.new(key.encode('utf-8'), secret.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def verify_client_secret(secret: str, secret_hash: str) -> bool:
+    return hmac.compare_digest(hash_client_secret(secret), secret_hash)
+
+
+@instrumented('accentra.token.create')
 def create_access_token(
     *,
     subject: UUID,
@@ -45,6 +74,7 @@ def create_access_token(
     plan: PlanData = None,
     expires_delta: timedelta | None = None,
     issued_at: datetime | None = None,
+    token_type: str = 'user',
 ) -> str:
     settings = get_settings()
     issued_at = issued_at or datetime.now(timezone.utc)
@@ -61,6 +91,8 @@ def create_access_token(
     }
     if plan is not None:
         payload['plan'] = plan
+    if token_type != 'user':
+        payload['typ'] = token_type
     if settings.jwt_issuer:
         payload['iss'] = settings.jwt_issuer
     if settings.jwt_audience:
@@ -70,6 +102,7 @@ def create_access_token(
     return token
 
 
+@instrumented('accentra.token.decode')
 def decode_access_token(token: str) -> TokenPayload:
     settings = get_settings()
     options: dict[str, Any] = {'verify_exp': False}
@@ -96,6 +129,7 @@ def decode_access_token(token: str) -> TokenPayload:
         tid=UUID(decoded['tid']),
         role=Role(decoded['role']),
         scopes=list(decoded.get('scopes', [])),
+        typ=decoded.get('typ', 'user'),
         plan=decoded.get('plan'),
         iat=int(decoded['iat']),
         exp=int(decoded['exp']),
@@ -1,27 +1,139 @@
 from __future__ import annotations
 
-from uuid import UUID
+import copy
+from collections.abc import Callable, Hashable
+from datetime import datetime
+from typing import Any, Literal, NamedTuple, TypeVar
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
-from sqlmodel import Session, select
+from sqlalchemy import Table, bindparam, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from sqlmodel import Session, SQLModel, select
 
-from users.models import Membership, Tenant, User
+from core.config import get_settings
+from core.db import session_has_writes
+from core.singleflight import SingleFlight
+from users.events import record_change
+from users.models import ChangeAction, ChangeEntity, Membership, Role, Tenant, User
 from users.schemas import (
     LoginRequest,
     MembershipCreate,
+    MembershipRead,
+    ProvisionRequest,
+    ProvisionResult,
     TenantCreate,
+    TenantRead,
     UserCreate,
+    UserRead,
+    UserSearchPage,
     UserUpdate,
 )
-from users.security import hash_password, verify_password
+from users.security import UNUSABLE_PASSWORD, hash_password, verify_password
+
+ModelT = TypeVar('ModelT', bound=SQLModel)
+
+_lookups = SingleFlight('identity')
+
+# Hot lookups are built once with bound parameters: every call reuses the same construct, its memoized cache key and
+# the engine's compiled form instead of rebuilding and re-analysing `select(...).where(...)` per request.
+# Emails are case-insensitive: both sides are lower-cased by the database so the lookup hits the unique lower(email)
+# index (`ix_identity_users_email_lower`) and agrees with it on non-ASCII case folding.
+_USER_BY_EMAIL = select(User).where(func.lower(User.email) == func.lower(bindparam('email')))
+_MEMBERSHIP = select(Membership).where(
+    Membership.user_id == bindparam('user_id'), Membership.tenant_id == bindparam('tenant_id')
+)
+_MEMBERSHIPS_OF_USER = select(Membership).where(Membership.user_id == bindparam('user_id'))
+# Only the columns authentication needs: no password hash, no plan blobs, nothing added to the identity map.
+_PRINCIPAL = (
+    select(User.is_active, Membership.membership_id, Membership.role, Membership.scopes)
+    .select_from(User)
+    .outerjoin(
+        Membership,
+        (Membership.user_id == User.id) & (Membership.tenant_id == bindparam('tenant_id')),  # type: ignore[arg-type]
+    )
+    .where(User.id == bindparam('user_id'))
+)
+
+
+# Search projects `UserRead` columns only; the lower() expressions match the functional indexes of migration 0007.
+_SEARCH_COLUMNS = (User.id, User.email, User.full_name, User.is_active, User.created_at, User.updated_at)
+_SEARCH_FIELDS = (func.lower(User.email), func.lower(User.full_name))
+
+SearchMatch = Literal['prefix', 'contains']
+
+
+class Principal(NamedTuple):
+    """The authenticated caller as seen by authorization checks; a plain row, not an ORM entity."""
+
+    user_id: UUID
+    tenant_id: UUID
+    membership_id: UUID
+    role: Role
+    scopes: tuple[str, ...]
+    # Service accounts have no user or membership: both ids are the service account id.
+    service: bool = False
+
+
+def _snapshot(instance: SQLModel | None) -> dict[str, Any] | None:
+    if instance is None:
+        return None
+    return {attr.key: copy.deepcopy(getattr(instance, attr.key)) for attr in inspect(type(instance)).column_attrs}  # type: ignore[union-attr]
+
+
+def _coalesced(
+    session: Session, model: type[ModelT], key: Hashable, load: Callable[[], ModelT | None]
+) -> ModelT | None:
+    """Load a row once for all concurrent callers asking for the same `(model, key)`.
+
+    The caller that runs the query gets its own instance back. Callers that joined the flight get a copy of the row
+    merged into their own session (without another query), so instances never leak across sessions. A session that has
+    written in its transaction reads on its own: it must see its own changes, and must not hand them to others.
+    """
+    if not get_settings().singleflight_enabled or session_has_writes(session):
+        return load()
+    loaded: list[ModelT | None] = []
+
+    def run() -> dict[str, Any] | None:
+        instance = load()
+        loaded.append(instance)
+        return _snapshot(instance)
+
+    snapshot, shared = _lookups.do(model.__name__, key, run)
+    if not shared:
+        return loaded[0]
+    if snapshot is None:
+        return None
+    instance = model(**snapshot)
+    make_transient_to_detached(instance)
+    return session.merge(instance, load=False)
+
+
+def _get_by_id(session: Session, model: type[ModelT], ident: UUID) -> ModelT | None:
+    cached = session.identity_map.get(identity_key(model, ident))
+    if cached is not None:
+        return cached  # type: ignore[return-value]
+    return _coalesced(session, model, ident, lambda: session.get(model, ident))
 
 
 def get_user(session: Session, user_id: UUID) -> User | None:
-    return session.get(User, user_id)
+    return _get_by_id(session, User, user_id)
 
 
 def get_user_by_email(session: Session, email: str) -> User | None:
-    return session.exec(select(User).where(User.email == email)).first()
+    return session.exec(_USER_BY_EMAIL, params={'email': email}).first()
+
+
+def record_user_change(session: Session, user: User, action: ChangeAction) -> None:
+    record_change(
+        session,
+        entity=ChangeEntity.user,
+        entity_id=user.id,
+        action=action,
+        payload=UserRead.model_validate(user, from_attributes=True),
+    )
 
 
 def create_user(session: Session, payload: UserCreate) -> User:
@@ -34,8 +146,12 @@ def create_user(session: Session, payload: UserCreate) -> User:
         is_active=payload.is_active,
     )
     session.add(user)
-    session.flush()
+    try:
+        session.flush()
+    except IntegrityError as exc:  # registered concurrently, possibly with different casing
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='User already exists') from exc
     session.refresh(user)
+    record_user_change(session, user, ChangeAction.created)
     return user
 
 
@@ -46,12 +162,26 @@ def update_user(session: Session, user: User, payload: UserUpdate) -> User:
         user.is_active = payload.is_active
     if payload.password:
         user.hashed_password = hash_password(payload.password)
+    # `server_onupdate` is only a marker for the DDL; nothing bumps the column on UPDATE unless we do.
+    user.updated_at = datetime.utcnow()
     session.add(user)
     session.flush()
     session.refresh(user)
+    record_user_change(session, user, ChangeAction.updated)
     return user
 
 
+def delete_user(session: Session, user: User) -> None:
+    """Soft-delete: the user is deactivated at once and moved to the archive after the grace period."""
+    now = datetime.utcnow()
+    user.is_active = False
+    user.deleted_at = now
+    user.updated_at = now
+    session.add(user)
+    session.flush()
+    record_user_change(session, user, ChangeAction.deleted)
+
+
 def create_tenant(session: Session, payload: TenantCreate) -> Tenant:
     if session.exec(select(Tenant).where(Tenant.name == payload.name)).first():
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Tenant already exists')
@@ -59,16 +189,26 @@ def create_tenant(session: Session, payload: TenantCreate) -> Tenant:
     session.add(tenant)
     session.flush()
     session.refresh(tenant)
+    record_change(
+        session,
+        entity=ChangeEntity.tenant,
+        entity_id=tenant.id,
+        action=ChangeAction.created,
+        payload=TenantRead.model_validate(tenant, from_attributes=True),
+        tenant_id=tenant.id,
+    )
     return tenant
 
 
 def get_tenant(session: Session, tenant_id: UUID) -> Tenant | None:
-    return session.get(Tenant, tenant_id)
+    return _get_by_id(session, Tenant, tenant_id)
 
 
 def get_membership(session: Session, user_id: UUID, tenant_id: UUID) -> Membership | None:
-    statement = select(Membership).where(Membership.user_id == user_id, Membership.tenant_id == tenant_id)
-    return session.exec(statement).first()
+    params = {'user_id': user_id, 'tenant_id': tenant_id}
+    return _coalesced(
+        session, Membership, (user_id, tenant_id), lambda: session.exec(_MEMBERSHIP, params=params).first()
+    )
 
 
 def create_membership(session: Session, user_id: UUID, payload: MembershipCreate) -> Membership:
@@ -89,12 +229,157 @@ def create_membership(session: Session, user_id: UUID, payload: MembershipCreate
     session.add(membership)
     session.flush()
     session.refresh(membership)
+    record_change(
+        session,
+        entity=ChangeEntity.membership,
+        entity_id=membership.membership_id,
+        action=ChangeAction.created,
+        payload=MembershipRead.model_validate(membership, from_attributes=True),
+        tenant_id=membership.tenant_id,
+    )
     return membership
 
 
+def _insert_ignoring_conflicts(session: Session, table: Table, values: dict[str, Any], conflict: list[Any]) -> Any:
+    """`INSERT ... ON CONFLICT DO NOTHING RETURNING *`; returns the new row, or None if it already existed."""
+    if session.get_bind().dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    statement = insert(table).values(values).on_conflict_do_nothing(index_elements=conflict).returning(*table.c)
+    return session.execute(statement).mappings().first()
+
+
+def provision_user(session: Session, payload: ProvisionRequest) -> ProvisionResult:
+    """Create or reuse a user by email and attach a membership, all in the caller's transaction.
+
+    Existing users are reused as they are (their password is left untouched and never hashed here), and a new user
+    without a password gets an unusable hash, so SSO provisioning skips PBKDF2 entirely. Soft-deleted users are not
+    revived implicitly; they answer `409 Conflict` until restored. Inserts use
+    `ON CONFLICT DO NOTHING` so concurrent provisioning of the same email cannot fail halfway, and the tenant's
+    existence is checked by the foreign key instead of a separate query.
+    """
+    user_row: Any = None
+    existing = get_user_by_email(session, payload.email)
+    if existing is None:
+        user_row = _insert_ignoring_conflicts(
+            session,
+            User.__table__,  # type: ignore[arg-type]
+            {
+                'id': uuid4(),
+                'email': payload.email,
+                'full_name': payload.full_name,
+                'hashed_password': hash_password(payload.password) if payload.password else UNUSABLE_PASSWORD,
+                'is_active': True,
+            },
+            [func.lower(User.__table__.c.email)],  # type: ignore[attr-defined]
+        )
+        if user_row is None:  # created concurrently since our lookup
+            existing = get_user_by_email(session, payload.email)
+    if existing is not None and existing.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='User is deleted; restore it first')
+    user = (
+        UserRead.model_validate(dict(user_row))
+        if user_row is not None
+        else UserRead.model_validate(existing, from_attributes=True)
+    )
+
+    try:
+        membership_row = _insert_ignoring_conflicts(
+            session,
+            Membership.__table__,  # type: ignore[arg-type]
+            {
+                'membership_id': uuid4(),
+                'user_id': user.id,
+                'tenant_id': payload.tenant_id,
+                'role': payload.role,
+                'scopes': list(payload.scopes),
+                'plan': payload.plan,
+            },
+            ['user_id', 'tenant_id'],
+        )
+    except IntegrityError as exc:  # the only constraint left to violate is the tenant foreign key
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Tenant not found') from exc
+    if membership_row is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='Membership already exists')
+    membership = MembershipRead.model_validate(dict(membership_row))
+
+    # Outbox rows are flushed together with the commit, as one multi-row insert.
+    if user_row is not None:
+        record_change(session, entity=ChangeEntity.user, entity_id=user.id, action=ChangeAction.created, payload=user)
+    record_change(
+        session,
+        entity=ChangeEntity.membership,
+        entity_id=membership.membership_id,
+        action=ChangeAction.created,
+        payload=membership,
+        tenant_id=membership.tenant_id,
+    )
+    return ProvisionResult(user=user, membership=membership, user_created=user_row is not None)
+
+
 def list_memberships(session: Session, user_id: UUID) -> list[Membership]:
-    statement = select(Membership).where(Membership.user_id == user_id)
-    return list(session.exec(statement).all())
+    return list(session.exec(_MEMBERSHIPS_OF_USER, params={'user_id': user_id}).all())
+
+
+def _like_pattern(query: str, match: SearchMatch) -> str:
+    escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%' if match == 'prefix' else f'%{escaped}%'
+
+
+def search_users(
+    session: Session,
+    query: str,
+    *,
+    tenant_id: UUID | None = None,
+    match: SearchMatch = 'prefix',
+    after: UUID | None = None,
+    limit: int = 20,
+) -> UserSearchPage:
+    """Find users whose email or full name starts with (or contains) `query`, case-insensitively.
+
+    Pages are ordered by user id; pass the returned `next_cursor` as `after` to continue. Soft-deleted users are left
+    out, and with `tenant_id` only members of that tenant are considered.
+    """
+    pattern = _like_pattern(query, match)
+    statement = select(*_SEARCH_COLUMNS).where(  # type: ignore[call-overload]
+        _SEARCH_FIELDS[0].like(pattern, escape='\\') | _SEARCH_FIELDS[1].like(pattern, escape='\\'),
+        User.deleted_at.is_(None),  # type: ignore[union-attr]
+    )
+    if tenant_id is not None:
+        statement = statement.join(
+            Membership,
+            (Membership.user_id == User.id) & (Membership.tenant_id == tenant_id),  # type: ignore[arg-type]
+        )
+    if after is not None:
+        statement = statement.where(User.id > after)  # type: ignore[operator]
+    # One extra row tells whether another page exists without a count query.
+    rows = session.exec(statement.order_by(User.id).limit(limit + 1)).all()  # type: ignore[arg-type]
+    users = [UserRead.model_validate(row._mapping) for row in rows[:limit]]
+    return UserSearchPage(users=users, next_cursor=users[-1].id if len(rows) > limit else None)
+
+
+def resolve_principal(session: Session, user_id: UUID, tenant_id: UUID) -> Principal:
+    """Resolve the caller of a bearer token with one column-projected query (coalesced like the entity lookups)."""
+
+    def load() -> tuple[bool, Principal | None] | None:
+        row = session.exec(_PRINCIPAL, params={'user_id': user_id, 'tenant_id': tenant_id}).first()
+        if row is None:
+            return None
+        is_active, membership_id, role, scopes = row
+        if membership_id is None:
+            return is_active, None
+        return is_active, Principal(user_id, tenant_id, membership_id, Role(role), tuple(scopes or ()))
+
+    key = (user_id, tenant_id)
+    coalesce = get_settings().singleflight_enabled and not session_has_writes(session)
+    found = _lookups.do('Principal', key, load)[0] if coalesce else load()
+    if found is None or not found[0]:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found or inactive')
+    principal = found[1]
+    if principal is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Membership not found for tenant')
+    return principal
 
 
 def authenticate_user(session: Session, payload: LoginRequest) -> tuple[User, Membership]:
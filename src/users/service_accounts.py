@@ -0,0 +1,195 @@
+"""Service accounts: machine clients that exchange a client id and secret for an access token.
+
+Minting goes through a fast keyed hash instead of PBKDF2, and a minted token is handed out again to the same client
+for a while, so high-frequency callers mostly hit an in-process dictionary.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam
+from sqlmodel import Session, select
+
+from core.config import get_settings
+from core.instrumentation import add_count
+from users.metering import record_usage
+from users.models import Role, ServiceAccount, UsageMetric
+from users.schemas import ServiceAccountCreate, ServiceAccountCreated, Token
+from users.security import (
+    create_access_token,
+    generate_client_secret,
+    hash_client_secret,
+    verify_client_secret,
+)
+from users.service import Principal
+
+_SERVICE_PRINCIPAL = select(
+    ServiceAccount.tenant_id, ServiceAccount.role, ServiceAccount.scopes, ServiceAccount.is_active
+).where(ServiceAccount.id == bindparam('account_id'))
+
+
+@dataclass(frozen=True)
+class _CachedToken:
+    token: str
+    tenant_id: UUID
+    expires_at: float  # wall clock, for `expires_in`
+    reuse_until: float  # monotonic
+
+
+class ServiceTokenCache:
+    """Minted tokens keyed by (client id, secret hash), so only a caller presenting the same secret gets a hit."""
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._entries: dict[tuple[UUID, str], _CachedToken] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[UUID, str]) -> _CachedToken | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        min_remaining = get_settings().service_token_min_remaining_seconds
+        if (
+            monotonic() >= entry.reuse_until
+            or entry.expires_at - datetime.now(timezone.utc).timestamp() < min_remaining
+        ):
+            self._entries.pop(key, None)
+            return None
+        return entry
+
+    def put(self, key: tuple[UUID, str], entry: _CachedToken) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self._max_size:
+                # Dicts keep insertion order, so the first key is the oldest entry.
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = entry
+
+    def discard(self, client_id: UUID) -> None:
+        """Forget every token cached for `client_id`, whichever secret it was minted for."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == client_id]:
+                del self._entries[key]
+
+
+_cache: ServiceTokenCache | None = None
+
+
+def get_token_cache() -> ServiceTokenCache:
+    global _cache
+    if _cache is None:
+        _cache = ServiceTokenCache(get_settings().service_token_cache_size)
+    return _cache
+
+
+def create_service_account(session: Session, tenant_id: UUID, payload: ServiceAccountCreate) -> ServiceAccountCreated:
+    secret = generate_client_secret()
+    account = ServiceAccount(
+        tenant_id=tenant_id,
+        name=payload.name,
+        role=payload.role,
+        scopes=list(payload.scopes),
+        secret_hash=hash_client_secret(secret),
+    )
+    session.add(account)
+    session.flush()
+    session.refresh(account)
+    return ServiceAccountCreated.model_validate({**account.model_dump(), 'client_secret': secret})
+
+
+def get_service_account(session: Session, tenant_id: UUID, account_id: UUID) -> ServiceAccount:
+    account = session.get(ServiceAccount, account_id)
+    if account is None or account.tenant_id != tenant_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Service account not found')
+    return account
+
+
+def deactivate_service_account(session: Session, account: ServiceAccount) -> None:
+    """Deactivate `account`; tokens it already holds are rejected on their next use, and its cached ones are dropped."""
+    account.is_active = False
+    account.updated_at = datetime.utcnow()
+    session.add(account)
+    session.flush()
+    get_token_cache().discard(account.id)
+
+
+def rotate_client_secret(session: Session, account: ServiceAccount) -> ServiceAccountCreated:
+    """Replace the secret of `account` and return the new one; the old secret stops minting tokens in this process.
+
+    Other processes hand out tokens they cached for the old secret until `service_token_cache_seconds` runs out.
+    Tokens already issued stay valid until they expire; deactivate the account to revoke them.
+    """
+    secret = generate_client_secret()
+    account.secret_hash = hash_client_secret(secret)
+    account.updated_at = datetime.utcnow()
+    session.add(account)
+    session.flush()
+    session.refresh(account)
+    get_token_cache().discard(account.id)
+    return ServiceAccountCreated.model_validate({**account.model_dump(), 'client_secret': secret})
+
+
+def issue_client_token(session: Session, client_id: UUID, client_secret: str) -> Token:
+    """Client-credentials grant: reuse a cached token for this client and secret, or verify and mint a new one."""
+    settings = get_settings()
+    cache = get_token_cache()
+    key = (client_id, hash_client_secret(client_secret))
+    cached = cache.get(key)
+    if cached is not None:
+        # Not metered: `tokens_issued` counts minted tokens, and this one was counted when it was minted.
+        add_count('accentra.service_token.cache', attributes={'result': 'hit'})
+        return Token(
+            access_token=cached.token, expires_in=int(cached.expires_at - datetime.now(timezone.utc).timestamp())
+        )
+
+    add_count('accentra.service_token.cache', attributes={'result': 'miss'})
+    account = session.get(ServiceAccount, client_id)
+    if account is None or not account.is_active or not verify_client_secret(client_secret, account.secret_hash):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid client credentials')
+
+    issued_at = datetime.now(timezone.utc)
+    ttl = timedelta(minutes=settings.jwt_access_token_ttl_minutes)
+    token = create_access_token(
+        subject=account.id,
+        tenant_id=account.tenant_id,
+        role=account.role,
+        scopes=list(account.scopes),
+        issued_at=issued_at,
+        expires_delta=ttl,
+        token_type='service',
+    )
+    expires_at = (issued_at + ttl).timestamp()
+    cache.put(
+        key, _CachedToken(token, account.tenant_id, expires_at, monotonic() + settings.service_token_cache_seconds)
+    )
+    record_usage(account.tenant_id, UsageMetric.tokens_issued)
+    return Token(access_token=token, expires_in=int(ttl.total_seconds()))
+
+
+def resolve_service_principal(session: Session, account_id: UUID, tenant_id: UUID) -> Principal:
+    """Resolve a service token's caller from the database, so deactivation takes effect before the token expires."""
+    row = session.exec(_SERVICE_PRINCIPAL, params={'account_id': account_id}).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Service account not found or inactive')
+    account_tenant_id, role, scopes, is_active = row
+    if not is_active or account_tenant_id != tenant_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Service account not found or inactive')
+    return Principal(account_id, tenant_id, account_id, Role(role), tuple(scopes or ()), service=True)
+
+
+__all__ = [
+    'ServiceTokenCache',
+    'get_token_cache',
+    'create_service_account',
+    'get_service_account',
+    'deactivate_service_account',
+    'rotate_client_secret',
+    'issue_client_token',
+    'resolve_service_principal',
+]
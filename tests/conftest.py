@@ -14,6 +14,13 @@ os.environ.setdefault('REDIS_URL', 'redis://localhost:6379/0')
 os.environ.setdefault('OPENAI_API_KEY', 'test-key')
 os.environ.setdefault('TAVILY_API_KEY', 'test-key')
 os.environ.setdefault('INTERNAL_AUTH_TOKEN', 'test-token')
+# Serve change events immediately; production keeps a settle window for late-committing transactions.
+os.environ.setdefault('CHANGE_FEED_SETTLE_MS', '0')
+# There is no broker to enqueue the outbox relay on; tests run the relay directly.
+os.environ.setdefault('CHANGE_RELAY_ENABLED', 'false')
+# Every test client shares one address; keep per-IP limits out of the way of unrelated tests.
+os.environ.setdefault('RATE_LIMIT_LOGIN_PER_IP', '10000/minute')
+os.environ.setdefault('RATE_LIMIT_REGISTER_PER_IP', '10000/minute')
 
 # Ensure Alembic knows where to migrate. Default to POSTGRES_URL if ALEMBIC_DATABASE_URL is absent.
 if 'ALEMBIC_DATABASE_URL' not in os.environ and 'POSTGRES_URL' in os.environ:
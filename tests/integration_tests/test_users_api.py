@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import json
 from typing import Generator
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 import pytest
 from fastapi.testclient import TestClient
 
+from core.config import get_settings
 from main import create_app
 
+INTERNAL = {'X-Internal-Token': 'test-token'}
+
 
 @pytest.fixture()
 def client() -> Generator[TestClient, None, None]:
@@ -43,7 +47,7 @@ def test_user_management_flow(client: TestClient) -> None:
         'scopes': ['users:manage'],
         'plan': {'tier': 'enterprise', 'seats': 10},
     }
-    membership_resp = client.post(f'/identity/users/{user_id}/memberships', json=membership_payload)
+    membership_resp = client.post(f'/identity/users/{user_id}/memberships', json=membership_payload, headers=INTERNAL)
     assert membership_resp.status_code == 201, membership_resp.text
     membership_body = membership_resp.json()
     assert membership_body['role'] == 'owner'
@@ -88,6 +92,7 @@ def test_login_rejects_invalid_credentials(client: TestClient) -> None:
     client.post(
         f'/identity/users/{user_id}/memberships',
         json={'tenant_id': tenant_id, 'role': 'viewer', 'scopes': []},
+        headers=INTERNAL,
     )
 
     bad_login = client.post(
@@ -101,3 +106,567 @@ def test_login_rejects_invalid_credentials(client: TestClient) -> None:
         json={'email': user_resp.json()['email'], 'password': 'ValidPass123!', 'tenant_id': str(uuid4())},
     )
     assert bad_membership.status_code == 403
+
+
+def test_change_feed_reports_identity_mutations(client: TestClient) -> None:
+    # The feed spans every tenant, so only internal callers may read it.
+    assert client.get('/identity/changes').status_code == 401
+    assert client.get('/identity/changes', headers={'X-Internal-Token': 'wrong'}).status_code == 403
+
+    cursor = 0
+    while True:
+        page = client.get('/identity/changes', params={'after': cursor, 'limit': 500}, headers=INTERNAL).json()
+        if not page['events']:
+            break
+        cursor = page['next_cursor']
+
+    tenant_id = client.post('/identity/tenants', json={'name': f'Feed-{uuid4()}'}).json()['id']
+    user_resp = client.post(
+        '/identity/users',
+        json={'email': f'feed+{uuid4()}@example.com', 'password': 'ValidPass123!'},
+    )
+    user_id = user_resp.json()['id']
+    client.patch(f'/identity/users/{user_id}', json={'full_name': 'Renamed'}, headers=INTERNAL)
+
+    feed_resp = client.get('/identity/changes', params={'after': cursor}, headers=INTERNAL)
+    assert feed_resp.status_code == 200, feed_resp.text
+    feed = feed_resp.json()
+    changes = [(event['entity'], event['entity_id'], event['action']) for event in feed['events']]
+    assert changes == [
+        ('tenant', tenant_id, 'created'),
+        ('user', user_id, 'created'),
+        ('user', user_id, 'updated'),
+    ]
+    assert feed['events'][-1]['payload']['full_name'] == 'Renamed'
+    assert 'hashed_password' not in feed['events'][1]['payload']
+    assert feed['next_cursor'] == feed['events'][-1]['id']
+
+
+def test_failed_logins_lock_out_before_password_hashing(client: TestClient, monkeypatch) -> None:
+    import users.service
+
+    tenant_id = client.post('/identity/tenants', json={'name': f'Lockout-{uuid4()}'}).json()['id']
+    email = f'lockout+{uuid4()}@example.com'
+    client.post('/identity/users', json={'email': email, 'password': 'ValidPass123!'})
+    attempt = {'email': email, 'password': 'wrong-password', 'tenant_id': tenant_id}
+    max_failures = get_settings().rate_limit_login_max_failures
+
+    for _ in range(max_failures):
+        assert client.post('/identity/auth/login', json=attempt).status_code == 401
+
+    verified: list[str] = []
+    monkeypatch.setattr(users.service, 'verify_password', lambda password, encoded: verified.append(password))
+    locked = client.post('/identity/auth/login', json={**attempt, 'password': 'ValidPass123!'})
+    assert locked.status_code == 429
+    assert int(locked.headers['retry-after']) > 0
+    assert verified == []
+
+
+def test_tenant_export_streams_and_resumes(client: TestClient) -> None:
+    from core.db import session_scope
+    from users.models import Role
+    from users.schemas import MembershipCreate, TenantCreate, UserCreate
+    from users.security import create_access_token
+    from users.service import create_membership, create_tenant, create_user
+
+    with session_scope() as session:
+        tenant_id = create_tenant(session, TenantCreate(name=f'Export-{uuid4()}')).id
+        user_ids = []
+        for index in range(5):
+            user = create_user(session, UserCreate(email=f'export-{index}-{uuid4()}@example.com', password='s3cret!!'))
+            role = Role.owner if index == 0 else Role.viewer
+            create_membership(session, user.id, MembershipCreate(tenant_id=tenant_id, role=role))
+            user_ids.append(user.id)
+
+    def auth(user_index: int, role: Role) -> dict[str, str]:
+        token = create_access_token(subject=user_ids[user_index], tenant_id=tenant_id, role=role, scopes=[])
+        return {'Authorization': f'Bearer {token}'}
+
+    url = f'/identity/tenants/{tenant_id}/export'
+    response = client.get(url, headers=auth(0, Role.owner))
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row['user_id'] for row in rows) == sorted(str(user_id) for user_id in user_ids)
+    assert [row['membership_id'] for row in rows] == sorted(row['membership_id'] for row in rows)
+    assert 'hashed_password' not in rows[0]
+
+    resumed = client.get(url, params={'after': rows[1]['membership_id']}, headers=auth(0, Role.owner))
+    assert [json.loads(line) for line in resumed.text.splitlines()] == rows[2:]
+
+    as_csv = client.get(url, params={'format': 'csv', 'limit': 2}, headers=auth(0, Role.owner))
+    lines = as_csv.text.splitlines()
+    assert lines[0].startswith('membership_id,user_id,email')
+    assert len(lines) == 3
+
+    assert client.get(url, headers=auth(1, Role.viewer)).status_code == 403
+
+    # Soft-deleted users are no longer exported.
+    assert client.delete(f'/identity/users/{user_ids[4]}', headers=INTERNAL).status_code == 204
+    remaining = [json.loads(line) for line in client.get(url, headers=auth(0, Role.owner)).text.splitlines()]
+    assert sorted(row['user_id'] for row in remaining) == sorted(str(user_id) for user_id in user_ids[:4])
+
+
+def test_provision_creates_or_reuses_user_in_one_transaction(client: TestClient, monkeypatch) -> None:
+    import users.service
+
+    tenant_id = client.post('/identity/tenants', json={'name': f'Provision-{uuid4()}'}).json()['id']
+    other_tenant_id = client.post('/identity/tenants', json={'name': f'Provision-{uuid4()}'}).json()['id']
+    email = f'sso+{uuid4()}@example.com'
+
+    def fail_hash(password: str) -> str:
+        raise AssertionError('SSO provisioning must not hash a password')
+
+    monkeypatch.setattr(users.service, 'hash_password', fail_hash)
+    created = client.post(
+        '/identity/provision', json={'email': email, 'tenant_id': tenant_id, 'role': 'editor'}, headers=INTERNAL
+    )
+    assert created.status_code == 201, created.text
+    body = created.json()
+    assert body['user_created'] is True
+    assert body['membership']['role'] == 'editor'
+
+    reused = client.post(
+        '/identity/provision', json={'email': email, 'tenant_id': other_tenant_id, 'role': 'viewer'}, headers=INTERNAL
+    )
+    assert reused.status_code == 201, reused.text
+    assert reused.json()['user_created'] is False
+    assert reused.json()['user']['id'] == body['user']['id']
+
+    duplicate = client.post(
+        '/identity/provision', json={'email': email, 'tenant_id': tenant_id, 'role': 'viewer'}, headers=INTERNAL
+    )
+    assert duplicate.status_code == 409
+
+    # A missing tenant rolls the whole provisioning back, including the new user.
+    orphan = f'orphan+{uuid4()}@example.com'
+    missing = client.post(
+        '/identity/provision', json={'email': orphan, 'tenant_id': str(uuid4()), 'role': 'viewer'}, headers=INTERNAL
+    )
+    assert missing.status_code == 404
+    retry = client.post(
+        '/identity/provision', json={'email': orphan, 'tenant_id': tenant_id, 'role': 'viewer'}, headers=INTERNAL
+    )
+    assert retry.json()['user_created'] is True
+
+    login = client.post('/identity/auth/login', json={'email': email, 'password': '!', 'tenant_id': tenant_id})
+    assert login.status_code == 401
+
+    # A soft-deleted user is not provisioned back implicitly; it has to be restored first.
+    third_tenant_id = client.post('/identity/tenants', json={'name': f'Provision-{uuid4()}'}).json()['id']
+    assert client.delete(f'/identity/users/{body["user"]["id"]}', headers=INTERNAL).status_code == 204
+    deleted = client.post(
+        '/identity/provision', json={'email': email, 'tenant_id': third_tenant_id, 'role': 'viewer'}, headers=INTERNAL
+    )
+    assert deleted.status_code == 409
+    assert client.post(f'/identity/users/{body["user"]["id"]}/restore', headers=INTERNAL).status_code == 200
+    restored = client.post(
+        '/identity/provision', json={'email': email, 'tenant_id': third_tenant_id, 'role': 'viewer'}, headers=INTERNAL
+    )
+    assert restored.status_code == 201
+
+
+def test_routes_enforce_scopes_roles_and_tenant(client: TestClient) -> None:
+    from core.db import session_scope
+    from users.models import Role
+    from users.schemas import MembershipCreate, TenantCreate, UserCreate
+    from users.security import create_access_token
+    from users.service import create_membership, create_tenant, create_user
+
+    with session_scope() as session:
+        tenant_id = create_tenant(session, TenantCreate(name=f'Authz-{uuid4()}')).id
+        other_tenant_id = create_tenant(session, TenantCreate(name=f'Authz-{uuid4()}')).id
+        users = {}
+        for role in (Role.admin, Role.viewer):
+            user = create_user(session, UserCreate(email=f'{role.value}-{uuid4()}@example.com', password='s3cret!!'))
+            create_membership(session, user.id, MembershipCreate(tenant_id=tenant_id, role=role))
+            users[role] = user.id
+        outsider = create_user(session, UserCreate(email=f'outsider-{uuid4()}@example.com', password='s3cret!!')).id
+
+    def auth(role: Role) -> dict[str, str]:
+        token = create_access_token(subject=users[role], tenant_id=tenant_id, role=role, scopes=[])
+        return {'Authorization': f'Bearer {token}'}
+
+    def grant(role: str, headers: dict[str, str], tenant: object = tenant_id) -> int:
+        payload = {'tenant_id': str(tenant), 'role': role}
+        return client.post(f'/identity/users/{outsider}/memberships', json=payload, headers=headers).status_code
+
+    assert grant('viewer', {}) == 401
+    assert grant('viewer', {'X-Internal-Token': 'wrong'}) == 401
+    assert grant('viewer', auth(Role.viewer)) == 403
+    assert grant('owner', auth(Role.admin)) == 403
+    assert grant('viewer', auth(Role.admin), other_tenant_id) == 403
+    escalate = {'tenant_id': str(tenant_id), 'role': 'viewer', 'scopes': ['*']}
+    assert (
+        client.post(f'/identity/users/{outsider}/memberships', json=escalate, headers=auth(Role.admin)).status_code
+        == 403
+    )
+    provision_escalate = {'email': f'p-{uuid4()}@example.com', **escalate}
+    assert client.post('/identity/provision', json=provision_escalate, headers=auth(Role.admin)).status_code == 403
+    account = {'name': 'escalate', 'role': 'viewer', 'scopes': ['*']}
+    assert (
+        client.post(
+            f'/identity/tenants/{tenant_id}/service-accounts', json=account, headers=auth(Role.admin)
+        ).status_code
+        == 403
+    )
+    assert grant('editor', auth(Role.admin)) == 201
+
+    rename = {'full_name': 'Renamed'}
+    assert (
+        client.patch(f'/identity/users/{users[Role.viewer]}', json=rename, headers=auth(Role.viewer)).status_code == 200
+    )
+    assert client.patch(f'/identity/users/{outsider}', json=rename, headers=auth(Role.viewer)).status_code == 403
+    assert client.patch(f'/identity/users/{outsider}', json=rename, headers=auth(Role.admin)).status_code == 200
+    provision = {'email': f'p-{uuid4()}@example.com', 'tenant_id': str(tenant_id), 'role': 'viewer'}
+    assert client.post('/identity/provision', json=provision).status_code == 401
+
+
+def test_admins_cannot_take_over_higher_roles_or_other_tenants(client: TestClient) -> None:
+    from core.db import session_scope
+    from users.models import Role
+    from users.schemas import MembershipCreate, TenantCreate, UserCreate
+    from users.security import create_access_token
+    from users.service import create_membership, create_tenant, create_user
+
+    with session_scope() as session:
+        tenant_id = create_tenant(session, TenantCreate(name=f'Takeover-{uuid4()}')).id
+        other_tenant_id = create_tenant(session, TenantCreate(name=f'Takeover-{uuid4()}')).id
+        members = {}
+        for name, role in (
+            ('admin', Role.admin),
+            ('owner', Role.owner),
+            ('viewer', Role.viewer),
+            ('shared', Role.viewer),
+        ):
+            user = create_user(session, UserCreate(email=f'{name}-{uuid4()}@example.com', password='s3cret!!'))
+            create_membership(session, user.id, MembershipCreate(tenant_id=tenant_id, role=role))
+            members[name] = user.id
+        create_membership(session, members['shared'], MembershipCreate(tenant_id=other_tenant_id, role=Role.owner))
+
+    token = create_access_token(subject=members['admin'], tenant_id=tenant_id, role=Role.admin, scopes=[])
+    admin = {'Authorization': f'Bearer {token}'}
+    takeover = {'password': 'attacker-chosen'}
+
+    # The owner outranks the admin: no password change, deactivation, rename or deletion.
+    assert client.patch(f'/identity/users/{members["owner"]}', json=takeover, headers=admin).status_code == 403
+    assert (
+        client.patch(f'/identity/users/{members["owner"]}', json={'is_active': False}, headers=admin).status_code == 403
+    )
+    assert (
+        client.patch(f'/identity/users/{members["owner"]}', json={'full_name': 'x'}, headers=admin).status_code == 403
+    )
+    assert client.delete(f'/identity/users/{members["owner"]}', headers=admin).status_code == 403
+    # A viewer who is also a member elsewhere: profile edits only, nothing that changes their other accounts.
+    assert client.patch(f'/identity/users/{members["shared"]}', json=takeover, headers=admin).status_code == 403
+    assert client.delete(f'/identity/users/{members["shared"]}', headers=admin).status_code == 403
+    assert (
+        client.patch(f'/identity/users/{members["shared"]}', json={'full_name': 'x'}, headers=admin).status_code == 200
+    )
+    # A viewer who only belongs to the admin's tenant is fully managed.
+    assert client.patch(f'/identity/users/{members["viewer"]}', json=takeover, headers=admin).status_code == 200
+    assert client.delete(f'/identity/users/{members["viewer"]}', headers=admin).status_code == 204
+
+
+def test_restore_is_authorized_like_other_account_changes(client: TestClient) -> None:
+    from core.db import session_scope
+    from users.models import Role
+    from users.schemas import MembershipCreate, TenantCreate, UserCreate
+    from users.security import create_access_token
+    from users.service import create_membership, create_tenant, create_user
+
+    with session_scope() as session:
+        tenant_id = create_tenant(session, TenantCreate(name=f'Restore-{uuid4()}')).id
+        other_tenant_id = create_tenant(session, TenantCreate(name=f'Restore-{uuid4()}')).id
+        members = {}
+        for name, role in (
+            ('admin', Role.admin),
+            ('owner', Role.owner),
+            ('viewer', Role.viewer),
+            ('shared', Role.viewer),
+        ):
+            user = create_user(session, UserCreate(email=f'{name}-{uuid4()}@example.com', password='s3cret!!'))
+            create_membership(session, user.id, MembershipCreate(tenant_id=tenant_id, role=role))
+            members[name] = user.id
+        create_membership(session, members['shared'], MembershipCreate(tenant_id=other_tenant_id, role=Role.viewer))
+
+    token = create_access_token(subject=members['admin'], tenant_id=tenant_id, role=Role.admin, scopes=[])
+    admin = {'Authorization': f'Bearer {token}'}
+
+    # A deactivated user is not deleted: restore leaves it inactive.
+    assert (
+        client.patch(f'/identity/users/{members["viewer"]}', json={'is_active': False}, headers=admin).status_code
+        == 200
+    )
+    kept = client.post(f'/identity/users/{members["viewer"]}/restore', headers=admin)
+    assert kept.status_code == 200
+    assert kept.json()['is_active'] is False
+
+    for name in ('owner', 'shared'):
+        assert client.delete(f'/identity/users/{members[name]}', headers=INTERNAL).status_code == 204
+    # A higher role, and a user who also belongs to another tenant, are out of the admin's reach.
+    assert client.post(f'/identity/users/{members["owner"]}/restore', headers=admin).status_code == 403
+    assert client.post(f'/identity/users/{members["shared"]}/restore', headers=admin).status_code == 403
+    assert client.get(f'/identity/users/{members["owner"]}').status_code == 404
+    assert client.post(f'/identity/users/{members["owner"]}/restore', headers=INTERNAL).status_code == 200
+
+
+def test_user_search_is_tenant_scoped_and_paginated(client: TestClient) -> None:
+    from core.db import session_scope
+    from users.models import Role
+    from users.schemas import MembershipCreate, TenantCreate, UserCreate
+    from users.security import create_access_token
+    from users.service import create_membership, create_tenant, create_user
+
+    marker = uuid4().hex[:8]
+    with session_scope() as session:
+        tenant_id = create_tenant(session, TenantCreate(name=f'Search-{uuid4()}')).id
+        ids = []
+        for index in range(3):
+            email = f'Srch{marker}.{index}@example.com'
+            user = create_user(session, UserCreate(email=email, full_name=f'Ada_{marker} {index}', password='s3cret!!'))
+            create_membership(session, user.id, MembershipCreate(tenant_id=tenant_id, role=Role.viewer))
+            ids.append(str(user.id))
+        create_user(session, UserCreate(email=f'srch{marker}.x@example.com', password='s3cret!!'))
+
+    token = create_access_token(subject=UUID(ids[0]), tenant_id=tenant_id, role=Role.viewer, scopes=[])
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/identity/users/search', params={'q': f'srch{marker}', 'limit': 2}, headers=headers).json()
+    assert [user['id'] for user in first['users']] == sorted(ids)[:2]
+    rest = client.get(
+        '/identity/users/search', params={'q': f'SRCH{marker}', 'after': first['next_cursor']}, headers=headers
+    ).json()
+    assert [user['id'] for user in rest['users']] == sorted(ids)[2:]
+    assert rest['next_cursor'] is None
+
+    # Internal callers search across tenants; `_` is matched literally, not as a wildcard.
+    everyone = client.get('/identity/users/search', params={'q': f'srch{marker}'}, headers=INTERNAL).json()
+    assert len(everyone['users']) == 4
+    by_name = client.get(
+        '/identity/users/search', params={'q': f'a_{marker}', 'match': 'contains'}, headers=headers
+    ).json()
+    assert len(by_name['users']) == 3
+
+    # Soft-deleted users drop out of search results.
+    assert client.delete(f'/identity/users/{ids[2]}', headers=INTERNAL).status_code == 204
+    remaining = client.get('/identity/users/search', params={'q': f'srch{marker}'}, headers=headers).json()
+    assert [user['id'] for user in remaining['users']] == sorted(ids[:2])
+    assert client.get('/identity/users/search', params={'q': 'ada'}).status_code == 401
+
+
+def test_email_identity_ignores_case(client: TestClient) -> None:
+    tenant_id = client.post('/identity/tenants', json={'name': f'Case-{uuid4()}'}).json()['id']
+    local = f'Mixed.Case+{uuid4().hex[:8]}'
+    created = client.post('/identity/users', json={'email': f'{local}@example.com', 'password': 'ValidPass123!'})
+    assert created.status_code == 201
+    user_id = created.json()['id']
+
+    again = client.post('/identity/users', json={'email': f'{local.upper()}@EXAMPLE.com', 'password': 'ValidPass123!'})
+    assert again.status_code == 409
+
+    provisioned = client.post(
+        '/identity/provision',
+        json={'email': f'{local.lower()}@example.com', 'tenant_id': tenant_id, 'role': 'viewer'},
+        headers=INTERNAL,
+    )
+    assert provisioned.json()['user_created'] is False
+    assert provisioned.json()['user']['id'] == user_id
+
+    login = client.post(
+        '/identity/auth/login',
+        json={'email': f'{local.lower()}@example.com', 'password': 'ValidPass123!', 'tenant_id': tenant_id},
+    )
+    assert login.status_code == 200, login.text
+
+
+def test_soft_deleted_users_are_archived_and_restored(client: TestClient) -> None:
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import update
+    from sqlmodel import select
+
+    from core.db import session_scope
+    from users.archive import archive_inactive_users
+    from users.models import MembershipArchive, Role, User, UserArchive
+    from users.schemas import MembershipCreate, TenantCreate, UserCreate
+    from users.security import create_access_token
+    from users.service import create_membership, create_tenant, create_user
+
+    email = f'archive+{uuid4()}@example.com'
+    with session_scope() as session:
+        tenant_id = create_tenant(session, TenantCreate(name=f'Archive-{uuid4()}')).id
+        admin_id = create_user(session, UserCreate(email=f'admin-{uuid4()}@example.com', password='s3cret!!')).id
+        create_membership(session, admin_id, MembershipCreate(tenant_id=tenant_id, role=Role.admin))
+        user_id = create_user(session, UserCreate(email=email, password='ValidPass123!')).id
+        create_membership(session, user_id, MembershipCreate(tenant_id=tenant_id, role=Role.editor))
+    token = create_access_token(subject=admin_id, tenant_id=tenant_id, role=Role.admin, scopes=[])
+    headers = {'Authorization': f'Bearer {token}'}
+    login = {'email': email, 'password': 'ValidPass123!', 'tenant_id': str(tenant_id)}
+
+    assert client.delete(f'/identity/users/{user_id}', headers=headers).status_code == 204
+    assert client.get(f'/identity/users/{user_id}').status_code == 404
+    assert client.post('/identity/auth/login', json=login).status_code == 401
+
+    with session_scope() as session:
+        assert archive_inactive_users(session, inactive_days=30) == 0  # still within the grace period
+        old = datetime.utcnow() - timedelta(days=31)
+        session.execute(update(User).where(User.id == user_id).values(updated_at=old))  # type: ignore[arg-type]
+    with session_scope() as session:
+        assert archive_inactive_users(session, inactive_days=30) >= 1
+    with session_scope() as session:
+        assert session.get(User, user_id) is None
+        assert session.get(UserArchive, user_id).deleted_at is not None  # type: ignore[union-attr]
+        assert len(session.exec(select(MembershipArchive).where(MembershipArchive.user_id == user_id)).all()) == 1
+
+    restored = client.post(f'/identity/users/{user_id}/restore', headers=headers)
+    assert restored.status_code == 200, restored.text
+    assert restored.json()['is_active'] is True
+    assert [membership['role'] for membership in restored.json()['memberships']] == ['editor']
+    assert client.post('/identity/auth/login', json=login).status_code == 200
+
+
+def test_client_credentials_tokens_are_cached_and_authenticate(client: TestClient, monkeypatch) -> None:
+    import users.metering
+    import users.service_accounts
+    from users.models import UsageMetric
+
+    tenant_id = client.post('/identity/tenants', json={'name': f'Machines-{uuid4()}'}).json()['id']
+    created = client.post(
+        f'/identity/tenants/{tenant_id}/service-accounts',
+        json={'name': 'billing-sync', 'role': 'editor', 'scopes': ['billing:*']},
+        headers=INTERNAL,
+    )
+    assert created.status_code == 201, created.text
+    account = created.json()
+    grant = {'grant_type': 'client_credentials', 'client_id': account['id'], 'client_secret': account['client_secret']}
+
+    users.metering._get_aggregator().swap()  # discard usage recorded by earlier tests
+    first = client.post('/identity/auth/token', json=grant)
+    assert first.status_code == 200, first.text
+    assert first.json()['expires_in'] > 0
+
+    def no_database(*args, **kwargs):
+        raise AssertionError('cached tokens must not touch the database')
+
+    monkeypatch.setattr(users.service_accounts.Session, 'get', no_database)
+    again = client.post('/identity/auth/token', json=grant)
+    assert again.json()['access_token'] == first.json()['access_token']
+    monkeypatch.undo()
+    # Only the minted token is metered, not the cached one handed out again.
+    counters, _ = users.metering._get_aggregator().swap()
+    issued = sum(
+        amount
+        for (tenant, metric, _), amount in counters.items()
+        if str(tenant) == tenant_id and metric == UsageMetric.tokens_issued
+    )
+    assert issued == 1
+
+    wrong = client.post('/identity/auth/token', json={**grant, 'client_secret': 'not-the-secret'})
+    assert wrong.status_code == 401
+
+    token = {'Authorization': f'Bearer {first.json()["access_token"]}'}
+    assert client.get('/identity/users/search', params={'q': 'nobody'}, headers=token).status_code == 200
+    # Editors may not create service accounts, and service accounts act like their role.
+    denied = client.post(f'/identity/tenants/{tenant_id}/service-accounts', json={'name': 'x'}, headers=token)
+    assert denied.status_code == 403
+
+
+def test_rotating_or_deactivating_a_service_account_drops_its_cached_tokens(client: TestClient) -> None:
+    tenant_id = client.post('/identity/tenants', json={'name': f'Machines-{uuid4()}'}).json()['id']
+    accounts = f'/identity/tenants/{tenant_id}/service-accounts'
+    account = client.post(accounts, json={'name': 'ci', 'role': 'viewer'}, headers=INTERNAL).json()
+    grant = {'grant_type': 'client_credentials', 'client_id': account['id'], 'client_secret': account['client_secret']}
+    assert client.post('/identity/auth/token', json=grant).status_code == 200
+
+    rotated = client.post(f'{accounts}/{account["id"]}/rotate-secret', headers=INTERNAL)
+    assert rotated.status_code == 200, rotated.text
+    new_secret = rotated.json()['client_secret']
+    assert new_secret != account['client_secret']
+    # Without the cache entry for the old secret being dropped, these would be cache hits.
+    assert client.post('/identity/auth/token', json=grant).status_code == 401
+    fresh = client.post('/identity/auth/token', json={**grant, 'client_secret': new_secret})
+    assert fresh.status_code == 200
+
+    assert client.delete(f'{accounts}/{uuid4()}', headers=INTERNAL).status_code == 404
+    assert client.delete(f'{accounts}/{account["id"]}', headers=INTERNAL).status_code == 204
+    assert client.post('/identity/auth/token', json={**grant, 'client_secret': new_secret}).status_code == 401
+    token = {'Authorization': f'Bearer {fresh.json()["access_token"]}'}
+    assert client.get('/identity/users/search', params={'q': 'nobody'}, headers=token).status_code == 401
+
+
+def test_usage_is_aggregated_flushed_once_and_reported(client: TestClient, monkeypatch) -> None:
+    import core.queueing
+    import users.metering
+    from users.metering import flush_usage, write_usage_batch
+
+    tenant_id = client.post('/identity/tenants', json={'name': f'Usage-{uuid4()}'}).json()['id']
+    email = f'usage+{uuid4()}@example.com'
+    user_id = client.post('/identity/users', json={'email': email, 'password': 'ValidPass123!'}).json()['id']
+    client.post(
+        f'/identity/users/{user_id}/memberships', json={'tenant_id': tenant_id, 'role': 'owner'}, headers=INTERNAL
+    )
+
+    users.metering._get_aggregator().swap()  # discard usage recorded by earlier tests
+    login = {'email': email, 'password': 'ValidPass123!', 'tenant_id': tenant_id}
+    token = client.post('/identity/auth/login', json=login).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    for _ in range(3):
+        assert client.get('/identity/users/me', headers=headers).status_code == 200
+
+    sent: list[tuple[str, list]] = []
+    monkeypatch.setattr(core.queueing.write_usage, 'send', lambda batch_id, rows: sent.append((batch_id, rows)))
+    assert flush_usage() > 0
+    for batch_id, rows in sent:
+        assert write_usage_batch(batch_id, rows) == len(rows)
+        assert write_usage_batch(batch_id, rows) == 0  # redelivery is a no-op
+
+    report = client.get(f'/identity/tenants/{tenant_id}/usage', headers=headers)
+    assert report.status_code == 200, report.text
+    totals = report.json()['totals']
+    # The report request itself is not counted yet: it is still waiting in memory for the next flush.
+    assert totals == {'logins': 1, 'tokens_issued': 1, 'api_calls': 3, 'active_users': 1}
+    only_logins = client.get(f'/identity/tenants/{tenant_id}/usage', params={'metric': 'logins'}, headers=headers)
+    assert only_logins.json()['totals'] == {'logins': 1}
+
+
+def test_slow_statements_are_logged_with_route_tenant_and_plan(monkeypatch, caplog) -> None:
+    from core import db
+
+    monkeypatch.setenv('SLOW_QUERY_THRESHOLD_MS', '0')
+    monkeypatch.setenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATIO', '1')
+    monkeypatch.setattr(db, '_explained_at', {})
+    monkeypatch.setattr(db.slow_query_logger, 'disabled', False)  # Alembic's fileConfig disables existing loggers
+    get_settings.cache_clear()
+    db.install_statement_timing()
+    email = f'slow+{uuid4()}@example.com'
+    try:
+        # Leaving the client runs the lifespan shutdown, which drains the queued EXPLAIN captures.
+        with TestClient(create_app()) as client:
+            tenant_id = client.post('/identity/tenants', json={'name': f'Slow-{uuid4()}'}).json()['id']
+            user_id = client.post('/identity/users', json={'email': email, 'password': 'StrongPassw0rd!'}).json()['id']
+            client.post(
+                f'/identity/users/{user_id}/memberships',
+                json={'tenant_id': tenant_id, 'role': 'viewer'},
+                headers=INTERNAL,
+            )
+            login = client.post(
+                '/identity/auth/login', json={'email': email, 'password': 'StrongPassw0rd!', 'tenant_id': tenant_id}
+            )
+            caplog.clear()
+            with caplog.at_level('WARNING', logger='core.db.slow_queries'):
+                me = client.get(
+                    '/identity/users/me', headers={'Authorization': f'Bearer {login.json()["access_token"]}'}
+                )
+                assert me.status_code == 200
+    finally:
+        get_settings.cache_clear()
+
+    messages = [record.getMessage() for record in caplog.records if record.name == 'core.db.slow_queries']
+    slow = [message for message in messages if message.startswith('Slow statement |')]
+    assert slow
+    assert all('route=/identity/users/me' in message and f'tenant_id={tenant_id}' in message for message in slow)
+    assert not any(email in message for message in messages)
+    plans = [message for message in messages if message.startswith('Slow statement plan |')]
+    assert plans
+    assert 'actual time' in plans[0]
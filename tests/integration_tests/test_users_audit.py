@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from sqlalchemy import event, func
+from sqlmodel import select
+
+from core.db import get_engine, session_scope
+from users.audit import AuditEntry, write_audit_batch
+from users.models import AuditAction, AuditEvent
+
+
+def test_write_audit_batch_uses_single_bulk_insert() -> None:
+    tenant_id = uuid4()
+    messages = [
+        AuditEntry(action=AuditAction.login_failed, tenant_id=tenant_id, details={'attempt': index}).to_message()
+        for index in range(3000)
+    ]
+    inserts: list[str] = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip().upper().startswith('INSERT'):
+            inserts.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, 'before_cursor_execute', count_inserts)
+    try:
+        assert write_audit_batch(messages) == 3000
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_inserts)
+
+    assert len(inserts) == 1
+    with session_scope() as session:
+        stored = session.exec(
+            select(func.count()).select_from(AuditEvent).where(AuditEvent.tenant_id == tenant_id)
+        ).one()
+    assert stored == 3000
+
+
+def test_oversized_client_fields_do_not_fail_the_batch() -> None:
+    tenant_id = uuid4()
+    messages = [
+        AuditEntry(action=AuditAction.login_failed, tenant_id=tenant_id).to_message(),
+        AuditEntry(
+            action=AuditAction.login_failed, tenant_id=tenant_id, ip_address='1' * 200, user_agent='Mozilla/5.0 ' * 200
+        ).to_message(),
+    ]
+
+    assert write_audit_batch(messages) == 2
+    with session_scope() as session:
+        stored = session.exec(
+            select(AuditEvent.ip_address, AuditEvent.user_agent).where(AuditEvent.tenant_id == tenant_id)
+        ).all()
+    assert len(stored) == 2
+    assert max(len(ip_address or '') for ip_address, _ in stored) == 64
+    assert max(len(user_agent or '') for _, user_agent in stored) == 512
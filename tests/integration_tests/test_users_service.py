@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import threading
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from core.db import get_engine, session_scope
+from users.events import publish_pending_changes
+from users.models import ChangeEvent, Role
+from users.schemas import MembershipCreate, TenantCreate, UserCreate
+from users.service import (
+    Principal,
+    create_membership,
+    create_tenant,
+    create_user,
+    get_membership,
+    get_tenant,
+    get_user,
+    get_user_by_email,
+    list_memberships,
+    resolve_principal,
+)
+
+
+def test_concurrent_lookups_share_one_query() -> None:
+    with session_scope() as session:
+        user_id = create_user(session, UserCreate(email=f'{uuid4()}@example.com', password='s3cret!!')).id
+
+    engine = get_engine()
+    barrier = threading.Barrier(5)
+    selects: list[str] = []
+    results: dict[int, tuple[bool, str | None]] = {}
+
+    def slow_select(conn, cursor, statement, parameters, context, executemany) -> None:
+        if 'FROM identity.users' in statement:
+            selects.append(statement)
+            threading.Event().wait(0.2)  # hold the query open so the other lookups pile up behind it
+
+    def lookup(index: int) -> None:
+        with Session(engine) as session:
+            barrier.wait()
+            user = get_user(session, user_id)
+            assert user is not None
+            user.full_name = f'caller {index}'  # mutations stay local to each caller's session
+            results[index] = (user in session, user.email)
+
+    event.listen(engine, 'before_cursor_execute', slow_select)
+    try:
+        threads = [threading.Thread(target=lookup, args=(index,)) for index in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        event.remove(engine, 'before_cursor_execute', slow_select)
+
+    assert len(results) == 5
+    assert all(in_session for in_session, _ in results.values())
+    assert len({email for _, email in results.values()}) == 1
+    assert len(selects) == 1
+
+
+def test_hot_queries_reuse_one_statement_and_compiled_form() -> None:
+    import users.service
+
+    with session_scope() as session:
+        user_ids = [
+            create_user(session, UserCreate(email=f'{uuid4()}@example.com', password='s3cret!!')).id for _ in range(3)
+        ]
+        emails = [get_user(session, user_id).email for user_id in user_ids]  # type: ignore[union-attr]
+
+    engine = get_engine()
+    statements: list[object] = []
+    compiled: dict[int, set[int]] = {}
+
+    def record_statement(conn, clauseelement, multiparams, params, execution_options) -> None:
+        statements.append(clauseelement)
+
+    def record_compiled(conn, cursor, statement, parameters, context, executemany) -> None:
+        compiled.setdefault(id(statements[-1]), set()).add(id(context.compiled))
+
+    event.listen(engine, 'before_execute', record_statement)
+    event.listen(engine, 'before_cursor_execute', record_compiled)
+    try:
+        for _ in range(5):
+            with Session(engine) as session:
+                for user_id, email in zip(user_ids, emails, strict=True):
+                    assert get_user_by_email(session, email) is not None
+                    assert get_membership(session, user_id, uuid4()) is None
+                    list_memberships(session, user_id)
+    finally:
+        event.remove(engine, 'before_execute', record_statement)
+        event.remove(engine, 'before_cursor_execute', record_compiled)
+
+    # Different parameters on every call, yet each query executes the same module-level construct and compiled SQL.
+    hot = {id(users.service._USER_BY_EMAIL), id(users.service._MEMBERSHIP), id(users.service._MEMBERSHIPS_OF_USER)}
+    assert len(statements) == 5 * 3 * 3
+    assert {id(statement) for statement in statements} == hot
+    assert all(len(forms) == 1 for forms in compiled.values())
+
+
+def test_resolve_principal_projects_columns_without_loading_entities() -> None:
+    with session_scope() as session:
+        user = create_user(session, UserCreate(email=f'{uuid4()}@example.com', password='s3cret!!'))
+        tenant = create_tenant(session, TenantCreate(name=f'tenant-{uuid4()}'))
+        membership = create_membership(
+            session, user.id, MembershipCreate(tenant_id=tenant.id, role=Role.admin, scopes=['users:read'])
+        )
+        inactive = create_user(
+            session, UserCreate(email=f'{uuid4()}@example.com', password='s3cret!!', is_active=False)
+        )
+        user_id, tenant_id, membership_id, inactive_id = user.id, tenant.id, membership.membership_id, inactive.id
+
+    with Session(get_engine()) as session:
+        principal = resolve_principal(session, user_id, tenant_id)
+        assert principal == Principal(user_id, tenant_id, membership_id, Role.admin, ('users:read',))
+        assert len(session.identity_map) == 0
+
+        with pytest.raises(HTTPException) as forbidden:
+            resolve_principal(session, user_id, uuid4())
+        assert forbidden.value.status_code == 403
+        with pytest.raises(HTTPException) as inactive_user:
+            resolve_principal(session, inactive_id, tenant_id)
+        assert inactive_user.value.status_code == 401
+
+
+def test_sessions_with_uncommitted_writes_do_not_coalesce(monkeypatch: pytest.MonkeyPatch) -> None:
+    import users.service
+
+    flights: list[str] = []
+    real_do = users.service._lookups.do
+
+    def recording_do(entity, key, load):
+        flights.append(entity)
+        return real_do(entity, key, load)
+
+    monkeypatch.setattr(users.service._lookups, 'do', recording_do)
+    with session_scope() as session:
+        tenant = create_tenant(session, TenantCreate(name=f'Writes-{uuid4()}'))
+        session.expunge(tenant)
+        # Written (flushed) but uncommitted: this session's reads must neither join nor lead a shared flight.
+        assert get_tenant(session, tenant.id) is not None
+        assert flights == []
+
+    with session_scope() as session:
+        assert get_tenant(session, tenant.id) is not None
+    assert flights == ['Tenant']
+
+
+def test_committed_changes_are_relayed_exactly_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    import core.queueing
+
+    streamed: list[dict[str, str]] = []
+
+    class RecordingPipe:
+        def xadd(self, name: str, fields: dict[str, str], **options: object) -> None:
+            streamed.append(fields)
+
+    def fake_pipelined(items, queue, **options):
+        pipe = RecordingPipe()
+        for item in items:
+            queue(pipe, item)
+        return []
+
+    monkeypatch.setattr(core.queueing, 'pipelined', fake_pipelined)
+    with session_scope() as session:
+        user_id = create_user(session, UserCreate(email=f'{uuid4()}@example.com', password='s3cret!!')).id
+
+    core.queueing.relay_identity_changes()
+    core.queueing.relay_identity_changes()
+
+    assert [fields['action'] for fields in streamed if fields['entity_id'] == str(user_id)] == ['created']
+    with session_scope() as session:
+        event = session.exec(select(ChangeEvent).where(ChangeEvent.entity_id == user_id)).one()
+        assert event.published_at is not None
+
+
+def test_concurrent_relays_claim_disjoint_events() -> None:
+    with session_scope() as session:
+        user_id = create_user(session, UserCreate(email=f'{uuid4()}@example.com', password='s3cret!!')).id
+
+    claimed: list[list[int | None]] = []
+
+    def publish_while_locked(events: list[ChangeEvent]) -> None:
+        claimed.append([event.id for event in events])
+        # A second relay running while this batch is still locked must skip it rather than publish it again.
+        with session_scope() as other:
+            publish_pending_changes(other, lambda batch: claimed.append([e.id for e in batch]), batch_size=10_000)
+
+    with session_scope() as session:
+        assert publish_pending_changes(session, publish_while_locked, batch_size=10_000) >= 1
+
+    first = claimed[0]
+    assert all(set(first).isdisjoint(batch) for batch in claimed[1:])
+    with session_scope() as session:
+        event = session.exec(select(ChangeEvent).where(ChangeEvent.entity_id == user_id)).one()
+        assert event.id in first
+        assert event.published_at is not None
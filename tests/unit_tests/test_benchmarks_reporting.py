@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from benchmarks.reporting import (
+    compare,
+    load_baseline,
+    percentile,
+    save_baseline,
+    summarize,
+)
+
+
+def test_summary_reports_percentiles_and_throughput() -> None:
+    durations = [index / 1000 for index in range(1, 101)]  # 1..100 ms
+    summary = summarize('op', durations, wall_seconds=2.0)
+
+    assert summary.count == 100
+    assert summary.throughput == 50.0
+    assert round(summary.p50_ms, 2) == 50.5
+    assert round(summary.p99_ms, 2) == 99.01
+    assert percentile([], 0.5) == 0.0
+
+
+def test_baseline_roundtrip_flags_regressions(tmp_path: Path) -> None:
+    baseline_path = tmp_path / 'baseline.json'
+    save_baseline(baseline_path, 'micro', [summarize('fast', [0.001] * 10), summarize('slow', [0.010] * 10)])
+    baseline = load_baseline(baseline_path)
+
+    current = [summarize('fast', [0.00105] * 10), summarize('slow', [0.020] * 10), summarize('new', [0.5])]
+    regressions = compare(current, baseline, tolerance=0.15)
+
+    assert {(item.name, item.metric) for item in regressions} == {('slow', 'p95_ms'), ('slow', 'throughput')}
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from core.admission import AUTH, READ, WRITE, AdmissionControlMiddleware
+from core.config import get_settings
+
+
+def _settings(**overrides):
+    return get_settings().model_copy(
+        update={'admission_max_concurrency': 4, 'admission_max_queue': 0, 'admission_auth_share': 0.25, **overrides}
+    )
+
+
+def _app(release: asyncio.Event, **overrides) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, settings=_settings(**overrides))
+
+    @app.post('/identity/auth/login')
+    async def login() -> dict[str, str]:
+        await release.wait()
+        return {'status': 'ok'}
+
+    @app.get('/identity/users/me')
+    async def me() -> dict[str, str]:
+        return {'status': 'ok'}
+
+    return app
+
+
+def test_routes_are_classified() -> None:
+    middleware = AdmissionControlMiddleware(FastAPI(), settings=_settings())  # type: ignore[arg-type]
+    assert middleware.classify('POST', '/identity/auth/login') == AUTH
+    assert middleware.classify('POST', '/identity/users') == AUTH
+    assert middleware.classify('PATCH', '/identity/users/1') == WRITE
+    assert middleware.classify('GET', '/identity/users/me') == READ
+
+
+@pytest.mark.anyio
+async def test_auth_share_is_capped_and_excess_is_shed_with_retry_after() -> None:
+    release = asyncio.Event()
+    app = _app(release)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        # One of four slots belongs to auth; the first login holds it.
+        first = asyncio.create_task(client.post('/identity/auth/login'))
+        await asyncio.sleep(0.05)
+
+        rejected = await client.post('/identity/auth/login')
+        assert rejected.status_code == 503
+        assert rejected.headers['retry-after'] == '1'
+
+        # Reads still have capacity while auth is saturated.
+        assert (await client.get('/identity/users/me')).status_code == 200
+
+        release.set()
+        assert (await first).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_queued_request_is_rejected_after_the_deadline() -> None:
+    release = asyncio.Event()
+    app = _app(release, admission_max_queue=10, admission_queue_timeout_ms=50)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        first = asyncio.create_task(client.post('/identity/auth/login'))
+        await asyncio.sleep(0.05)
+        assert (await client.post('/identity/auth/login')).status_code == 503
+        release.set()
+        assert (await first).status_code == 200
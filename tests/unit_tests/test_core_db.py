@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from core.db import normalize_statement, redact_parameters
+
+
+def test_statements_of_one_shape_share_a_fingerprint() -> None:
+    two, fingerprint = normalize_statement(
+        'SELECT users.id FROM identity.users\n  WHERE lower(users.email) = lower(%(email_1)s)'
+        ' AND users.id IN (%(id_1_1)s, %(id_1_2)s) AND users.created_at > %(created_1)s::TIMESTAMP LIMIT 10'
+    )
+    three, same = normalize_statement(
+        'SELECT users.id FROM identity.users WHERE lower(users.email) = lower(%(email_1)s)'
+        ' AND users.id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s) AND users.created_at > %(created_1)s::TIMESTAMP LIMIT 50'
+    )
+
+    assert two == three
+    assert fingerprint == same
+    assert two == (
+        'SELECT users.id FROM identity.users WHERE lower(users.email) = lower(?) AND users.id IN (?)'
+        ' AND users.created_at > ?::TIMESTAMP LIMIT ?'
+    )
+
+
+def test_literals_and_multi_row_values_are_normalized() -> None:
+    normalized, _ = normalize_statement(
+        "INSERT INTO t (a, b) VALUES (%(a_m0)s, 'it''s'), (%(a_m1)s, 'x') RETURNING t.id, coalesce(t.a, $1)"
+    )
+
+    assert normalized == 'INSERT INTO t (a, b) VALUES (?, ?) RETURNING t.id, coalesce(t.a, ?)'
+
+
+def test_parameters_are_redacted_to_types() -> None:
+    assert redact_parameters({'email': 'a@example.com', 'id': uuid4(), 'limit': 5}) == {
+        'email': 'str',
+        'id': 'UUID',
+        'limit': 'int',
+    }
+    assert redact_parameters(('a@example.com', 5)) == ['str', 'int']
+    assert redact_parameters([{'email': 'a@example.com'}] * 3, executemany=True) == '<3 rows>'
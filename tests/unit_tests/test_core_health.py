@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+import core.health as core_health
+from core.health import ReadinessChecker
+from main import create_app
+
+
+def _failing() -> str | None:
+    raise ConnectionError('connection refused')
+
+
+def test_optional_failures_do_not_make_the_service_unready() -> None:
+    checker = ReadinessChecker(
+        {'database': lambda: None, 'exporters': _failing}, required=['database'], interval=60, stale_after=60
+    )
+    assert checker.snapshot()[0] is False  # nothing checked yet
+
+    checker.run_once()
+    ready, report = checker.snapshot()
+
+    assert ready is True
+    assert report['database']['ok'] is True
+    assert report['exporters']['ok'] is False
+    assert 'connection refused' in report['exporters']['error']
+
+
+def test_stale_results_count_as_failures() -> None:
+    checker = ReadinessChecker({'database': lambda: None}, required=['database'], interval=60, stale_after=0)
+    checker.run_once()
+
+    ready, report = checker.snapshot()
+
+    assert ready is False
+    assert report['database']['error'].startswith('stale')
+
+
+def test_readyz_serves_cached_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = {'redis': 0}
+
+    def redis_check() -> str | None:
+        calls['redis'] += 1
+        return _failing()
+
+    checker = ReadinessChecker(
+        {'database': lambda: None, 'redis': redis_check}, required=['database', 'redis'], interval=60, stale_after=60
+    )
+    checker.run_once()
+    monkeypatch.setattr(core_health, '_checker', checker)
+    client = TestClient(create_app())
+
+    responses = [client.get('/readyz') for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [503] * 3
+    body = responses[0].json()
+    assert body['status'] == 'not_ready'
+    assert body['checks']['database']['ok'] is True
+    assert 'latency_ms' in body['checks']['database']
+    assert calls['redis'] == 1
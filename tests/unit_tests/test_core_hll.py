@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+
+from core.hll import HyperLogLog
+
+
+def test_estimates_stay_within_a_few_percent() -> None:
+    sketch = HyperLogLog(12)
+    for _ in range(20_000):
+        sketch.add(uuid4().bytes)
+    assert sketch.count() == pytest.approx(20_000, rel=0.05)
+
+
+def test_merge_is_a_union_and_survives_serialisation() -> None:
+    members = [uuid4().bytes for _ in range(3_000)]
+    left, right, both = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    for member in members[:2_000]:
+        left.add(member)
+    for member in members[1_000:]:
+        right.add(member)
+    for member in members:
+        both.add(member)
+
+    merged = HyperLogLog.from_bytes(left.to_bytes()).merge(right)
+    assert merged.registers == both.registers
+    assert HyperLogLog(12).count() == 0
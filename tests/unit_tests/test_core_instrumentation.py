@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections.abc import Generator
+from time import perf_counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from core.instrumentation import (
+    RequestInstrumentationMiddleware,
+    disable_instrumentation,
+    enable_instrumentation,
+    instrumented,
+)
+
+
+@pytest.fixture()
+def telemetry() -> Generator[tuple[InMemorySpanExporter, InMemoryMetricReader], None, None]:
+    spans = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(spans))
+    reader = InMemoryMetricReader()
+    enable_instrumentation(
+        tracing=True,
+        metrics=True,
+        tracer_provider=tracer_provider,
+        meter_provider=MeterProvider(metric_readers=[reader]),
+    )
+    try:
+        yield spans, reader
+    finally:
+        disable_instrumentation()
+
+
+def _metric_names(reader: InMemoryMetricReader) -> set[str]:
+    data = reader.get_metrics_data()
+    assert data is not None
+    return {
+        metric.name
+        for resource_metrics in data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    }
+
+
+def test_disabled_instrumentation_adds_under_a_microsecond() -> None:
+    def noop() -> None:
+        return None
+
+    wrapped = instrumented('test.noop')(noop)
+    calls = 200_000
+
+    def best_of(fn) -> float:
+        timings = []
+        for _ in range(5):
+            start = perf_counter()
+            for _ in range(calls):
+                fn()
+            timings.append(perf_counter() - start)
+        return min(timings)
+
+    overhead_per_call = (best_of(wrapped) - best_of(noop)) / calls
+    assert overhead_per_call < 1e-6
+
+
+def test_instrumented_function_emits_span_and_histogram(telemetry) -> None:
+    spans, reader = telemetry
+
+    @instrumented('test.work')
+    def work() -> int:
+        return 42
+
+    assert work() == 42
+    assert [span.name for span in spans.get_finished_spans()] == ['test.work']
+    assert 'test.work.duration' in _metric_names(reader)
+
+
+def test_request_span_uses_route_template(telemetry) -> None:
+    spans, reader = telemetry
+    app = FastAPI()
+    app.add_middleware(RequestInstrumentationMiddleware)
+
+    @app.get('/items/{item_id}')
+    def read_item(item_id: int) -> dict[str, int]:
+        return {'id': item_id}
+
+    with TestClient(app) as client:
+        assert client.get('/items/7').status_code == 200
+
+    (span,) = spans.get_finished_spans()
+    assert span.name == 'GET /items/{item_id}'
+    assert span.attributes is not None
+    assert span.attributes['http.route'] == '/items/{item_id}'
+    assert span.attributes['http.response.status_code'] == 200
+    assert 'http.server.request.duration' in _metric_names(reader)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from core.logging import (
+    BoundedQueueHandler,
+    JsonFormatter,
+    _current_span_context_getter,
+)
+
+
+def _record(message: str, *args: object) -> logging.LogRecord:
+    return logging.LogRecord('accentra.test', logging.INFO, __file__, 1, message, args, None)
+
+
+def test_queue_handler_captures_span_and_formats_json_off_thread() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=10)
+    handler = BoundedQueueHandler(log_queue, block=False, span_context=_current_span_context_getter())
+    tracer = TracerProvider().get_tracer('test')
+
+    with tracer.start_as_current_span('request') as span:
+        handler.handle(_record('user %s logged in', 'alice'))
+        expected = span.get_span_context()
+
+    payload = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert payload['message'] == 'user alice logged in'
+    assert payload['logger'] == 'accentra.test'
+    assert payload['trace_id'] == format(expected.trace_id, '032x')
+    assert payload['span_id'] == format(expected.span_id, '016x')
+
+
+def test_full_queue_drops_instead_of_blocking() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(log_queue, block=False)
+
+    for index in range(3):
+        handler.handle(_record('line %d', index))
+
+    assert log_queue.qsize() == 1
+    assert handler.dropped == 2
+    assert 'trace_id' not in json.loads(JsonFormatter().format(log_queue.get_nowait()))
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+import time
+from time import perf_counter
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from core.profiling import (
+    ProfilingMiddleware,
+    SamplingProfile,
+    TimedRoute,
+    add_phase_time,
+)
+from core.profiling import router as profiling_router
+from core.profiling import timed_phase
+
+
+def _app() -> FastAPI:
+    @timed_phase('auth')
+    def principal() -> str:
+        add_phase_time('db', 0.002)
+        return 'caller'
+
+    @timed_phase('hash')
+    def digest(value: str) -> str:
+        return value[::-1]
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get('/items/{item_id}')
+    def read_item(item_id: int, caller: str = Depends(principal)) -> dict[str, str]:
+        return {'id': str(item_id), 'digest': digest(caller)}
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(router)
+    app.include_router(profiling_router)
+    return app
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_server_timing_reports_request_phases() -> None:
+    with TestClient(_app()) as client:
+        anonymous = client.get('/items/7')
+        response = client.get('/items/7', headers={'X-Internal-Token': 'test-token'})
+
+    assert anonymous.status_code == 200
+    assert 'server-timing' not in anonymous.headers
+    assert response.status_code == 200
+    phases = {entry.split(';')[0]: entry for entry in response.headers['server-timing'].split(', ')}
+    assert list(phases) == ['auth', 'db', 'hash', 'serialize', 'total']
+    assert phases['db'] == 'db;dur=2.00'
+
+
+def test_idle_phase_hook_adds_under_a_microsecond() -> None:
+    def noop() -> None:
+        return None
+
+    wrapped = timed_phase('hash')(noop)
+    calls = 200_000
+
+    def best_of(fn) -> float:
+        timings = []
+        for _ in range(5):
+            start = perf_counter()
+            for _ in range(calls):
+                fn()
+            timings.append(perf_counter() - start)
+        return min(timings)
+
+    assert (best_of(wrapped) - best_of(noop)) / calls < 1e-6
+
+
+def test_process_profile_collapses_stacks_of_running_threads() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    profile = SamplingProfile(mode='process', seconds=0.2, interval=0.005)
+    try:
+        profile.start()
+        time.sleep(0.2)
+        profile.stop()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.samples > 0
+    lines = profile.collapsed().splitlines()
+    busy = [line for line in lines if f'{__name__}:_busy_loop' in line]
+    assert busy
+    stack, count = busy[0].rsplit(' ', 1)
+    assert stack.startswith('threading:Thread._bootstrap')
+    assert int(count) > 0
+
+
+def test_request_profile_samples_only_selected_threads() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    profile = SamplingProfile(mode='requests', seconds=0.2, interval=0.005, path_prefix='/items')
+    assert profile.selects('/items/1')
+    assert not profile.selects('/other')
+    try:
+        profile.start()
+        profile.enter_thread()
+        time.sleep(0.1)
+        profile.exit_thread()
+        profile.stop()
+    finally:
+        stop.set()
+        worker.join()
+
+    collapsed = profile.collapsed()
+    assert f'{__name__}:test_request_profile_samples_only_selected_threads' in collapsed
+    assert '_busy_loop' not in collapsed
+    assert profile.requests == 1
+
+
+def test_profile_endpoint_requires_internal_token() -> None:
+    with TestClient(_app()) as client:
+        assert client.post('/internal/profile', params={'seconds': 0.05}).status_code == 403
+        response = client.post(
+            '/internal/profile', params={'seconds': 0.05}, headers={'X-Internal-Token': 'test-token'}
+        )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert int(response.headers['x-profile-samples']) > 0
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import pytest
+
+from core.ratelimit import Rate, RateLimiter, make_room, parse_rate
+
+
+class _ScriptedRedis:
+    """Minimal stand-in that evaluates the token-bucket script's arithmetic in Python and counts round-trips."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.tokens: dict[str, float] = {}
+
+    def register_script(self, script: str):
+        def run(*, keys, args, client):
+            self.calls += 1
+            capacity, _rate, cost, debt = (float(value) for value in args)
+            tokens = self.tokens.get(keys[0], capacity) - debt
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.tokens[keys[0]] = tokens
+            return [int(allowed), str(tokens), '0' if allowed else str(cost - tokens)]
+
+        return run
+
+
+def test_parse_rate() -> None:
+    assert parse_rate('10/minute') == Rate(10, 60)
+    assert parse_rate('100 / 5 minutes') == Rate(100, 300)
+    with pytest.raises(ValueError):
+        parse_rate('ten per minute')
+
+
+def test_local_precheck_skips_redis_while_well_under_the_limit() -> None:
+    redis = _ScriptedRedis()
+    limiter = RateLimiter(redis)
+    rate = Rate(1000, 60)
+
+    # The first call leaves 999 tokens, so the default 10% local allowance covers the next 99 requests.
+    decisions = [limiter.hit('tenant:a', rate) for _ in range(100)]
+    assert all(decision.allowed for decision in decisions)
+    assert redis.calls == 1
+
+    # Locally admitted requests are charged to the shared bucket on the next round-trip.
+    limiter.hit('tenant:a', rate)
+    assert redis.calls == 2
+    assert redis.tokens['ratelimit:tenant:a'] == 1000 - 101
+
+
+def test_limit_is_enforced_near_exhaustion() -> None:
+    limiter = RateLimiter(_ScriptedRedis())
+    rate = Rate(5, 60)
+
+    decisions = [limiter.hit('login-email:a@example.com', rate) for _ in range(7)]
+
+    assert [decision.allowed for decision in decisions] == [True] * 5 + [False] * 2
+    assert decisions[-1].retry_after > 0
+
+
+def test_in_process_fallback_and_lockout_without_redis(monkeypatch: pytest.MonkeyPatch) -> None:
+    limiter = RateLimiter()
+    monkeypatch.setattr(limiter, '_redis', lambda: None)
+    rate = Rate(2, 60)
+
+    assert [limiter.hit('ip:1', rate).allowed for _ in range(3)] == [True, True, False]
+    assert limiter.record_failure('login-failures:x', 60) == 1
+    assert limiter.record_failure('login-failures:x', 60) == 2
+    assert limiter.failures('login-failures:x') == 2
+    limiter.reset('login-failures:x')
+    assert limiter.failures('login-failures:x') == 0
+
+
+def test_in_process_state_stays_bounded_under_unique_keys(monkeypatch: pytest.MonkeyPatch) -> None:
+    limiter = RateLimiter()
+    monkeypatch.setattr(limiter, '_redis', lambda: None)
+    monkeypatch.setattr(limiter, '_max_keys', 100)
+    rate = Rate(5, 60)
+
+    limiter.hit('ip:first', rate)
+    for index in range(1000):
+        limiter.hit(f'ip:{index}', rate)
+        limiter.record_failure(f'login-failures:{index}', 60)
+
+    assert len(limiter._fallback) <= 100
+    assert len(limiter._failures) <= 100
+    assert 'ip:first' not in limiter._fallback  # the oldest entries go first
+    assert limiter.failures('login-failures:999') == 1
+
+
+def test_make_room_drops_expired_entries_before_the_oldest_live_ones() -> None:
+    entries = {'live-0': True, 'stale': False, 'live-1': True, 'live-2': True, 'live-3': True, 'live-4': True}
+
+    make_room(entries, 10, lambda live: not live)
+    assert len(entries) == 6  # not full yet
+    make_room(entries, 6, lambda live: not live)
+    assert list(entries) == ['live-1', 'live-2', 'live-3', 'live-4']
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+import core.redis as core_redis
+
+
+class _FakePipeline:
+    def __init__(self, log: list[int]) -> None:
+        self.log = log
+        self.queued: list[Any] = []
+
+    def set(self, key: str, value: Any) -> None:
+        self.queued.append(True)
+
+    def execute(self) -> list[Any]:
+        self.log.append(len(self.queued))
+        replies, self.queued = self.queued, []
+        return replies
+
+    def reset(self) -> None:
+        self.queued = []
+
+
+class _FakeClient:
+    def __init__(self, *, fail: bool = False) -> None:
+        self.fail = fail
+        self.pings = 0
+        self.round_trips: list[int] = []
+
+    def pipeline(self, transaction: bool = False) -> _FakePipeline:
+        return _FakePipeline(self.round_trips)
+
+    def ping(self) -> bool:
+        self.pings += 1
+        if self.fail:
+            raise ConnectionError('connection refused')
+        return True
+
+
+def test_pipelined_flushes_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _FakeClient()
+    monkeypatch.setattr(core_redis, 'get_redis', lambda: client)
+
+    replies = core_redis.pipelined(range(7), lambda pipe, index: pipe.set(f'k{index}', index), chunk_size=3)
+
+    assert replies == [True] * 7
+    assert client.round_trips == [3, 3, 1]
+
+
+def test_health_probe_is_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _FakeClient(fail=True)
+    monkeypatch.setattr(core_redis, 'get_redis', lambda: client)
+    monkeypatch.setattr(core_redis, '_health', None)
+
+    first = core_redis.check_health(max_age=60)
+    second = core_redis.check_health(max_age=60)
+
+    assert first is second
+    assert not first.ok
+    assert first.error is not None and 'connection refused' in first.error
+    assert client.pings == 1
+
+
+def test_clients_are_rebuilt_after_fork(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(core_redis, '_client', None)
+    parent = core_redis.get_redis()
+    assert core_redis.get_redis() is parent
+
+    monkeypatch.setattr(core_redis, '_pid', -1)  # as seen from a forked child
+    core_redis.reset_redis_after_fork()
+
+    child = core_redis.get_redis()
+    assert child is not parent
+    assert child.connection_pool is not parent.connection_pool
+
+
+def test_empty_redis_url_counts_as_not_configured(monkeypatch: pytest.MonkeyPatch) -> None:
+    from core.config import get_settings
+
+    monkeypatch.setenv('REDIS_URL', '')
+    get_settings.cache_clear()
+    try:
+        assert not core_redis.redis_configured()
+    finally:
+        get_settings.cache_clear()
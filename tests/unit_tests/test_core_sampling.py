@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections.abc import Generator
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from core.instrumentation import (
+    RequestInstrumentationMiddleware,
+    disable_instrumentation,
+    enable_instrumentation,
+)
+from core.sampling import ErrorRetainingSpanProcessor, RouteAwareSampler
+
+
+@pytest.fixture()
+def client() -> Generator[tuple[TestClient, InMemorySpanExporter], None, None]:
+    spans = InMemorySpanExporter()
+    # A zero ratio drops every trace by draw, so only the sampler's own rules decide what is exported.
+    tracer_provider = TracerProvider(
+        sampler=RouteAwareSampler(0.0, excluded_routes=['/healthz'], record_unsampled=True)
+    )
+    tracer_provider.add_span_processor(ErrorRetainingSpanProcessor(SimpleSpanProcessor(spans)))
+    enable_instrumentation(tracing=True, metrics=False, tracer_provider=tracer_provider)
+
+    app = FastAPI()
+    app.add_middleware(RequestInstrumentationMiddleware)
+
+    @app.get('/healthz')
+    def healthz() -> dict[str, str]:
+        raise HTTPException(status_code=503)
+
+    @app.get('/ok')
+    def ok() -> dict[str, str]:
+        return {'status': 'ok'}
+
+    @app.get('/boom')
+    def boom() -> dict[str, str]:
+        raise HTTPException(status_code=502)
+
+    try:
+        with TestClient(app) as test_client:
+            yield test_client, spans
+    finally:
+        disable_instrumentation()
+
+
+def test_unsampled_success_is_not_exported(client) -> None:
+    test_client, spans = client
+    assert test_client.get('/ok').status_code == 200
+    assert spans.get_finished_spans() == ()
+
+
+def test_unsampled_error_is_exported_as_sampled(client) -> None:
+    test_client, spans = client
+    assert test_client.get('/boom').status_code == 502
+
+    (span,) = spans.get_finished_spans()
+    assert span.name == 'GET /boom'
+    assert span.context is not None and span.context.trace_flags.sampled
+
+
+def test_excluded_route_is_never_exported(client) -> None:
+    test_client, spans = client
+    assert test_client.get('/healthz').status_code == 503
+    assert spans.get_finished_spans() == ()
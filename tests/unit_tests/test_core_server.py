@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+import core.server
+from core.config import get_settings
+from core.server import (
+    WORKER_CLASS,
+    build_options,
+    cgroup_cpu_limit,
+    default_workers,
+    post_fork,
+    worker_exit,
+)
+
+
+def test_build_options_maps_settings_and_overrides(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('SERVER_WORKERS', '3')
+    monkeypatch.setenv('SERVER_MAX_REQUESTS', '1000')
+    monkeypatch.setenv('SERVER_MAX_REQUESTS_JITTER', '100')
+    get_settings.cache_clear()
+    try:
+        options = build_options(get_settings(), bind='127.0.0.1:9000', workers=None)
+    finally:
+        get_settings.cache_clear()
+
+    assert options['bind'] == '127.0.0.1:9000'
+    assert options['workers'] == 3
+    assert options['worker_class'] == WORKER_CLASS
+    assert options['preload_app'] is True
+    assert (options['max_requests'], options['max_requests_jitter']) == (1000, 100)
+    assert options['post_fork'] is post_fork
+    assert options['worker_exit'] is worker_exit
+
+
+def test_default_workers_respect_the_cgroup_cpu_quota(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(64)), raising=False)
+    cpu_max = tmp_path / 'cpu.max'
+    monkeypatch.setattr(core.server, 'CGROUP_V2_CPU_MAX', cpu_max)
+    monkeypatch.setattr(core.server, 'CGROUP_V1_CPU_QUOTA', tmp_path / 'cpu.cfs_quota_us')
+    monkeypatch.setattr(core.server, 'CGROUP_V1_CPU_PERIOD', tmp_path / 'cpu.cfs_period_us')
+
+    assert cgroup_cpu_limit() is None
+    assert default_workers() == 64
+    cpu_max.write_text('max 100000\n')
+    assert default_workers() == 64
+    cpu_max.write_text('150000 100000\n')
+    assert cgroup_cpu_limit() == 1.5
+    assert default_workers() == 2
+
+    cpu_max.unlink()
+    (tmp_path / 'cpu.cfs_quota_us').write_text('400000\n')
+    (tmp_path / 'cpu.cfs_period_us').write_text('100000\n')
+    assert default_workers() == 4
+    (tmp_path / 'cpu.cfs_quota_us').write_text('-1\n')
+    assert default_workers() == 64
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+def test_forked_worker_gets_a_working_log_pipeline() -> None:
+    import logging
+
+    import core.logging as core_logging
+
+    root = logging.getLogger()
+    saved_handlers = root.handlers[:]
+    root.handlers.clear()  # let configure_logging install its own pipeline, as in production
+    core_logging.shutdown_logging()
+    core_logging.configure_logging()
+    parent_handler = core_logging._queue_handler
+    try:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            ok = False
+            try:
+                post_fork(None, type('Worker', (), {'pid': os.getpid()})())
+                listener = core_logging._listener
+                ok = (
+                    core_logging._queue_handler is not parent_handler
+                    and listener is not None
+                    and listener._thread is not None
+                    and listener._thread.is_alive()
+                )
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+    finally:
+        core_logging.shutdown_logging()
+        root.handlers[:] = saved_handlers
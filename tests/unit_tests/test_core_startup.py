@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import os
+
+from core.startup import import_time_seconds, parse_importtime, profile_imports
+
+# Generous enough for CI runners; tighten locally with ACCENTRA_IMPORT_BUDGET_SECONDS when optimising startup.
+IMPORT_BUDGET_SECONDS = float(os.environ.get('ACCENTRA_IMPORT_BUDGET_SECONDS', '2.0'))
+
+DEFERRED_MODULES = ('dramatiq', 'redis', 'opentelemetry.sdk')
+
+
+def test_parse_importtime_reads_depth_and_timings() -> None:
+    report = '\n'.join(
+        [
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |   json.decoder',
+            'import time:       300 |        420 | json',
+        ]
+    )
+
+    timings = parse_importtime(report)
+
+    assert [(timing.module, timing.depth) for timing in timings] == [('json.decoder', 1), ('json', 0)]
+    assert import_time_seconds(timings, 'json') == 0.00042
+
+
+def test_main_import_stays_within_startup_budget() -> None:
+    timings = profile_imports('main')
+
+    imported = {timing.module for timing in timings}
+    assert not imported.intersection(DEFERRED_MODULES)
+    assert import_time_seconds(timings, 'main') <= IMPORT_BUDGET_SECONDS
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from core.buffering import BoundedBuffer
+from users.audit import AuditEntry
+from users.models import AuditAction
+
+
+def test_bounded_buffer_drops_when_full() -> None:
+    buffer: BoundedBuffer[int] = BoundedBuffer(capacity=2)
+
+    assert buffer.offer(1)
+    assert buffer.offer(2)
+    assert not buffer.offer(3)
+
+    assert buffer.drain(10) == [1, 2]
+    assert buffer.offer(4)
+    stats = buffer.stats()
+    assert (stats.size, stats.accepted, stats.dropped) == (1, 3, 1)
+
+
+def test_audit_entry_message_roundtrips_identifiers() -> None:
+    user_id = uuid4()
+    entry = AuditEntry(action=AuditAction.login_succeeded, actor_id=user_id, ip_address='10.0.0.1')
+
+    message = entry.to_message()
+
+    assert message['action'] == 'login_succeeded'
+    assert message['actor_id'] == str(user_id)
+    assert message['subject_id'] is None
+    assert message['ip_address'] == '10.0.0.1'
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from core.config import DEV_INTERNAL_AUTH_TOKEN, get_settings
+from users.authorization import (
+    INTERNAL_PRINCIPAL,
+    compile_scopes,
+    ensure_can_grant,
+    ensure_tenant,
+    scope_set,
+)
+from users.models import Role
+from users.service import Principal
+
+
+def _principal(role: Role, scopes: tuple[str, ...] = ()) -> Principal:
+    return Principal(uuid4(), uuid4(), uuid4(), role, scopes)
+
+
+def test_role_defaults_and_wildcards() -> None:
+    admin = scope_set(_principal(Role.admin))
+    assert admin.allows('users:write')
+    assert admin.allows('memberships:delete')
+    assert not admin.allows('billing:read')
+
+    viewer = scope_set(_principal(Role.viewer, ('*:read', 'reports:export:*')))
+    assert viewer.allows('billing:read')
+    assert viewer.allows('reports:export:csv')
+    assert not viewer.allows('users:write')
+    assert not viewer.allows('billing:read:all')  # `*` spans exactly one segment
+    assert not viewer.allows('reports:export')
+
+    assert scope_set(_principal(Role.owner)).allows_all(['anything:at:all', 'users:write'])
+
+
+def test_compiled_scopes_are_shared_per_role_and_scopes() -> None:
+    assert compile_scopes(Role.editor, ('a:b',)) is scope_set(_principal(Role.editor, ('a:b',)))
+    assert compile_scopes(Role.editor, ('a:b',)) is not compile_scopes(Role.viewer, ('a:b',))
+
+
+def test_tenant_and_grant_checks() -> None:
+    admin = _principal(Role.admin)
+    ensure_tenant(admin, admin.tenant_id)
+    ensure_tenant(INTERNAL_PRINCIPAL, uuid4())
+    with pytest.raises(HTTPException) as excinfo:
+        ensure_tenant(admin, uuid4())
+    assert excinfo.value.status_code == 403
+
+    ensure_can_grant(admin, Role.admin)
+    with pytest.raises(HTTPException):
+        ensure_can_grant(admin, Role.owner)
+
+
+def test_grants_are_limited_to_scopes_the_caller_holds() -> None:
+    admin = _principal(Role.admin)
+    ensure_can_grant(admin, Role.viewer, ['users:write', 'users:*', 'tenants:read'])
+    for scopes in (['*'], ['*:read'], ['billing:read'], ['tenants:*']):
+        with pytest.raises(HTTPException) as excinfo:
+            ensure_can_grant(admin, Role.viewer, scopes)
+        assert excinfo.value.status_code == 403
+
+    reader = _principal(Role.editor, ('*:read',))
+    ensure_can_grant(reader, Role.viewer, ['billing:read', '*:read'])
+    with pytest.raises(HTTPException):
+        ensure_can_grant(reader, Role.viewer, ['*'])
+
+    ensure_can_grant(_principal(Role.owner), Role.owner, ['*'])
+    ensure_can_grant(INTERNAL_PRINCIPAL, Role.owner, ['*'])
+
+
+@pytest.mark.parametrize(
+    ('env', 'token', 'supplied', 'trusted'),
+    [
+        ('testing', 'test-token', 'test-token', True),
+        ('testing', 'test-token', 'wrong', False),
+        ('production', '', '', False),
+        ('production', DEV_INTERNAL_AUTH_TOKEN, DEV_INTERNAL_AUTH_TOKEN, False),
+        ('development', DEV_INTERNAL_AUTH_TOKEN, DEV_INTERNAL_AUTH_TOKEN, True),
+    ],
+)
+def test_internal_token_is_disabled_when_empty_or_left_at_the_default(
+    monkeypatch: pytest.MonkeyPatch, env: str, token: str, supplied: str, trusted: bool
+) -> None:
+    monkeypatch.setenv('ENV', env)
+    monkeypatch.setenv('INTERNAL_AUTH_TOKEN', token)
+    get_settings.cache_clear()
+    try:
+        assert get_settings().internal_token_matches(supplied) is trusted
+    finally:
+        get_settings.cache_clear()
+
+
+def test_granted_payload_scopes_are_not_memoised() -> None:
+    admin = _principal(Role.admin)
+    granted = scope_set(admin)
+    granted.allows('users:read')
+    memoised = len(granted._allowed)
+    for index in range(1000):
+        with pytest.raises(HTTPException):
+            ensure_can_grant(admin, Role.viewer, [f'billing{index}:read'])
+        ensure_can_grant(admin, Role.viewer, [f'users:scope{index}'])
+
+    assert len(granted._allowed) == memoised
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+import pytest
+
+import users.ratelimit
+from users.ratelimit import tenant_tier
+
+
+def test_unauthenticated_tenant_ids_are_not_looked_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    lookups = []
+
+    def get_tenant(session, tenant_id):
+        lookups.append(tenant_id)
+
+    monkeypatch.setattr(users.ratelimit, 'get_tenant', get_tenant)
+    monkeypatch.setattr(users.ratelimit, '_tier_cache', {})
+    monkeypatch.setattr(users.ratelimit, '_TIER_CACHE_SIZE', 100)
+
+    for _ in range(1000):
+        assert tenant_tier(None, uuid4(), lookup=False) is None  # type: ignore[arg-type]
+    assert lookups == []
+    assert users.ratelimit._tier_cache == {}
+
+    for _ in range(1000):
+        tenant_tier(None, uuid4())  # type: ignore[arg-type]
+    assert len(lookups) == 1000
+    assert len(users.ratelimit._tier_cache) <= 100
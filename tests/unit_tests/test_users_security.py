@@ -10,7 +10,10 @@ from users.security import (
     AuthenticationError,
     create_access_token,
     decode_access_token,
+    generate_client_secret,
+    hash_client_secret,
     hash_password,
+    verify_client_secret,
     verify_password,
 )
 
@@ -24,6 +27,20 @@ def test_hash_password_roundtrip() -> None:
     assert not verify_password('wrong-password', encoded)
 
 
+def test_client_secret_hash_is_keyed_and_verifiable() -> None:
+    secret = generate_client_secret()
+    digest = hash_client_secret(secret)
+
+    assert digest == hash_client_secret(secret)
+    assert verify_client_secret(secret, digest)
+    assert not verify_client_secret(generate_client_secret(), digest)
+
+
+def test_service_tokens_carry_their_type() -> None:
+    token = create_access_token(subject=uuid4(), tenant_id=uuid4(), role=Role.viewer, scopes=[], token_type='service')
+    assert decode_access_token(token).typ == 'service'
+
+
 def test_create_and_decode_access_token() -> None:
     now = datetime(2024, 1, 1, tzinfo=timezone.utc)
     user_id = uuid4()